@@ -0,0 +1,196 @@
+"""
+Benchmark ponta a ponta: roda main.main contra o servidor fake (bench.fake_servers)
+com catálogos de tamanhos diferentes e mede a vazão da integração.
+
+Uso:
+    python -m bench.benchmark                          # 1k, 10k e 100k SKUs
+    python -m bench.benchmark --skus 1000 --latencia-ms 20 --taxa-429 0.01 --saida bench.json
+
+Para cada tamanho reporta SKUs/s, requisições por endpoint (contadas no servidor)
+e latência p50/p95/p99 por endpoint (medida no cliente, incluindo retries do urllib3).
+Cada execução roda em um subprocesso com diretório temporário próprio, para que
+cache, estado e logs de uma rodada não influenciem a seguinte.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+
+from bench.fake_servers import ConfigFalhas, inicia_servidor, classifica, CODTAB_VENDA, CODTAB_PROMO
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TAMANHOS_PADRAO = (1_000, 10_000, 100_000)
+
+
+def percentil(valores: list[float], p: float) -> float:
+    """Percentil por vizinho mais próximo; 0.0 para lista vazia."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def _ambiente(porta: int, diretorio: str, extras: dict) -> dict:
+    base = f"http://127.0.0.1:{porta}"
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": RAIZ + os.pathsep + env.get("PYTHONPATH", ""),
+        "VTEX_BASE_URL": f"{base}/api/",
+        "SANKHYA_BASE_URL": base,
+        "TELEGRAM_API_URL": base,
+        "VTEXAPPKEY": "bench", "VTEXAPPTOKEN": "bench",
+        "SANKHYA_TOKEN": "bench", "SANKHYA_APPKEY": "bench",
+        "SANKHYA_USERNAME": "bench", "SANKHYA_PASSWORD": "bench",
+        "BOTTOKEN": "bench", "CHATID": "0",
+        "SANKHYA_CODTAB_VENDA": str(CODTAB_VENDA),
+        "SANKHYA_CODTAB_PROMO": str(CODTAB_PROMO),
+        "VTEX_CACHE_PATH": os.path.join(diretorio, "vtex_cache.sqlite3"),
+        "VTEX_STATE_PATH": os.path.join(diretorio, "vtex_estado.sqlite3"),
+        "APP_ENV": "1",
+        # o servidor local não tem os limites da VTEX real
+        "VTEX_RATE_CATALOG": "100000", "VTEX_RATE_LOGISTICS": "100000",
+        "VTEX_RATE_PRICING": "100000", "VTEX_RATE_OUTROS": "100000",
+        "TELEGRAM_DIGEST_INTERVAL": "5", "TELEGRAM_MIN_INTERVAL": "0",
+    })
+    env.update(extras)
+    return env
+
+
+def _consulta(porta: int, caminho: str) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{porta}{caminho}", timeout=10) as resposta:
+        return json.loads(resposta.read() or b"{}")
+
+
+def executa_rodada(n_skus: int, falhas: ConfigFalhas, divergencia: float, promocao: float,
+                   extras: dict, timeout: float) -> dict:
+    """Sobe o servidor fake, roda main.main em um subprocesso e devolve as métricas."""
+    servidor = inicia_servidor(n_skus, 0, falhas, divergencia, promocao)
+    porta = servidor.server_port
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-") as diretorio:
+            arquivo_latencias = os.path.join(diretorio, "latencias.json")
+            arquivo_log = os.path.join(diretorio, "saida.log")
+            inicio = time.perf_counter()
+            with open(arquivo_log, "w", encoding="utf-8") as log:
+                processo = subprocess.run(
+                    [sys.executable, "-m", "bench.benchmark", "--executa-main", arquivo_latencias],
+                    cwd=diretorio, env=_ambiente(porta, diretorio, extras),
+                    stdout=log, stderr=subprocess.STDOUT, timeout=timeout)
+            duracao = time.perf_counter() - inicio
+            if processo.returncode != 0:
+                with open(arquivo_log, encoding="utf-8") as log:
+                    final = log.read()[-2000:]
+                raise RuntimeError(f"main.main terminou com código {processo.returncode}:\n{final}")
+            with open(arquivo_latencias, encoding="utf-8") as f:
+                latencias = json.load(f)
+        requisicoes = _consulta(porta, "/__stats")
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    return {
+        "skus": n_skus,
+        "segundos": round(duracao, 2),
+        "skus_por_segundo": round(n_skus / duracao, 1) if duracao else 0.0,
+        "requisicoes": dict(sorted(requisicoes.items())),
+        "total_requisicoes": sum(requisicoes.values()),
+        "latencia_ms": {
+            endpoint: {
+                "n": len(valores),
+                "p50": round(percentil(valores, 50), 2),
+                "p95": round(percentil(valores, 95), 2),
+                "p99": round(percentil(valores, 99), 2),
+            }
+            for endpoint, valores in sorted(latencias.items())
+        },
+    }
+
+
+def imprime(resultado: dict):
+    print(f"\n📦 {resultado['skus']} SKUs em {resultado['segundos']}s "
+          f"→ {resultado['skus_por_segundo']} SKUs/s, {resultado['total_requisicoes']} requisições")
+    print(f"  {'endpoint':<60} {'reqs':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    endpoints = sorted(set(resultado["requisicoes"]) | set(resultado["latencia_ms"]))
+    for endpoint in endpoints:
+        lat = resultado["latencia_ms"].get(endpoint, {})
+        print(f"  {endpoint:<60} {resultado['requisicoes'].get(endpoint, 0):>8} "
+              f"{lat.get('p50', 0):>8} {lat.get('p95', 0):>8} {lat.get('p99', 0):>8}")
+
+
+def _executa_main(arquivo_latencias: str):
+    """
+    Modo filho: instrumenta o HTTPAdapter para medir a latência de cada requisição
+    e roda main.main com um SankhyaClient apontado para o servidor fake.
+    """
+    from requests.adapters import HTTPAdapter
+
+    latencias: dict[str, list[float]] = defaultdict(list)
+    lock = threading.Lock()
+    envia_original = HTTPAdapter.send
+
+    def envia_medindo(self, request, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return envia_original(self, request, *args, **kwargs)
+        finally:
+            decorrido = (time.perf_counter() - inicio) * 1000
+            endpoint = classifica(request.method, request.url, request.body or b"")
+            with lock:
+                latencias[endpoint].append(decorrido)
+
+    HTTPAdapter.send = envia_medindo
+
+    import main
+    from sankhya_api.auth import SankhyaClient
+    try:
+        main.main(SankhyaClient())
+    finally:
+        with open(arquivo_latencias, "w", encoding="utf-8") as f:
+            json.dump(latencias, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da integração contra o servidor fake")
+    parser.add_argument("--skus", type=int, nargs="+", default=list(TAMANHOS_PADRAO),
+                        help="tamanhos de catálogo (padrão: 1000 10000 100000)")
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.0)
+    parser.add_argument("--divergencia", type=float, default=0.02)
+    parser.add_argument("--promocao", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=3600, help="limite em segundos por rodada")
+    parser.add_argument("--env", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="variável extra para o processo da integração (ex.: SYNC_MAX_WORKERS=16)")
+    parser.add_argument("--saida", help="grava os resultados em JSON neste arquivo")
+    parser.add_argument("--executa-main", metavar="ARQUIVO", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executa_main:
+        _executa_main(args.executa_main)
+        return
+
+    falhas = ConfigFalhas(args.latencia_ms, args.jitter_ms, args.taxa_erro, args.taxa_429, args.retry_after)
+    extras = dict(item.split("=", 1) for item in args.env)
+    resultados = []
+    for n_skus in args.skus:
+        resultado = executa_rodada(n_skus, falhas, args.divergencia, args.promocao, extras, args.timeout)
+        imprime(resultado)
+        resultados.append(resultado)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "resultados": resultados}, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Servidor HTTP local que imita os endpoints VTEX, Sankhya e Telegram usados pelo
+projeto, para rodar a integração e o benchmark sem acessar os serviços reais.
+
+Uso:
+    python -m bench.fake_servers --skus 1000 --port 8900 --latencia-ms 20 --taxa-429 0.01
+
+Aponte o projeto para ele com:
+    VTEX_BASE_URL=http://127.0.0.1:8900/api/
+    SANKHYA_BASE_URL=http://127.0.0.1:8900
+    TELEGRAM_API_URL=http://127.0.0.1:8900
+    SANKHYA_CODTAB_VENDA=1 SANKHYA_CODTAB_PROMO=2
+
+GET /__stats devolve a contagem de requisições por endpoint; POST /__reset zera.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Códigos das tabelas de preço no executeQuery (SANKHYA_CODTAB_VENDA / SANKHYA_CODTAB_PROMO)
+CODTAB_VENDA = 1
+CODTAB_PROMO = 2
+# Depósito único do catálogo fake
+WAREHOUSE_ID = "1f82610"
+WAREHOUSE_NOME = "Estoque"
+# Linhas por página do loadRecords
+LOAD_RECORDS_PAGE_SIZE = 500
+
+
+def classifica(metodo: str, url: str, corpo: bytes = b"") -> str:
+    """Nome do endpoint com os ids trocados por {id}, usado nas estatísticas."""
+    partes = urlsplit(url)
+    if "service.sbr" in partes.path:
+        servico = parse_qs(partes.query).get("serviceName", ["?"])[0]
+        return f"sankhya {servico}"
+    caminho = re.sub(r"/\d+(?=/|$)", "/{id}", partes.path)
+    caminho = re.sub(r"/bot[^/]+/", "/bot{token}/", caminho)
+    caminho = re.sub(r"/warehouses/[^/]+", "/warehouses/{wh}", caminho)
+    return f"{metodo} {caminho}"
+
+
+@dataclass
+class ConfigFalhas:
+    latencia_ms: float = 0.0     # latência média por requisição
+    jitter_ms: float = 0.0       # variação uniforme em torno da média
+    taxa_erro: float = 0.0       # fração de respostas 500
+    taxa_429: float = 0.0        # fração de respostas 429 (com Retry-After)
+    retry_after: float = 0.0     # segundos no header Retry-After
+
+
+class CatalogoFake:
+    """
+    Catálogo determinístico: produto i (1..n) tem SKU i + 1_000_000 e RefId/CODPROD
+    i + 1000. Uma fração `divergencia` dos produtos tem estoque/preço diferente
+    entre Sankhya e VTEX, e uma fração `promocao` tem preço promocional.
+    """
+
+    def __init__(self, n_skus: int, divergencia: float = 0.02, promocao: float = 0.05, semente: int = 42):
+        rnd = random.Random(semente)
+        self.n_skus = n_skus
+        self.lock = threading.Lock()
+        self.ids = list(range(1, n_skus + 1))
+        self.estoque_vtex, self.preco_vtex, self.fixos_vtex = {}, {}, {}
+        self.estoque_snk, self.preco_snk, self.promo_snk = {}, {}, {}
+        for id_produto in self.ids:
+            sku, codprod = self.sku(id_produto), self.codprod(id_produto)
+            estoque = rnd.randint(0, 50)
+            preco = round(rnd.uniform(5, 500), 2)
+            self.estoque_vtex[sku] = estoque
+            self.preco_vtex[sku] = preco
+            self.fixos_vtex[sku] = []
+            diverge = rnd.random() < divergencia
+            self.estoque_snk[codprod] = estoque + 1 if diverge else estoque
+            self.preco_snk[codprod] = round(preco + 1, 2) if diverge else preco
+            self.promo_snk[codprod] = round(preco * 0.9, 2) if rnd.random() < promocao else 0.0
+
+    @staticmethod
+    def sku(id_produto: int) -> int:
+        return id_produto + 1_000_000
+
+    @staticmethod
+    def codprod(id_produto: int) -> int:
+        return id_produto + 1000
+
+
+def _preco_br(valor: float) -> str:
+    """Formato do consultaProdutos: vírgula decimal."""
+    return f"{valor:.2f}".replace(".", ",")
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # cabeçalho e corpo saem em escritas separadas; com Nagle ligado cada resposta
+    # keep-alive esperaria o ACK atrasado do cliente (~40 ms)
+    disable_nagle_algorithm = True
+    catalogo: CatalogoFake = None
+    falhas: ConfigFalhas = ConfigFalhas()
+    contagem: Counter = Counter()
+    contagem_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    # ------------------------------------------------------------------ util
+    def _corpo(self) -> bytes:
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(tamanho) if tamanho else b""
+
+    def _responde(self, status: int, dados=None, headers: dict = None):
+        corpo = b"" if dados is None else json.dumps(dados).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _trata(self, metodo: str):
+        corpo = self._corpo()
+        caminho = urlsplit(self.path).path
+        if caminho == "/__stats":
+            with self.contagem_lock:
+                return self._responde(200, dict(self.contagem))
+        if caminho == "/__reset":
+            with self.contagem_lock:
+                self.contagem.clear()
+            return self._responde(200, {})
+
+        with self.contagem_lock:
+            self.contagem[classifica(metodo, self.path)] += 1
+
+        f = self.falhas
+        if f.latencia_ms or f.jitter_ms:
+            time.sleep(max(0.0, f.latencia_ms + random.uniform(-f.jitter_ms, f.jitter_ms)) / 1000)
+        sorteio = random.random()
+        if sorteio < f.taxa_429:
+            return self._responde(429, {"error": "Too Many Requests"}, {"Retry-After": str(f.retry_after)})
+        if sorteio < f.taxa_429 + f.taxa_erro:
+            return self._responde(500, {"error": "falha injetada"})
+
+        try:
+            dados = json.loads(corpo) if corpo else None
+        except ValueError:
+            dados = None
+        if caminho.startswith("/api/"):
+            return self._vtex(metodo, caminho[len("/api/"):], dados)
+        if caminho == "/login":
+            return self._responde(200, {"bearerToken": "token-fake"})
+        if caminho.endswith("/service.sbr"):
+            return self._sankhya(dados or {})
+        if "/sendMessage" in caminho:
+            return self._responde(200, {"ok": True})
+        return self._responde(404, {"error": f"endpoint desconhecido {caminho}"})
+
+    do_GET = lambda self: self._trata("GET")
+    do_POST = lambda self: self._trata("POST")
+    do_PUT = lambda self: self._trata("PUT")
+    do_DELETE = lambda self: self._trata("DELETE")
+
+    # ------------------------------------------------------------------ VTEX
+    def _vtex(self, metodo: str, caminho: str, dados):
+        cat = self.catalogo
+        query = parse_qs(urlsplit(self.path).query)
+
+        if caminho == "catalog_system/pvt/products/GetProductAndSkuIds":
+            inicio = int(query.get("_from", ["1"])[0])
+            fim = int(query.get("_to", ["10"])[0])
+            # o índice é 0-based no projeto; a VTEX limita a 250 por página
+            fim = min(fim, inicio + 249, cat.n_skus - 1)
+            data = {str(i): [cat.sku(i)] for i in cat.ids[inicio:fim + 1]}
+            return self._responde(200, {"data": data, "range": {"total": cat.n_skus, "from": inicio, "to": fim}})
+
+        m = re.fullmatch(r"catalog/pvt/product/(\d+)", caminho)
+        if m:
+            id_produto = int(m.group(1))
+            if id_produto > cat.n_skus:
+                return self._responde(404, {"error": "produto não encontrado"})
+            return self._responde(200, {"Id": id_produto, "RefId": str(cat.codprod(id_produto)),
+                                        "Name": f"Produto {id_produto}"})
+
+        m = re.fullmatch(r"logistics/pvt/inventory/skus/(\d+)", caminho)
+        if m:
+            sku = int(m.group(1))
+            with cat.lock:
+                qtd = cat.estoque_vtex.get(sku)
+            if qtd is None:
+                return self._responde(404, {"error": "sku não encontrado"})
+            return self._responde(200, {"skuId": str(sku), "balance": [
+                {"warehouseId": WAREHOUSE_ID, "warehouseName": WAREHOUSE_NOME, "totalQuantity": qtd,
+                 "reservedQuantity": 0, "hasUnlimitedQuantity": False}]})
+
+        m = re.fullmatch(r"logistics/pvt/inventory/skus/(\d+)/warehouses/([^/]+)", caminho)
+        if m and metodo == "PUT":
+            with cat.lock:
+                cat.estoque_vtex[int(m.group(1))] = int((dados or {}).get("quantity", 0))
+            return self._responde(200, True)
+
+        if caminho == "logistics/pvt/inventory/warehouseitems/setbalance" and metodo == "POST":
+            with cat.lock:
+                for item in dados or []:
+                    cat.estoque_vtex[int(item["itemId"])] = int(item.get("quantity", 0))
+            return self._responde(200, [])
+
+        m = re.fullmatch(r"pricing/prices/(\d+)", caminho)
+        if m:
+            sku = int(m.group(1))
+            if metodo == "PUT":
+                with cat.lock:
+                    cat.preco_vtex[sku] = float((dados or {}).get("basePrice", 0))
+                return self._responde(200)
+            with cat.lock:
+                preco = cat.preco_vtex.get(sku)
+            if preco is None:
+                return self._responde(404, {"error": "sku não encontrado"})
+            return self._responde(200, {"itemId": str(sku), "basePrice": preco, "listPrice": None,
+                                        "costPrice": None, "markup": 0, "fixedPrices": cat.fixos_vtex.get(sku, [])})
+
+        m = re.fullmatch(r"pricing/prices/(\d+)/fixed(?:/([^/]+))?", caminho)
+        if m:
+            sku, politica = int(m.group(1)), m.group(2) or "1"
+            with cat.lock:
+                if metodo == "GET":
+                    return self._responde(200, cat.fixos_vtex.get(sku, []))
+                if metodo == "DELETE":
+                    cat.fixos_vtex[sku] = [f for f in cat.fixos_vtex.get(sku, []) if f["tradePolicyId"] != politica]
+                    return self._responde(200)
+                novos = [{**f, "tradePolicyId": politica} for f in (dados or [])]
+                cat.fixos_vtex[sku] = [f for f in cat.fixos_vtex.get(sku, []) if f["tradePolicyId"] != politica] + novos
+            return self._responde(200)
+
+        return self._responde(404, {"error": f"endpoint VTEX desconhecido {caminho}"})
+
+    # --------------------------------------------------------------- Sankhya
+    def _sankhya(self, payload: dict):
+        servico = payload.get("serviceName")
+        corpo = payload.get("requestBody", {})
+        cat = self.catalogo
+
+        if servico == "CRUDServiceProvider.loadRecords":
+            data_set = corpo.get("dataSet", {})
+            if data_set.get("rootEntity") != "Estoque":
+                return self._responde(200, {"status": "1", "responseBody": {"entities": {"total": "0"}}})
+            expressao = data_set.get("criteria", {}).get("expression", {}).get("$", "")
+            m = re.search(r"CODPROD\s*=\s*(\d+)", expressao)
+            codprods = [int(m.group(1))] if m else sorted(cat.estoque_snk)
+            codprods = [c for c in codprods if c in cat.estoque_snk]
+            pagina = int(data_set.get("offsetPage") or 0)
+            linhas = codprods[pagina * LOAD_RECORDS_PAGE_SIZE:(pagina + 1) * LOAD_RECORDS_PAGE_SIZE]
+            # todo o estoque fica no primeiro CODEMP/CODLOCAL pedido (7/188 por padrão)
+            local = re.search(r"CODEMP\s*=\s*(\d+)\s+AND\s+this\.CODLOCAL\s*=\s*(\d+)", expressao)
+            codemp, codlocal = local.groups() if local else ("7", "188")
+            campos = [c.strip() for c in data_set.get("entity", {}).get("fieldset", {}).get("list", "").split(",")]
+            entity = []
+            for c in linhas:
+                valores = {"CODPROD": c, "CODEMP": codemp, "CODLOCAL": codlocal, "ESTOQUE": cat.estoque_snk[c]}
+                entity.append({f"f{i}": {"$": str(valores.get(campo, ""))} for i, campo in enumerate(campos)})
+            mais = (pagina + 1) * LOAD_RECORDS_PAGE_SIZE < len(codprods)
+            return self._responde(200, {"status": "1", "responseBody": {"entities": {
+                "total": str(len(linhas)), "hasMoreResult": "true" if mais else "false",
+                "offsetPage": str(pagina), "entity": entity[0] if len(entity) == 1 else entity}}})
+
+        if servico == "ConsultaProdutosSP.consultaProdutos":
+            codprod = int(corpo.get("filtros", {}).get("criterio", {}).get("CODPROD", {}).get("$", "0"))
+            if codprod not in cat.preco_snk:
+                return self._responde(200, {"status": "1", "responseBody": {"produtos": {}}})
+            return self._responde(200, {"status": "1", "responseBody": {"produtos": {"produto": {
+                "CODPROD": {"$": str(codprod)},
+                "PRECOBASE": {"$": _preco_br(cat.preco_snk[codprod])},
+                "Preço_PROMO_1": {"$": _preco_br(cat.promo_snk[codprod])},
+            }}}})
+
+        if servico == "DbExplorerSP.executeQuery":
+            sql = corpo.get("sql", "")
+            m = re.search(r"CODPROD IN \(([\d,\s]+)\)", sql)
+            codprods = [int(c) for c in m.group(1).split(",")] if m else sorted(cat.preco_snk)
+            rows = []
+            for c in codprods:
+                if c in cat.preco_snk:
+                    rows.append([c, CODTAB_VENDA, cat.preco_snk[c]])
+                    if cat.promo_snk[c] > 0:
+                        rows.append([c, CODTAB_PROMO, cat.promo_snk[c]])
+            return self._responde(200, {"status": "1", "responseBody": {"rows": rows}})
+
+        return self._responde(200, {"status": "0", "statusMessage": f"serviço {servico} não implementado"})
+
+
+class _Servidor(ThreadingHTTPServer):
+    # fila de conexões maior que o padrão (5) para os clientes assíncronos, com centenas em paralelo
+    request_queue_size = 1024
+
+
+def inicia_servidor(n_skus: int, porta: int = 0, falhas: ConfigFalhas = None, divergencia: float = 0.02,
+                    promocao: float = 0.05) -> ThreadingHTTPServer:
+    """Sobe o servidor em uma thread e retorna a instância (porta em server_port)."""
+    handler = type("Handler", (FakeHandler,), {
+        "catalogo": CatalogoFake(n_skus, divergencia, promocao),
+        "falhas": falhas or ConfigFalhas(),
+        "contagem": Counter(),
+        "contagem_lock": threading.Lock(),
+    })
+    servidor = _Servidor(("127.0.0.1", porta), handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="fake-server", daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor fake VTEX/Sankhya/Telegram")
+    parser.add_argument("--skus", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.0)
+    parser.add_argument("--divergencia", type=float, default=0.02)
+    parser.add_argument("--promocao", type=float, default=0.05)
+    args = parser.parse_args()
+
+    falhas = ConfigFalhas(args.latencia_ms, args.jitter_ms, args.taxa_erro, args.taxa_429, args.retry_after)
+    servidor = inicia_servidor(args.skus, args.port, falhas, args.divergencia, args.promocao)
+    print(f"🧪 Servidor fake com {args.skus} SKUs em http://127.0.0.1:{servidor.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,219 @@
+import argparse
 import logging
+import multiprocessing
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from dotenv import load_dotenv
-from notifications.telegram import enviar_notificacao_telegram
+from notifications.telegram import enviar_notificacao_telegram, inicia_dispatcher, encerra_dispatcher
 from sankhya_api.auth import SankhyaClient
-from vtex_api.processamentos import vtex_atualiza_estoque, vtex_atualiza_preco_venda, vtex_merge_id_sku_dicts
+from sankhya_api.fetch import sankhya_fetch_estoque_locais_lote, sankhya_fetch_precos_lote
+from vtex_api.depositos import locais_sankhya, estoques_por_deposito
+from vtex_api.espelho import get_espelho
+from vtex_api.processamentos import vtex_iter_id_sku
+from vtex_api.estado import EstadoSincronizacao
+from vtex_api.journal import JournalSincronizacao, VTEX_JOURNAL_PATH
+from vtex_api.plano import GravadorPlano, aplica_plano
+from vtex_api.sincronizacao import sincroniza_skus, ResumoSincronizacao
 from utils.configure_logging import configure_logging
+from utils import metricas
+from utils.shards import SYNC_SHARDS, le_shard, filtra_shard, caminho_do_shard
 
 # Carrega .env e configura logging com o nome do projeto
 load_dotenv()
 configure_logging(project="SendProductToVtexFromSnk")
 
-def main(client):
+def _catalogo(shard: Optional[tuple[int, int]]):
+    """Pares (id, sku) do catálogo VTEX, só os do shard se houver um."""
+    pares = vtex_iter_id_sku()
+    return filtra_shard(pares, *shard) if shard else pares
+
+
+def _pares_a_processar(journal: JournalSincronizacao, resume: bool, shard: Optional[tuple[int, int]] = None):
+    """Pares (id, sku) da execução: o catálogo todo, ou só os pendentes da execução anterior com --resume."""
+    if resume and journal.pode_retomar():
+        logging.info(f"⏯️ Retomando execução anterior: {journal.resumo()}")
+        if journal.catalogo_completo():
+            return journal.pendentes(journal.catalogo())
+        # a leitura do catálogo foi interrompida: lê de novo, completando o mapa salvo
+        return journal.pendentes(journal.registra_catalogo(_catalogo(shard)))
+    if resume:
+        logging.info("ℹ️ Nenhuma execução para retomar, sincronizando o catálogo todo")
+    journal.inicia()
+    return journal.registra_catalogo(_catalogo(shard))
+
+
+def main(client, delta: bool = False, resume: bool = False,
+         shard: Optional[tuple[int, int]] = None, plano: Optional[str] = None) -> ResumoSincronizacao:
+    """
+    Sincroniza estoques/preços do Sankhya para a VTEX.
+
+    Com `shard=(i, N)` processa só os SKUs do shard i de N (utils.shards), com
+    journal e arquivo de métricas próprios; os limites de requisição são
+    divididos por SYNC_SHARDS.
+
+    Com `plano` (dry-run), busca e compara tudo normalmente mas grava as
+    alterações nesse arquivo (.csv, .jsonl ou .parquet) em vez de enviá-las,
+    sem tocar no estado local nem no journal. O plano pode ser enviado depois
+    com `--apply`.
+    """
     inicio = time.time()
+    if shard:
+        logging.info(f"🧩 Executando shard {shard[0]}/{shard[1]}")
+        if shard[1] != SYNC_SHARDS:
+            logging.warning(f"⚠️ Shard {shard[0]}/{shard[1]} com SYNC_SHARDS={SYNC_SHARDS}: defina SYNC_SHARDS={shard[1]} "
+                            f"para os shards dividirem os limites de requisição")
+    porta_metricas = metricas.METRICS_PORT + shard[0] - 1 if shard and metricas.METRICS_PORT else metricas.METRICS_PORT
+    metricas.inicia_servidor_http(porta_metricas)
+    # notificações saem em resumos por uma thread própria, fora do caminho dos SKUs
+    inicia_dispatcher()
     enviar_notificacao_telegram("🚀 Iniciando integração de estoques/preços para o Vtex")
 
+    gravador = journal = None
+    if plano:
+        gravador = GravadorPlano(caminho_do_shard(plano, *shard) if shard else plano)
+        logging.info(f"📝 Dry-run: nenhuma alteração será enviada para a VTEX, plano em {gravador.caminho}")
+    else:
+        journal = JournalSincronizacao(caminho_do_shard(VTEX_JOURNAL_PATH, *shard) if shard else VTEX_JOURNAL_PATH)
     try:
-        ids_skus = vtex_merge_id_sku_dicts()
-        for id_sku, sku in ids_skus.items():
-            vtex_atualiza_estoque(id_sku, sku, client)
-            vtex_atualiza_preco_venda(id_sku, sku, client)
-    except Exception as e:
-        logging.error(f"❌ Erro ao obter dicionário id_sku: {e}")
-        enviar_notificacao_telegram(f"❌ Erro ao obter dicionário id_sku: {e}")
+        # cada shard tem a sua própria data de reconciliação completa
+        estado = EstadoSincronizacao(escopo=f"shard{shard[0]}-{shard[1]}" if shard else None)
+        if delta and estado.precisa_reconciliar():
+            logging.info("🔁 Reconciliação completa pendente, executando sincronização completa")
+            delta = False
+
+        try:
+            # snapshots do Sankhya; se falharem, cada SKU consulta o seu individualmente
+            por_local = sankhya_fetch_estoque_locais_lote(locais_sankhya(), client)
+            estoques_snk = estoques_por_deposito(por_local) if por_local is not None else None
+            precos_snk = sankhya_fetch_precos_lote(client)
+            # o catálogo VTEX é lido em paralelo e os SKUs entram no pool conforme chegam
+            # (com o espelho, o diff em colunas espera o catálogo inteiro)
+            pares = _catalogo(shard) if journal is None else _pares_a_processar(journal, resume, shard)
+            _, resumo = sincroniza_skus(pares, client, estoques_snk=estoques_snk, precos_snk=precos_snk,
+                                        estado=estado, delta=delta, journal=journal, plano=gravador,
+                                        espelho=get_espelho())
+            if journal is not None:
+                journal.conclui()
+                if not delta:
+                    estado.marca_reconciliacao()
+        except Exception as e:
+            logging.error(f"❌ Erro ao obter dicionário id_sku: {e}")
+            enviar_notificacao_telegram(f"❌ Erro ao obter dicionário id_sku: {e}")
+            raise SystemExit(1)
+
+        fim = time.time()
+        duracao_min = (fim - inicio) / 60
+        logging.info(f"⏱️ Tempo total de execução: {duracao_min:.2f} minutos")
+        enviar_notificacao_telegram(f"📊 Integração finalizada em {duracao_min:.2f} minutos: {resumo}")
+        return resumo
+    finally:
+        if gravador is not None:
+            gravador.fecha()
+        if journal is not None:
+            journal.fecha()
+        for linha in metricas.resumo_tempos():
+            logging.info(f"⏱️ {linha}")
+        textfile = metricas.METRICS_TEXTFILE
+        metricas.grava_textfile(caminho_do_shard(textfile, *shard) if shard and textfile else textfile)
+        encerra_dispatcher()
+
+
+def _executa_shard(shard: tuple[int, int], delta: bool, resume: bool, plano: Optional[str]) -> ResumoSincronizacao:
+    # cada processo tem o seu SankhyaClient (sessão, token e limite de concorrência)
+    return main(SankhyaClient(), delta=delta, resume=resume, shard=shard, plano=plano)
+
+
+def executa_shards(total: int, delta: bool = False, resume: bool = False,
+                   plano: Optional[str] = None) -> ResumoSincronizacao:
+    """
+    Executa os `total` shards em processos locais e soma os resumos. Os filhos
+    herdam SYNC_SHARDS=total, e com isso cada um usa 1/total dos limites de
+    requisição da VTEX e do Sankhya.
+    """
+    inicio = time.time()
+    os.environ["SYNC_SHARDS"] = str(total)
+    # spawn: os filhos importam os módulos de novo e leem os limites já divididos
+    contexto = multiprocessing.get_context("spawn")
+    logging.info(f"🧩 Iniciando {total} shards")
+    resumo = ResumoSincronizacao()
+    falhas = []
+    with ProcessPoolExecutor(total, mp_context=contexto) as executor:
+        futuros = {executor.submit(_executa_shard, (shard, total), delta, resume, plano): shard
+                   for shard in range(1, total + 1)}
+        for futuro, shard in futuros.items():
+            try:
+                resumo_shard = futuro.result()
+            except (Exception, SystemExit) as e:
+                logging.error(f"❌ Shard {shard}/{total} falhou: {e!r}")
+                falhas.append(shard)
+                continue
+            logging.info(f"🧩 Shard {shard}/{total}: {resumo_shard}")
+            resumo = resumo.soma(resumo_shard)
+
+    duracao_min = (time.time() - inicio) / 60
+    mensagem = f"📊 Integração em {total} shards finalizada em {duracao_min:.2f} minutos: {resumo}"
+    if falhas:
+        mensagem += f" | shards com erro: {', '.join(map(str, falhas))}"
+    logging.info(mensagem)
+    inicia_dispatcher()
+    try:
+        enviar_notificacao_telegram(mensagem)
+    finally:
+        encerra_dispatcher()
+    if falhas:
         raise SystemExit(1)
+    return resumo
 
-    fim = time.time()
-    duracao_min = (fim - inicio) / 60
-    logging.info(f"⏱️ Tempo total de execução: {duracao_min:.2f} minutos")
+
+def aplica(caminho: str):
+    """Envia para a VTEX um plano gravado por um --dry-run, sem buscar os SKUs de novo."""
+    inicio = time.time()
+    metricas.inicia_servidor_http()
+    inicia_dispatcher()
+    try:
+        sucessos, falhas = aplica_plano(caminho)
+        duracao_min = (time.time() - inicio) / 60
+        mensagem = (f"📊 Plano {os.path.basename(caminho)} aplicado em {duracao_min:.2f} minutos: "
+                    f"✅ {sucessos} alterações enviadas | ❌ {falhas} com falha")
+        logging.info(mensagem)
+        enviar_notificacao_telegram(mensagem)
+        if falhas:
+            raise SystemExit(1)
+    finally:
+        for linha in metricas.resumo_tempos():
+            logging.info(f"⏱️ {linha}")
+        metricas.grava_textfile()
+        encerra_dispatcher()
 
 
 if __name__ == '__main__':
-    main(client = SankhyaClient())
+    parser = argparse.ArgumentParser(description="Integração de estoques/preços Sankhya → VTEX")
+    parser.add_argument("--delta", action="store_true",
+                        help="consulta a VTEX só para SKUs alterados desde o último envio")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--shard", type=le_shard, metavar="i/N",
+                       help="processa só o shard i de N do catálogo (ex.: 2/4), para dividir a carga entre contêineres")
+    grupo.add_argument("--shards", type=int, metavar="N",
+                       help="executa N shards em processos locais e soma os resumos")
+    # dry-run e apply não usam o journal: --resume não se aplica a eles
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--resume", action="store_true",
+                      help="retoma a execução anterior, pulando os SKUs já concluídos e refazendo os com falha")
+    modo.add_argument("--dry-run", nargs="?", const="plano.jsonl", metavar="PLANO",
+                      help="não escreve na VTEX; grava as alterações em PLANO (.csv, .jsonl ou .parquet, "
+                           "padrão plano.jsonl)")
+    modo.add_argument("--apply", metavar="PLANO",
+                      help="envia para a VTEX as alterações de um plano gravado por --dry-run")
+    args = parser.parse_args()
+
+    if args.apply:
+        aplica(args.apply)
+    elif args.shards and args.shards > 1:
+        executa_shards(args.shards, delta=args.delta, resume=args.resume, plano=args.dry_run)
+    else:
+        main(client = SankhyaClient(), delta=args.delta, resume=args.resume, shard=args.shard, plano=args.dry_run)
 
     # client = SankhyaClient()
     # vtex_atualiza_preco_venda(541, 547, client)
@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Optional
+
+# Limite de caracteres de uma mensagem do Telegram
+TELEGRAM_MAX_CHARS = 4096
+
+# Categorias do resumo, identificadas pelo emoji inicial das mensagens
+CATEGORIAS = OrderedDict([
+    ("❌", "falhas"),
+    ("🔴", "respostas inválidas"),
+    ("⚠️", "avisos"),
+    ("✅", "atualizações"),
+    ("🚨", "divergências"),
+])
+
+
+def categoria(mensagem: str) -> str:
+    for emoji, nome in CATEGORIAS.items():
+        if mensagem.startswith(emoji):
+            return nome
+    return "outras"
+
+
+def monta_resumo(mensagens: list[str], max_mensagens: int = 5) -> list[str]:
+    """
+    Agrupa as mensagens em um resumo ("📊 37 atualizações, 4 falhas") seguido dos
+    detalhes, com falhas primeiro e mensagens repetidas agrupadas em "(xN)".
+    Retorna uma ou mais mensagens de até TELEGRAM_MAX_CHARS caracteres.
+    """
+    por_categoria: dict[str, Counter] = OrderedDict((nome, Counter()) for nome in [*CATEGORIAS.values(), "outras"])
+    for mensagem in mensagens:
+        por_categoria[categoria(mensagem)][mensagem] += 1
+
+    contagem = ", ".join(f"{sum(c.values())} {nome}" for nome, c in por_categoria.items() if c)
+    linhas = [f"📊 Resumo: {contagem}"]
+    for contador in por_categoria.values():
+        for mensagem, vezes in contador.items():
+            linhas.append(f"{mensagem} (x{vezes})" if vezes > 1 else mensagem)
+
+    partes, atual = [], ""
+    for i, linha in enumerate(linhas):
+        linha = linha[:TELEGRAM_MAX_CHARS - 1]
+        if len(atual) + len(linha) + 1 > TELEGRAM_MAX_CHARS:
+            partes.append(atual)
+            atual = ""
+            if len(partes) == max_mensagens:
+                partes[-1] = partes[-1][:TELEGRAM_MAX_CHARS - 60] + f"\n… {len(linhas) - i} linhas omitidas (ver log)"
+                return partes
+        atual = f"{atual}\n{linha}" if atual else linha
+    if atual:
+        partes.append(atual)
+    return partes
+
+
+class NotificationDispatcher:
+    """
+    Envia notificações em segundo plano.
+
+    As mensagens entram em uma fila limitada (sem bloquear quem notifica) e a
+    cada `intervalo` segundos são combinadas em um resumo. Os envios respeitam um
+    intervalo mínimo entre mensagens para não esbarrar no limite do Telegram.
+    Uma parte recusada fica guardada (até `max_pendentes`) e vai no próximo ciclo.
+    """
+
+    def __init__(self, enviar: Callable[[str], bool], intervalo: float = 30.0,
+                 tamanho_fila: int = 10_000, intervalo_envio: float = 3.0, max_pendentes: int = 5):
+        self._enviar = enviar
+        self.intervalo = intervalo
+        self.intervalo_envio = intervalo_envio
+        self._fila: queue.Queue = queue.Queue(maxsize=tamanho_fila)
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ultimo_envio = 0.0
+        self.descartadas = 0
+        self.max_pendentes = max_pendentes
+        self._pendentes: list[str] = []
+
+    def inicia(self):
+        self._thread = threading.Thread(target=self._loop, name="telegram-dispatcher", daemon=True)
+        self._thread.start()
+
+    def enfileira(self, mensagem: str) -> bool:
+        try:
+            self._fila.put_nowait(mensagem)
+            return True
+        except queue.Full:
+            self.descartadas += 1
+            logging.warning(f"⚠️ Fila de notificações cheia, mensagem descartada: {mensagem}")
+            return False
+
+    def _drena(self) -> list[str]:
+        mensagens = []
+        while True:
+            try:
+                mensagens.append(self._fila.get_nowait())
+            except queue.Empty:
+                return mensagens
+
+    def _envia_resumo(self, mensagens: list[str]):
+        partes, self._pendentes = self._pendentes, []
+        if not mensagens and not partes:
+            return
+        # uma mensagem isolada vai como está, sem cabeçalho de resumo
+        if len(mensagens) == 1:
+            partes.append(mensagens[0][:TELEGRAM_MAX_CHARS])
+        elif mensagens:
+            partes += monta_resumo(mensagens)
+        if self.descartadas:
+            aviso = f"⚠️ {self.descartadas} notificações descartadas por fila cheia"
+            self.descartadas = 0
+            # o aviso só vai junto da última parte se ela continuar dentro do limite do Telegram
+            if len(partes[-1]) + len(aviso) + 1 <= TELEGRAM_MAX_CHARS:
+                partes[-1] += f"\n{aviso}"
+            else:
+                partes.append(aviso)
+        for parte in partes:
+            espera = self._ultimo_envio + self.intervalo_envio - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            try:
+                enviada = self._enviar(parte)
+            except Exception as e:
+                logging.error(f"❌ Erro ao enviar resumo de notificações: {e}")
+                enviada = False
+            self._ultimo_envio = time.monotonic()
+            if not enviada:
+                self._guarda_pendente(parte)
+
+    def _guarda_pendente(self, parte: str):
+        """Guarda a parte recusada para o próximo ciclo, descartando a mais antiga acima do limite."""
+        self._pendentes.append(parte)
+        logging.warning(f"⚠️ Resumo de notificações não enviado, nova tentativa no próximo ciclo: {parte[:200]}")
+        if len(self._pendentes) > self.max_pendentes:
+            perdida = self._pendentes.pop(0)
+            logging.error(f"❌ Resumo de notificações descartado após falhas seguidas: {perdida}")
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            self._envia_resumo(self._drena())
+        self._envia_resumo(self._drena())
+        if self._pendentes:
+            logging.error(f"❌ {len(self._pendentes)} resumos de notificações não enviados ao encerrar")
+
+    def para(self, timeout: float = 30.0):
+        """Envia o que estiver na fila e encerra a thread."""
+        if self._thread is None:
+            return
+        self._parar.set()
+        self._thread.join(timeout)
+        self._thread = None
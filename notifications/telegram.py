@@ -1,9 +1,16 @@
+import atexit
 import logging
 
 import requests
 import os
+import threading
+import time
+from typing import Optional
 from dotenv import load_dotenv
 
+from notifications.dispatcher import NotificationDispatcher
+from utils.http_session import get_session, http_timeout
+
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
@@ -13,27 +20,93 @@ logging.basicConfig(
 )
 
 
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+
+# Segundos entre resumos e entre mensagens enviadas pelo dispatcher em segundo plano
+TELEGRAM_DIGEST_INTERVAL = float(os.getenv("TELEGRAM_DIGEST_INTERVAL", "30"))
+TELEGRAM_MIN_INTERVAL = float(os.getenv("TELEGRAM_MIN_INTERVAL", "3"))
+TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "10000"))
+# Reenvios de uma mensagem recusada com 429, esperando o retry_after indicado pelo Telegram
+TELEGRAM_RATE_LIMIT_RETRIES = int(os.getenv("TELEGRAM_RATE_LIMIT_RETRIES", "3"))
+
+_dispatcher: Optional[NotificationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def inicia_dispatcher():
+    """
+    Passa a enviar as notificações em segundo plano, agrupadas em resumos.
+    Enquanto ativo, enviar_notificacao_telegram apenas enfileira a mensagem.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher(_envia_telegram, TELEGRAM_DIGEST_INTERVAL,
+                                                 TELEGRAM_QUEUE_SIZE, TELEGRAM_MIN_INTERVAL)
+            _dispatcher.inicia()
+            atexit.register(encerra_dispatcher)
+
+
+def encerra_dispatcher():
+    """Envia as notificações pendentes e volta ao envio síncrono."""
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        dispatcher.para()
+
+
 # Função para enviar notificação para o Telegram
 def enviar_notificacao_telegram(mensagem):
+    if not mensagem:
+        return False
+    dispatcher = _dispatcher
+    if dispatcher is not None:
+        return dispatcher.enfileira(mensagem)
+    return _envia_telegram(mensagem)
+
+
+def _envia_telegram(mensagem) -> bool:
     token = os.getenv('BOTTOKEN')  # Seu Token do Bot
     chat_id = os.getenv('CHATID')  # O chat_id do destinatário
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    url = f"{TELEGRAM_API_URL}/bot{token}/sendMessage"
 
-    # Dados a serem enviados
+    # Texto puro: os resumos juntam mensagens livres (ids de depósito, erros) que
+    # quebrariam o parse_mode Markdown com um "_" ou "*" sem par
     payload = {
         'chat_id': chat_id,
         'text': mensagem,
-        'parse_mode': 'Markdown'
     }
 
     # Enviar a requisição para o Telegram
-    try:
-        response = requests.post(url, data=payload)
-        if response.status_code == 200:
-            logging.info("Notificação enviada com sucesso!")
-        else:
+    for tentativa in range(TELEGRAM_RATE_LIMIT_RETRIES + 1):
+        try:
+            response = get_session("telegram", pool_size=2).post(url, data=payload, timeout=http_timeout(10))
+            if response.status_code == 200:
+                logging.info("Notificação enviada com sucesso!")
+                return True
+            if response.status_code == 429 and tentativa < TELEGRAM_RATE_LIMIT_RETRIES:
+                espera = _retry_after(response)
+                logging.warning(f"⏳ Limite do Telegram atingido, reenviando em {espera:.0f}s")
+                time.sleep(espera)
+                continue
             logging.warning(f"Falha ao enviar notificação: {response.status_code}")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Ocorreu um erro: {e}")
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Ocorreu um erro: {e}")
+        return False
+    return False
+
+
+def _retry_after(response) -> float:
+    """Segundos pedidos pelo Telegram em parameters.retry_after, ou no header Retry-After."""
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return TELEGRAM_MIN_INTERVAL
+
 
 
@@ -1,13 +1,20 @@
+import asyncio
 import logging
 import os
+import threading
 import time
 from typing import Optional, Any
 
-import requests
+import httpx
 from dotenv import load_dotenv
 from requests import RequestException, Timeout
 from json.decoder import JSONDecodeError
 from notifications.telegram import enviar_notificacao_telegram
+from utils.http_session import get_session, http_timeout, get_async_client, semaforo_async, request_async, \
+    http_timeout_async
+from utils.shards import fatia
+from utils.metricas import SANKHYA_REQUISICAO_SEGUNDOS, SANKHYA_REQUISICOES, SANKHYA_RETENTATIVAS, \
+    SANKHYA_RENOVACOES_TOKEN
 
 load_dotenv()
 
@@ -19,26 +26,53 @@ PASSWORD = os.getenv("SANKHYA_PASSWORD")
 # ----------------------------------------------------------------------------
 # 🔧 Configurações iniciais
 # ----------------------------------------------------------------------------
-BASE_MGE_URL     = "https://api.sankhya.com.br/gateway/v1/mge/service.sbr"
-BASE_MGECOM_URL  = "https://api.sankhya.com.br/gateway/v1/mgecom/service.sbr"
+SANKHYA_BASE_URL = os.getenv("SANKHYA_BASE_URL", "https://api.sankhya.com.br").rstrip("/")
+LOGIN_URL        = f"{SANKHYA_BASE_URL}/login"
+BASE_MGE_URL     = f"{SANKHYA_BASE_URL}/gateway/v1/mge/service.sbr"
+BASE_MGECOM_URL  = f"{SANKHYA_BASE_URL}/gateway/v1/mgecom/service.sbr"
 HEADERS_BASE     = {"Content-Type": "application/json"}
+# Máximo de requisições simultâneas ao Sankhya por cliente (dividido entre os SYNC_SHARDS processos)
+SANKHYA_MAX_CONCURRENCY = fatia(int(os.getenv("SANKHYA_MAX_CONCURRENCY", "4")))
+# O token dura 15 minutos; consideramos 90% disso (13,5 min) e uma thread o renova
+# SANKHYA_TOKEN_REFRESH_AHEAD segundos antes, para nenhuma requisição esperar pelo login
+SANKHYA_TOKEN_TTL = (15 * 60) * 0.9
+SANKHYA_TOKEN_REFRESH_AHEAD = float(os.getenv("SANKHYA_TOKEN_REFRESH_AHEAD", "60"))
 
 # ----------------------------------------------------------------------------
 # 🔐 Cliente Sankhya com autenticação automática e refresh
 # ----------------------------------------------------------------------------
 class SankhyaClient:
-    def __init__(self):
+    """
+    Cliente Sankhya compartilhado entre threads.
+
+    O login é single-flight: quem encontra o token vencido (ou recebe 401) chama
+    _renova_token com a geração do token que usou; só o primeiro a pegar o lock
+    faz login, os demais esperam e reaproveitam o token novo. Uma thread renova o
+    token antes de expirar, então o caminho normal nunca espera pelo login.
+    """
+
+    def __init__(self, renovacao_antecipada: bool = True):
         self.token: Optional[str] = None
         self.token_expiry: float    = 0.0
         self.headers: dict          = {}
         self.timeout: int           = 120
+        self._semaforo              = threading.BoundedSemaphore(SANKHYA_MAX_CONCURRENCY)
+        self._sessao                = get_session("sankhya", pool_size=SANKHYA_MAX_CONCURRENCY)
+        self._token_lock            = threading.Lock()
+        self._geracao_token: int    = 0
+        self._parar                 = threading.Event()
 
         # autentica pela primeira vez
         self._authenticate()
 
+        self._renovador: Optional[threading.Thread] = None
+        if renovacao_antecipada:
+            self._renovador = threading.Thread(target=self._loop_renovacao, name="sankhya-token", daemon=True)
+            self._renovador.start()
+
     def _authenticate(self):
         """Faz login e atualiza self.token, self.token_expiry e self.headers."""
-        login_url = "https://api.sankhya.com.br/login"
+        login_url = LOGIN_URL
         auth_headers = {
             "token":    TOKEN,
             "appkey":   APPKEY,
@@ -48,7 +82,7 @@ class SankhyaClient:
 
         try:
             logging.info("🔐 Autenticando na API da Sankhya...")
-            resp = requests.post(login_url, headers=auth_headers, timeout=self.timeout)
+            resp = self._sessao.post(login_url, headers=auth_headers, timeout=http_timeout(self.timeout))
             resp.raise_for_status()
 
             data = resp.json()
@@ -56,24 +90,73 @@ class SankhyaClient:
             if not bearer:
                 raise ValueError("Bearer token não encontrado na resposta.")
 
-            # atualiza token e cabeçalhos
+            # atualiza token e cabeçalhos (headers é trocado de uma vez, nunca alterado)
             self.token   = bearer
             self.headers = {**HEADERS_BASE, "Authorization": f"Bearer {self.token}"}
+            self._geracao_token += 1
 
             # expira em 15 minutos, com 10% de folga (i.e. 13.5 min)
-            self.token_expiry = time.time() + (15 * 60) * 0.9
+            self.token_expiry = time.time() + SANKHYA_TOKEN_TTL
+            SANKHYA_RENOVACOES_TOKEN.inc(resultado="ok")
             logging.debug(f"✅ Token válido até {time.ctime(self.token_expiry)}")
 
         except Exception as e:
+            SANKHYA_RENOVACOES_TOKEN.inc(resultado="falha")
             logging.error(f"❌ Erro ao autenticar: {e}", exc_info=True)
             enviar_notificacao_telegram("❌ Não foi possível autenticar na API do Sankhya")
             raise
 
+    def _token_valido(self) -> bool:
+        return bool(self.token) and time.time() < self.token_expiry
+
+    def _renova_token(self, geracao: int):
+        """
+        Faz login, a menos que outra thread já tenha renovado o token da `geracao`
+        informada enquanto esta esperava pelo lock.
+        """
+        with self._token_lock:
+            if self._geracao_token != geracao:
+                return
+            self._authenticate()
+
     def _ensure_token_valid(self):
         """Reloga se não tiver token ou se já tiver expirado."""
-        if not self.token or time.time() >= self.token_expiry:
+        geracao = self._geracao_token
+        if not self._token_valido():
             logging.info("🔄 Token expirado ou ausente, realizando novo login...")
-            self._authenticate()
+            self._renova_token(geracao)
+
+    async def garante_token_async(self):
+        """
+        _ensure_token_valid para código asyncio: com token válido retorna sem
+        bloquear; senão aguarda o login (single-flight) em uma thread do executor.
+        """
+        if not self._token_valido():
+            await asyncio.get_running_loop().run_in_executor(None, self._ensure_token_valid)
+
+    async def _renova_token_async(self, geracao: int):
+        await asyncio.get_running_loop().run_in_executor(None, self._renova_token, geracao)
+
+    def _loop_renovacao(self):
+        """Renova o token SANKHYA_TOKEN_REFRESH_AHEAD segundos antes de expirar."""
+        falhas = 0
+        espera = max(1.0, self.token_expiry - SANKHYA_TOKEN_REFRESH_AHEAD - time.time())
+        while not self._parar.wait(espera):
+            try:
+                logging.debug("🔄 Renovando token do Sankhya antes de expirar")
+                self._renova_token(self._geracao_token)
+                falhas = 0
+                espera = max(1.0, self.token_expiry - SANKHYA_TOKEN_REFRESH_AHEAD - time.time())
+            except Exception:
+                # _authenticate já logou; as requisições seguem com o token atual enquanto valer
+                falhas += 1
+                espera = min(60.0, 2.0 ** falhas)
+
+    def fechar(self):
+        """Encerra a thread de renovação do token."""
+        self._parar.set()
+        if self._renovador is not None:
+            self._renovador.join(timeout=5)
 
     def _build_url(self, service_name: str) -> str:
         base = BASE_MGECOM_URL if service_name.startswith((
@@ -81,6 +164,23 @@ class SankhyaClient:
         )) else BASE_MGE_URL
         return f"{base}?serviceName={service_name}&outputType=json"
 
+    def _envia(self, metodo: str, service_name: str, url: str, payload: dict):
+        """
+        Uma tentativa de chamada, dentro do limite de concorrência e medida por serviço.
+        Guarda em resp.geracao_token a geração do token usado, para o refresh após 401.
+        """
+        with self._semaforo, SANKHYA_REQUISICAO_SEGUNDOS.mede(servico=service_name):
+            geracao, headers = self._geracao_token, self.headers
+            try:
+                resp = self._sessao.request(metodo, url, headers=headers, json=payload,
+                                            timeout=http_timeout(self.timeout))
+            except RequestException:
+                SANKHYA_REQUISICOES.inc(servico=service_name, status="erro")
+                raise
+        SANKHYA_REQUISICOES.inc(servico=service_name, status=resp.status_code)
+        resp.geracao_token = geracao
+        return resp
+
     def get(self, payload: dict) -> Optional[Any]:
         """
         GET para os serviços Sankhya (mge e mgecom), com retry e refresh de token.
@@ -98,18 +198,14 @@ class SankhyaClient:
             self._ensure_token_valid()
 
             try:
-                resp = requests.get(
-                    url,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=self.timeout
-                )
+                resp = self._envia("GET", service_name, url, payload)
                 logging.debug(f"🔎 {service_name} status {resp.status_code} tentativa {attempt}/{max_retries}")
 
                 # se 401, renova token e repete
                 if resp.status_code == 401:
                     logging.warning("⚠️ 401 Unauthorized, renovando token e repetindo...")
-                    self._authenticate()
+                    SANKHYA_RETENTATIVAS.inc(servico=service_name, motivo="401")
+                    self._renova_token(resp.geracao_token)
                     continue
 
                 resp.raise_for_status()
@@ -127,6 +223,7 @@ class SankhyaClient:
                     logging.error(f"❌ Timeout após {max_retries} tentativas.")
                     enviar_notificacao_telegram(f"❌ Timeout ao chamar {service_name}")
                     raise
+                SANKHYA_RETENTATIVAS.inc(servico=service_name, motivo="timeout")
                 # backoff exponencial
                 time.sleep(2 ** (attempt - 1))
 
@@ -151,11 +248,12 @@ class SankhyaClient:
         # garante token fresh
         self._ensure_token_valid()
 
-        resp = requests.post(url, headers=self.headers, json=payload, timeout=self.timeout)
+        resp = self._envia("POST", service_name, url, payload)
         if resp.status_code == 401:
             logging.warning("⚠️ 401 Unauthorized ao POST, renovando token e repetindo...")
-            self._authenticate()
-            resp = requests.post(url, headers=self.headers, json=payload, timeout=self.timeout)
+            SANKHYA_RETENTATIVAS.inc(servico=service_name, motivo="401")
+            self._renova_token(resp.geracao_token)
+            resp = self._envia("POST", service_name, url, payload)
 
         try:
             resp.raise_for_status()
@@ -166,5 +264,98 @@ class SankhyaClient:
             return None
         except RequestException as e:
             logging.error(f"🚨 Erro HTTP no POST {service_name}: {e}", exc_info=True)
-            enviar_notificacao_telegram(f"🚨 Erro HTTP no POST {service_name}: {e}", exc_info=True)
+            enviar_notificacao_telegram(f"🚨 Erro HTTP no POST {service_name}: {e}")
+            return None
+
+    # ------------------------------------------------------------------------
+    # asyncio: mesmas regras de retry e 401 de get/post, com o token compartilhado
+    # ------------------------------------------------------------------------
+    async def _envia_async(self, metodo: str, service_name: str, url: str, payload: dict):
+        async with semaforo_async("sankhya", SANKHYA_MAX_CONCURRENCY):
+            with SANKHYA_REQUISICAO_SEGUNDOS.mede(servico=service_name):
+                geracao, headers = self._geracao_token, self.headers
+                try:
+                    resp = await request_async(get_async_client("sankhya", SANKHYA_MAX_CONCURRENCY), metodo, url,
+                                               headers=headers, json=payload, timeout=http_timeout_async(self.timeout))
+                except httpx.HTTPError:
+                    SANKHYA_REQUISICOES.inc(servico=service_name, status="erro")
+                    raise
+        SANKHYA_REQUISICOES.inc(servico=service_name, status=resp.status_code)
+        resp.geracao_token = geracao
+        return resp
+
+    async def get_async(self, payload: dict) -> Optional[Any]:
+        """get() para código asyncio."""
+        service_name = payload.get("serviceName")
+        if not service_name:
+            raise ValueError("Payload precisa conter 'serviceName'.")
+
+        url = self._build_url(service_name)
+        max_retries = 5
+
+        for attempt in range(1, max_retries + 1):
+            await self.garante_token_async()
+            resp = None
+            try:
+                resp = await self._envia_async("GET", service_name, url, payload)
+                logging.debug(f"🔎 {service_name} status {resp.status_code} tentativa {attempt}/{max_retries}")
+
+                if resp.status_code == 401:
+                    logging.warning("⚠️ 401 Unauthorized, renovando token e repetindo...")
+                    SANKHYA_RETENTATIVAS.inc(servico=service_name, motivo="401")
+                    await self._renova_token_async(resp.geracao_token)
+                    continue
+
+                resp.raise_for_status()
+                text = resp.text.strip()
+                if not text.startswith(("{", "[")):
+                    logging.error(f"🔴 Esperava JSON mas recebi:\n{text!r}")
+                    enviar_notificacao_telegram(f"🔴 Esperava JSON mas recebi:\n{text!r}")
+                    return None
+
+                return resp.json()
+
+            except httpx.TimeoutException:
+                logging.warning(f"⏱️ Timeout {attempt}/{max_retries} para {service_name}")
+                if attempt == max_retries:
+                    logging.error(f"❌ Timeout após {max_retries} tentativas.")
+                    enviar_notificacao_telegram(f"❌ Timeout ao chamar {service_name}")
+                    raise
+                SANKHYA_RETENTATIVAS.inc(servico=service_name, motivo="timeout")
+                await asyncio.sleep(2 ** (attempt - 1))
+
+            except httpx.HTTPError as e:
+                logging.error(f"🚨 Erro na requisição de {service_name}: {e}", exc_info=True)
+                if resp is not None:
+                    logging.error(f"🚨 Response body: {resp.text!r}")
+                raise
+
+        return None
+
+    async def post_async(self, payload: dict) -> Optional[Any]:
+        """post() para código asyncio."""
+        service_name = payload.get("serviceName")
+        if not service_name:
+            raise ValueError("Payload precisa conter 'serviceName'.")
+
+        url = self._build_url(service_name)
+        await self.garante_token_async()
+
+        resp = await self._envia_async("POST", service_name, url, payload)
+        if resp.status_code == 401:
+            logging.warning("⚠️ 401 Unauthorized ao POST, renovando token e repetindo...")
+            SANKHYA_RETENTATIVAS.inc(servico=service_name, motivo="401")
+            await self._renova_token_async(resp.geracao_token)
+            resp = await self._envia_async("POST", service_name, url, payload)
+
+        try:
+            resp.raise_for_status()
+            return resp.json()
+        except JSONDecodeError:
+            logging.error(f"❌ JSON inválido no POST {service_name}: {resp.text!r}")
+            enviar_notificacao_telegram(f"❌ JSON inválido no POST {service_name}: {resp.text!r}")
+            return None
+        except httpx.HTTPError as e:
+            logging.error(f"🚨 Erro HTTP no POST {service_name}: {e}", exc_info=True)
+            enviar_notificacao_telegram(f"🚨 Erro HTTP no POST {service_name}: {e}")
             return None
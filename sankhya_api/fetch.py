@@ -1,72 +1,188 @@
+import asyncio
 import json
 import logging
+import os
 import time
 from typing import Optional, Any
 
+import httpx
 import requests
 
 from notifications.telegram import enviar_notificacao_telegram
+from sankhya_api.utils import execute_query
 
+# Tabelas de preço (CODTAB) equivalentes a PRECOBASE e Preço_PROMO_1 do consultaProdutos.
+# Sem elas configuradas o preço continua sendo consultado produto a produto.
+SANKHYA_CODTAB_VENDA = os.getenv("SANKHYA_CODTAB_VENDA")
+SANKHYA_CODTAB_PROMO = os.getenv("SANKHYA_CODTAB_PROMO")
+# Quantidade de CODPRODs por cláusula IN (o Oracle aceita no máximo 1000)
+MAX_CODPRODS_POR_QUERY = 500
 
-def sankhya_fetch_estoque(codprod: int, codemp: int, local: int, client, tentativas: int = 3) -> Optional[int]:
+
+def _load_records_linhas(entities: dict) -> list[dict]:
     """
-    Consulta o estoque de um produto no Sankhya com tentativas de retry em caso de falha.
+    Normaliza o bloco 'entities' do loadRecords em uma lista de {fN: valor}.
+    O Sankhya devolve um dict quando há um único registro e uma lista quando há vários.
     """
-    payload = {
+    entity = entities.get("entity") or []
+    if isinstance(entity, dict):
+        entity = [entity]
+    return [{campo: (valor or {}).get("$") for campo, valor in linha.items()} for linha in entity]
+
+
+def _payload_pagina(data_set: dict, pagina: int) -> dict:
+    return {
         "serviceName": "CRUDServiceProvider.loadRecords",
-        "requestBody": {
-            "dataSet": {
-                "rootEntity": "Estoque",
-                "includePresentationFields": "S",
-                "offsetPage": "0",
-                "criteria": {
-                    "expression": {
-                        "$": f"this.CODPROD = {codprod} AND this.CODEMP = {codemp} AND this.CODLOCAL = {local}"
-                    },
-                    "parameter": [
-                        {
-                            "$": "24",
-                            "type": "I"
-                        }
-                    ]
-                },
-                "entity": {
-                    "fieldset": {
-                        "list": "CODPROD, ESTOQUE"
-                    }
-                }
-            }
-        }
+        "requestBody": {"dataSet": {**data_set, "offsetPage": str(pagina)}},
     }
 
-    for tentativa in range(1, tentativas + 1):
-        try:
-            response = client.post(payload)
-            body = response.get("responseBody", {}).get("entities", {})
 
-            total = int(body.get("total", "0"))
-            if total == 0:
-                logging.info(f"📦 Produto {codprod} → Estoque: 0 no Sankhya")
-                return 0
+def _load_records_paginas(data_set: dict, client, tentativas: int, descricao: str) -> Optional[list[dict]]:
+    """
+    Busca todas as páginas de um loadRecords (offsetPage 0, 1, ...) e junta as linhas.
+    Cada página tem até `tentativas` tentativas; retorna None se alguma falhar.
+    """
+    todas: list[dict] = []
+    pagina = 0
+    while True:
+        payload = _payload_pagina(data_set, pagina)
+        for tentativa in range(1, tentativas + 1):
+            try:
+                response = client.post(payload)
+                entities = response.get("responseBody", {}).get("entities", {})
+                linhas = _load_records_linhas(entities)
+                break
+            except Exception as e:
+                logging.warning(f"⚠️ Tentativa {tentativa}/{tentativas} falhou ao carregar página {pagina} do {descricao}: {e}")
+        else:
+            logging.error(f"❌ Todas as tentativas falharam ao carregar página {pagina} do {descricao}")
+            enviar_notificacao_telegram(f"❌ Todas as tentativas falharam ao carregar página {pagina} do {descricao}")
+            return None
 
-            entity = body.get("entity", {})
-            estoque = entity.get("f1", {}).get("$", "0")
+        todas += linhas
+        logging.debug(f"📦 Página {pagina} do {descricao}: {len(linhas)} linhas")
+        if str(entities.get("hasMoreResult", "false")).lower() != "true" or not linhas:
+            break
+        pagina += 1
 
-            estoque_formatado = int(float(estoque))
-            logging.info(f"📦 Estoque Sankhya: Codprod: {codprod} | Estoque: {estoque_formatado}")
-            return estoque_formatado
+    logging.debug(f"📦 {descricao}: {len(todas)} linhas em {pagina + 1} páginas")
+    return todas
 
-        except Exception as e:
-            logging.warning(f"⚠️ Tentativa {tentativa}/{tentativas} falhou ao consultar estoque do produto {codprod}: {e}")
 
-    logging.error(f"❌ Todas as tentativas falharam ao consultar estoque do produto {codprod}")
-    enviar_notificacao_telegram(f"❌ Todas as tentativas falharam ao consultar estoque do produto {codprod}")
-    return None
+async def _load_records_paginas_async(data_set: dict, client, tentativas: int, descricao: str) -> Optional[list[dict]]:
+    """_load_records_paginas com client.post_async."""
+    todas: list[dict] = []
+    pagina = 0
+    while True:
+        payload = _payload_pagina(data_set, pagina)
+        for tentativa in range(1, tentativas + 1):
+            try:
+                response = await client.post_async(payload)
+                entities = response.get("responseBody", {}).get("entities", {})
+                linhas = _load_records_linhas(entities)
+                break
+            except Exception as e:
+                logging.warning(f"⚠️ Tentativa {tentativa}/{tentativas} falhou ao carregar página {pagina} do {descricao}: {e}")
+        else:
+            logging.error(f"❌ Todas as tentativas falharam ao carregar página {pagina} do {descricao}")
+            enviar_notificacao_telegram(f"❌ Todas as tentativas falharam ao carregar página {pagina} do {descricao}")
+            return None
 
+        todas += linhas
+        if str(entities.get("hasMoreResult", "false")).lower() != "true" or not linhas:
+            break
+        pagina += 1
 
-def sankhya_fetch_preco_venda(codprod: int, client) -> Optional[tuple[Optional[Any], Optional[Any]]]:
-    logging.info(f"🟢 Buscando dados de preço de venda no Sankhya para o produto {codprod}")
-    payload = {
+    logging.debug(f"📦 {descricao}: {len(todas)} linhas em {pagina + 1} páginas")
+    return todas
+
+
+# Só o estoque próprio (TIPO 'P', sem parceiro), como no saldo de um produto sem controle;
+# estoque de terceiros e em poder de terceiros fica de fora
+_FILTRO_ESTOQUE_PROPRIO = "this.TIPO = 'P' AND this.CODPARC = 0"
+
+
+def _expressao_locais(locais: list[tuple[int, int]]) -> str:
+    locais_ou = " OR ".join(f"(this.CODEMP = {codemp} AND this.CODLOCAL = {codlocal})" for codemp, codlocal in locais)
+    return f"{_FILTRO_ESTOQUE_PROPRIO} AND ({locais_ou})"
+
+
+def _estoques_por_local(linhas: list[dict]) -> dict[int, dict[tuple[int, int], int]]:
+    """Linhas CODPROD, CODEMP, CODLOCAL, ESTOQUE → {codprod: {(codemp, codlocal): estoque}}."""
+    estoques: dict[int, dict[tuple[int, int], int]] = {}
+    for linha in linhas:
+        por_local = estoques.setdefault(int(linha["f0"]), {})
+        local = (int(linha["f1"]), int(linha["f2"]))
+        # produto com controle (lote, grade) tem uma linha por controle no local: soma todas
+        por_local[local] = por_local.get(local, 0) + int(float(linha.get("f3") or 0))
+    return estoques
+
+
+def sankhya_fetch_estoque_locais(codprod: int, locais: list[tuple[int, int]], client,
+                                 tentativas: int = 3) -> Optional[dict[tuple[int, int], int]]:
+    """
+    Consulta o estoque de um produto em vários (CODEMP, CODLOCAL) com uma única consulta.
+
+    Returns:
+        dict: {(codemp, codlocal): estoque}, sem os locais onde o produto não tem
+              registro, ou None se todas as tentativas falharem
+    """
+    linhas = _load_records_paginas(_data_set_estoque_produto(codprod, locais), client, tentativas,
+                                   f"estoque do produto {codprod}")
+    return _estoque_do_produto(codprod, linhas)
+
+
+async def sankhya_fetch_estoque_locais_async(codprod: int, locais: list[tuple[int, int]], client,
+                                             tentativas: int = 3) -> Optional[dict[tuple[int, int], int]]:
+    """sankhya_fetch_estoque_locais para código asyncio."""
+    linhas = await _load_records_paginas_async(_data_set_estoque_produto(codprod, locais), client, tentativas,
+                                               f"estoque do produto {codprod}")
+    return _estoque_do_produto(codprod, linhas)
+
+
+def _data_set_estoque_produto(codprod: int, locais: list[tuple[int, int]]) -> dict:
+    return {
+        "rootEntity": "Estoque",
+        "includePresentationFields": "N",
+        "criteria": {"expression": {"$": f"this.CODPROD = {codprod} AND {_expressao_locais(locais)}"}},
+        "entity": {"fieldset": {"list": "CODPROD, CODEMP, CODLOCAL, ESTOQUE"}},
+    }
+
+
+def _estoque_do_produto(codprod: int, linhas: Optional[list[dict]]) -> Optional[dict[tuple[int, int], int]]:
+    if linhas is None:
+        return None
+    estoque = _estoques_por_local(linhas).get(int(codprod), {})
+    logging.info(f"📦 Estoque Sankhya: Codprod: {codprod} | "
+                 + (", ".join(f"{e}/{l} = {q}" for (e, l), q in sorted(estoque.items())) or "sem estoque"))
+    return estoque
+
+
+def sankhya_fetch_estoque_locais_lote(locais: list[tuple[int, int]], client,
+                                      tentativas: int = 3) -> Optional[dict[int, dict[tuple[int, int], int]]]:
+    """
+    Carrega o estoque de todos os produtos em vários (CODEMP, CODLOCAL) em uma
+    única consulta paginada ao loadRecords.
+
+    Returns:
+        dict: {codprod: {(codemp, codlocal): estoque}} ou None se alguma página falhar
+    """
+    data_set = {
+        "rootEntity": "Estoque",
+        "includePresentationFields": "N",
+        "criteria": {"expression": {"$": _expressao_locais(locais)}},
+        "entity": {"fieldset": {"list": "CODPROD, CODEMP, CODLOCAL, ESTOQUE"}},
+    }
+    linhas = _load_records_paginas(data_set, client, tentativas, "estoque dos locais")
+    if linhas is None:
+        return None
+    estoques = _estoques_por_local(linhas)
+    logging.info(f"📦 Estoque Sankhya carregado em lote: {len(estoques)} produtos em {len(locais)} locais")
+    return estoques
+
+
+def _payload_consulta_produto(codprod: int) -> dict:
+    return {
         "serviceName": "ConsultaProdutosSP.consultaProdutos",
         "requestBody": {
             "filtros": {
@@ -81,8 +197,49 @@ def sankhya_fetch_preco_venda(codprod: int, client) -> Optional[tuple[Optional[A
         }
     }
 
+
+def _preco_venda_da_resposta(response) -> Optional[tuple[Optional[Any], Optional[Any]]]:
+    """(preço base, preço promocional) da resposta do consultaProdutos, ou None se inválida."""
+    if not isinstance(response, dict):
+        logging.error(f"🔴 Esperava JSON de dict, mas recebi: {response!r}")
+        enviar_notificacao_telegram(f"🔴 Esperava JSON de dict, mas recebi: {response!r}")
+        return None
+
+    resp_body = response.get("responseBody")
+    if not isinstance(resp_body, dict):
+        logging.error(f"🔴 Sem 'responseBody' válido: {resp_body!r}")
+        enviar_notificacao_telegram(f"🔴 Sem 'responseBody' válido: {resp_body!r}")
+        return None
+
+    produtos = resp_body.get("produtos")
+    if not isinstance(produtos, dict):
+        logging.error(f"🔴 Sem 'produtos' válido: {produtos!r}")
+        enviar_notificacao_telegram(logging.error(f"🔴 Sem 'produtos' válido: {produtos!r}"))
+        return None
+
+    produto = produtos.get("produto")
+    if not isinstance(produto, dict):
+        logging.error(f"🔴 Sem 'produto' válido: {produto!r}")
+        enviar_notificacao_telegram(f"🔴 Sem 'produto' válido: {produto!r}")
+        return None
+
+    preco = produto.get("PRECOBASE", {}).get("$")
+    preco_promo = produto.get("Preço_PROMO_1", {}).get("$")
+
+    logging.info(f"Preço {preco}, Promo {preco_promo}")
+
+    return preco, preco_promo
+
+
+def sankhya_fetch_preco_venda(codprod: int, client) -> Optional[tuple[Optional[Any], Optional[Any]]]:
+    logging.info(f"🟢 Buscando dados de preço de venda no Sankhya para o produto {codprod}")
+    payload = _payload_consulta_produto(codprod)
+
     max_retries = 5
     for attempt in range(1, max_retries + 1):
+        if attempt > 1:
+            # backoff exponencial entre as tentativas
+            time.sleep(2 ** (attempt - 2))
         try:
             response = client.post(payload)
         except requests.exceptions.ReadTimeout:
@@ -93,41 +250,115 @@ def sankhya_fetch_preco_venda(codprod: int, client) -> Optional[tuple[Optional[A
             enviar_notificacao_telegram(f"❌ Erro inesperado na tentativa {attempt}/{max_retries} para CODPROD {codprod}: {e}")
             continue
 
-        if not isinstance(response, dict):
-            logging.error(f"🔴 Esperava JSON de dict, mas recebi: {response!r}")
-            enviar_notificacao_telegram(f"🔴 Esperava JSON de dict, mas recebi: {response!r}")
-            continue
+        precos = _preco_venda_da_resposta(response)
+        if precos is not None:
+            return precos
 
-        resp_body = response.get("responseBody")
-        if not isinstance(resp_body, dict):
-            logging.error(f"🔴 Sem 'responseBody' válido: {resp_body!r}")
-            enviar_notificacao_telegram(f"🔴 Sem 'responseBody' válido: {resp_body!r}")
-            continue
-
-        produtos = resp_body.get("produtos")
-        if not isinstance(produtos, dict):
-            logging.error(f"🔴 Sem 'produtos' válido: {produtos!r}")
-            enviar_notificacao_telegram(logging.error(f"🔴 Sem 'produtos' válido: {produtos!r}"))
-            continue
+    logging.error(f"❌ Não consegui obter preço de venda para {codprod} após {max_retries} tentativas")
+    enviar_notificacao_telegram(f"❌ Não consegui obter preço de venda para {codprod} após {max_retries} tentativas")
+    return None
 
-        produto = produtos.get("produto")
-        if not isinstance(produto, dict):
-            logging.error(f"🔴 Sem 'produto' válido: {produto!r}")
-            enviar_notificacao_telegram(f"🔴 Sem 'produto' válido: {produto!r}")
-            continue
 
-        preco = produto.get("PRECOBASE", {}).get("$")
-        preco_promo = produto.get("Preço_PROMO_1", {}).get("$")
+async def sankhya_fetch_preco_venda_async(codprod: int, client) -> Optional[tuple[Optional[Any], Optional[Any]]]:
+    """sankhya_fetch_preco_venda para código asyncio."""
+    logging.info(f"🟢 Buscando dados de preço de venda no Sankhya para o produto {codprod}")
+    payload = _payload_consulta_produto(codprod)
 
-        logging.info(f"Preço {preco}, Promo {preco_promo}")
+    max_retries = 5
+    for attempt in range(1, max_retries + 1):
+        if attempt > 1:
+            await asyncio.sleep(2 ** (attempt - 2))
+        try:
+            response = await client.post_async(payload)
+        except httpx.TimeoutException:
+            logging.warning(f"⏳ Timeout na tentativa {attempt}/{max_retries} para CODPROD {codprod}")
+            continue
+        except Exception as e:
+            logging.error(f"❌ Erro inesperado na tentativa {attempt}/{max_retries} para CODPROD {codprod}: {e}")
+            enviar_notificacao_telegram(f"❌ Erro inesperado na tentativa {attempt}/{max_retries} para CODPROD {codprod}: {e}")
+            continue
 
-        return preco, preco_promo
+        precos = _preco_venda_da_resposta(response)
+        if precos is not None:
+            return precos
 
     logging.error(f"❌ Não consegui obter preço de venda para {codprod} após {max_retries} tentativas")
     enviar_notificacao_telegram(f"❌ Não consegui obter preço de venda para {codprod} após {max_retries} tentativas")
     return None
 
 
+def sankhya_fetch_precos_lote(client, codprods: Optional[list[int]] = None) -> Optional[dict[int, tuple[str, str]]]:
+    """
+    Carrega preço base e preço promocional de vários produtos com uma consulta SQL
+    (DbExplorerSP.executeQuery) por bloco de até MAX_CODPRODS_POR_QUERY produtos,
+    usando, para cada produto, a vigência mais recente em que ele aparece na tabela
+    SANKHYA_CODTAB_VENDA (uma versão nova da tabela que não repete o produto não o
+    tira da carga). Da SANKHYA_CODTAB_PROMO vale só a versão vigente da tabela: o
+    produto que não está nela ficou sem promoção (preco_promo "0").
+
+    Args:
+        client: SankhyaClient
+        codprods (list): produtos a carregar; se None carrega as tabelas inteiras
+
+    Returns:
+        dict: {codprod: (preco, preco_promo)} no mesmo formato de sankhya_fetch_preco_venda
+              (preco_promo "0" quando não há promoção), ou None se não configurado/erro
+    """
+    if not SANKHYA_CODTAB_VENDA:
+        logging.info("ℹ️ SANKHYA_CODTAB_VENDA não definido, preços serão consultados produto a produto")
+        return None
+
+    codtabs = [int(SANKHYA_CODTAB_VENDA)]
+    if SANKHYA_CODTAB_PROMO:
+        codtabs.append(int(SANKHYA_CODTAB_PROMO))
+
+    if codprods is None:
+        blocos = [None]
+    else:
+        codprods = sorted({int(c) for c in codprods})
+        blocos = [codprods[i:i + MAX_CODPRODS_POR_QUERY] for i in range(0, len(codprods), MAX_CODPRODS_POR_QUERY)]
+
+    precos: dict[int, list] = {}
+    for bloco in blocos:
+        filtro_prod = f" AND EXC.CODPROD IN ({', '.join(map(str, bloco))})" if bloco else ""
+        sql = f"""
+            SELECT EXC.CODPROD, TAB.CODTAB, EXC.VLRVENDA
+              FROM TGFEXC EXC
+              JOIN TGFTAB TAB ON TAB.NUTAB = EXC.NUTAB
+             WHERE TAB.CODTAB = {codtabs[0]}
+               AND TAB.DTVIGOR = (SELECT MAX(T2.DTVIGOR) FROM TGFTAB T2
+                                    JOIN TGFEXC E2 ON E2.NUTAB = T2.NUTAB
+                                   WHERE T2.CODTAB = TAB.CODTAB AND E2.CODPROD = EXC.CODPROD
+                                     AND T2.DTVIGOR <= CURRENT_TIMESTAMP){filtro_prod}
+        """
+        if len(codtabs) > 1:
+            # promoção: só a versão vigente da tabela; produto fora dela está sem promoção
+            sql += f"""
+             UNION ALL
+            SELECT EXC.CODPROD, TAB.CODTAB, EXC.VLRVENDA
+              FROM TGFEXC EXC
+              JOIN TGFTAB TAB ON TAB.NUTAB = EXC.NUTAB
+             WHERE TAB.CODTAB = {codtabs[1]}
+               AND TAB.DTVIGOR = (SELECT MAX(T2.DTVIGOR) FROM TGFTAB T2
+                                   WHERE T2.CODTAB = TAB.CODTAB
+                                     AND T2.DTVIGOR <= CURRENT_TIMESTAMP){filtro_prod}
+            """
+        rows = execute_query(sql, client)
+        if not isinstance(rows, list):
+            logging.error(f"❌ Falha ao carregar preços em lote: {rows}")
+            enviar_notificacao_telegram(f"❌ Falha ao carregar preços em lote: {rows}")
+            return None
+
+        for codprod, codtab, valor in rows:
+            par = precos.setdefault(int(codprod), [None, "0"])
+            par[0 if int(codtab) == codtabs[0] else 1] = str(valor)
+
+    # produto só com preço promocional não tem preço base: fica de fora e cai no fallback
+    resultado = {codprod: (preco, promo) for codprod, (preco, promo) in precos.items() if preco is not None}
+    logging.info(f"💵 Preços Sankhya carregados em lote: {len(resultado)} produtos")
+    return resultado
+
+
 def sankhya_fetch_grupo_informacoes_produto(codprod: int, client, tentativas: int = 3) -> Optional[list[Any]]:
     payload = {
         "serviceName": "CRUDServiceProvider.loadRecords",
@@ -0,0 +1,25 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench.benchmark import executa_rodada, percentil
+from bench.fake_servers import ConfigFalhas
+
+
+def test_percentil():
+    valores = list(range(1, 101))
+    assert percentil(valores, 50) == 50
+    assert percentil(valores, 99) == 99
+    assert percentil([], 95) == 0.0
+
+
+def test_rodada_contra_servidor_fake():
+    resultado = executa_rodada(40, ConfigFalhas(), divergencia=0.2, promocao=0.1, extras={}, timeout=120)
+
+    requisicoes = resultado["requisicoes"]
+    assert requisicoes["GET /api/catalog/pvt/product/{id}"] == 40
+    assert requisicoes["sankhya CRUDServiceProvider.loadRecords"] == 1
+    assert requisicoes.get("PUT /api/pricing/prices/{id}", 0) > 0
+    assert resultado["skus_por_segundo"] > 0
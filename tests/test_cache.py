@@ -0,0 +1,26 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from vtex_api.cache import ProdutoCache
+
+
+def test_cache_persiste_entre_instancias(tmp_path):
+    caminho = str(tmp_path / "cache.sqlite3")
+    ProdutoCache(caminho, ttl=60).set(541, "1234", "Produto")
+
+    assert ProdutoCache(caminho, ttl=60).get(541) == ("1234", "Produto")
+
+
+def test_cache_expira_e_invalida(tmp_path):
+    caminho = str(tmp_path / "cache.sqlite3")
+    cache = ProdutoCache(caminho, ttl=0)
+    cache.set(541, "1234", "Produto")
+    assert cache.get(541) is None
+
+    cache.ttl = 60
+    assert cache.get(541) == ("1234", "Produto")
+    cache.invalida(541)
+    assert cache.get(541) is None
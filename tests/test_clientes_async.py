@@ -0,0 +1,66 @@
+import sys
+import os
+import asyncio
+
+import httpx
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("VTEXAPPKEY", "teste")
+os.environ.setdefault("VTEXAPPTOKEN", "teste")
+
+from sankhya_api import auth
+from vtex_api import client as vtex_client
+from test_sankhya_token import SessaoFake
+
+
+def _cliente_mock(handler):
+    clientes = {}
+
+    def get_async_client(nome, max_conexoes=100):
+        # um cliente por event loop, como o get_async_client real
+        loop = asyncio.get_running_loop()
+        if loop not in clientes:
+            clientes[loop] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return clientes[loop]
+    return get_async_client
+
+
+def test_vtex_request_async_repete_429(monkeypatch):
+    chamadas = []
+
+    def handler(request):
+        chamadas.append(request.url.path)
+        if len(chamadas) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"basePrice": 10})
+
+    monkeypatch.setattr(vtex_client, "get_async_client", _cliente_mock(handler))
+
+    async def executa():
+        return await asyncio.gather(*(vtex_client.vtex_get_async(f"pricing/prices/{sku}") for sku in (1, 2, 3)))
+
+    assert asyncio.run(executa()) == [{"basePrice": 10}] * 3
+    assert len(chamadas) == 4
+
+
+def test_sankhya_post_async_renova_token_uma_vez(monkeypatch):
+    sessao = SessaoFake()
+    monkeypatch.setattr(auth, "get_session", lambda nome, pool_size=None: sessao)
+
+    def handler(request):
+        atual = f"Bearer token-{sessao.logins}"
+        if request.headers["Authorization"] != atual:
+            return httpx.Response(401)
+        return httpx.Response(200, json={"ok": True})
+
+    monkeypatch.setattr(auth, "get_async_client", _cliente_mock(handler))
+    client = auth.SankhyaClient(renovacao_antecipada=False)
+    # token trocado por fora: todos os POSTs recebem 401 com o token 1
+    sessao.logins += 1
+
+    async def executa():
+        return await asyncio.gather(*(client.post_async({"serviceName": "X.y"}) for _ in range(8)))
+
+    assert asyncio.run(executa()) == [{"ok": True}] * 8
+    assert sessao.logins == 3
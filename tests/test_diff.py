@@ -0,0 +1,80 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("VTEXAPPKEY", "teste")
+os.environ.setdefault("VTEXAPPTOKEN", "teste")
+
+import pytest
+
+from vtex_api import diff, processamentos, sincronizacao
+from vtex_api.cache import ProdutoCache
+from vtex_api.depositos import DEPOSITO_PADRAO
+from vtex_api.espelho import EspelhoVtex
+from vtex_api.processamentos import INALTERADO, SkuSnapshot
+
+
+def _cenario(monkeypatch):
+    cache = ProdutoCache(":memory:")
+    monkeypatch.setattr(diff, "get_produto_cache", lambda: cache)
+    espelho = EspelhoVtex(":memory:")
+    for id_sku in range(1, 7):
+        cache.set(id_sku, str(100 + id_sku), None)
+        espelho.registra_estoque(10 + id_sku, {DEPOSITO_PADRAO: 5, "outro": 9})
+        espelho.registra_preco(10 + id_sku, "10.5", [])
+    pares = [(id_sku, [10 + id_sku]) for id_sku in range(1, 8)]
+    estoques = {100 + i: {DEPOSITO_PADRAO: 5} for i in range(1, 7)}
+    estoques[102] = {DEPOSITO_PADRAO: 4}        # estoque diferente
+    del estoques[106]                           # sem estoque no Sankhya: vale zero
+    precos = {100 + i: ("10,50", "0") for i in range(1, 8)}
+    precos[103] = ("10.51", "0")                # preço diferente
+    precos[104] = ("10.50", "9.90")             # promoção: conferida por SKU
+    precos[105] = ("10.505", "0")               # fora de centavos exatos
+    return pares, estoques, precos, espelho
+
+
+def test_centavos_exatos():
+    assert diff.centavos("10,50") == diff.centavos(10.5) == 1050
+    assert diff.centavos("10.505") == diff.centavos(None) == diff.centavos("abc") == diff.SEM_CENTAVOS
+
+
+def test_diff_catalogo_segue_a_comparacao_por_sku(monkeypatch):
+    pares, estoques, precos, espelho = _cenario(monkeypatch)
+    resultado = diff.diff_catalogo(diff.catalogo_colunar(pares), estoques, precos, espelho)
+
+    # o id 7 não tem RefId em cache e fica fora do catálogo em colunas
+    assert resultado.catalogo.indice.tolist() == [0, 1, 2, 3, 4, 5]
+    assert resultado.diferenca_estoque.tolist() == [False, True, False, False, False, True]
+    assert resultado.diferenca_preco.tolist() == [False, False, True, False, False, False]
+    assert resultado.inalterados().tolist() == [0]
+
+
+def test_sincroniza_skus_pula_os_inalterados_do_diff(monkeypatch):
+    pares, estoques, precos, espelho = _cenario(monkeypatch)
+    monkeypatch.setattr(diff, "VTEX_MIRROR_SAMPLE_RATE", 0)
+    enriquecidos = []
+
+    def enriquece(item, contexto):
+        enriquecidos.append(item[1])
+        raise RuntimeError("fora do escopo do teste")
+    monkeypatch.setattr(sincronizacao, "enriquece", enriquece)
+
+    resultados, resumo = sincronizacao.sincroniza_skus(iter(pares), None, max_workers=1, estoques_snk=estoques,
+                                                       precos_snk=precos, espelho=espelho)
+    assert resultados[0] == (1, [11], INALTERADO)
+    assert sorted(enriquecidos) == [2, 3, 4, 5, 6, 7]
+    assert resumo.inalterados == 1
+
+
+def test_estoque_so_em_deposito_nao_mapeado_nao_e_inalterado(monkeypatch):
+    pares, estoques, precos, espelho = _cenario(monkeypatch)
+    espelho.registra_estoque(11, {"outro": 9})
+    monkeypatch.setattr(processamentos, "vtex_estoque_sku", lambda sku: espelho.estoque(sku) or {})
+
+    # o diff em colunas não resolve o SKU...
+    resultado = diff.diff_catalogo(diff.catalogo_colunar(pares), estoques, precos, espelho)
+    assert resultado.inalterados().tolist() == []
+    # ...e a comparação por SKU falha no estoque, como antes
+    with pytest.raises(ValueError, match="sem depósito mapeado"):
+        processamentos.vtex_busca_estoque(SkuSnapshot(1, [11], "101"), None, estoques)
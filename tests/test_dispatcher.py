@@ -0,0 +1,68 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from notifications.dispatcher import NotificationDispatcher, monta_resumo, TELEGRAM_MAX_CHARS
+
+
+def test_resumo_conta_por_categoria_e_agrupa_repetidas():
+    mensagens = ["✅ Estoque atualizado SKU 1", "❌ Erro SKU 2", "✅ Estoque atualizado SKU 1", "🚀 Início"]
+    resumo = monta_resumo(mensagens)
+
+    assert len(resumo) == 1
+    linhas = resumo[0].split("\n")
+    assert linhas[0] == "📊 Resumo: 1 falhas, 2 atualizações, 1 outras"
+    assert linhas[1:] == ["❌ Erro SKU 2", "✅ Estoque atualizado SKU 1 (x2)", "🚀 Início"]
+
+
+def test_resumo_respeita_limite_do_telegram():
+    mensagens = [f"✅ Atualizado SKU {i} " + "x" * 200 for i in range(500)]
+    partes = monta_resumo(mensagens, max_mensagens=3)
+
+    assert len(partes) == 3
+    assert all(len(p) <= TELEGRAM_MAX_CHARS for p in partes)
+    assert "omitidas" in partes[-1]
+
+
+def test_dispatcher_envia_pendentes_ao_encerrar():
+    enviadas = []
+    dispatcher = NotificationDispatcher(lambda m: enviadas.append(m) or True, intervalo=60, intervalo_envio=0)
+    dispatcher.inicia()
+    dispatcher.enfileira("✅ a")
+    dispatcher.enfileira("❌ b")
+    dispatcher.para()
+
+    assert len(enviadas) == 1
+    assert enviadas[0].startswith("📊 Resumo: 1 falhas, 1 atualizações")
+
+
+def test_aviso_de_descartadas_nao_passa_do_limite():
+    enviadas = []
+    dispatcher = NotificationDispatcher(lambda m: enviadas.append(m) or True, intervalo_envio=0)
+    dispatcher.descartadas = 3
+    # a última parte do resumo fica quase no limite
+    dispatcher._envia_resumo(["✅ Atualizado SKU 1", "✅ Atualizado SKU 2 " + "x" * (TELEGRAM_MAX_CHARS - 30)])
+
+    assert all(len(m) <= TELEGRAM_MAX_CHARS for m in enviadas)
+    assert enviadas[-1] == "⚠️ 3 notificações descartadas por fila cheia"
+    assert dispatcher.descartadas == 0
+
+
+def test_resumo_recusado_vai_no_proximo_ciclo():
+    respostas, enviadas = [False, True, True], []
+    dispatcher = NotificationDispatcher(lambda m: enviadas.append(m) or respostas.pop(0), intervalo_envio=0)
+    dispatcher._envia_resumo(["❌ Erro SKU 1"])
+    dispatcher._envia_resumo(["✅ Atualizado SKU 2"])
+
+    assert enviadas == ["❌ Erro SKU 1", "❌ Erro SKU 1", "✅ Atualizado SKU 2"]
+    assert dispatcher._pendentes == []
+
+
+def test_pendentes_limitados():
+    dispatcher = NotificationDispatcher(lambda m: False, intervalo_envio=0, max_pendentes=2)
+    for i in range(3):
+        dispatcher._envia_resumo([f"❌ Erro SKU {i}"])
+
+    assert dispatcher._pendentes == ["❌ Erro SKU 1", "❌ Erro SKU 2"]
@@ -0,0 +1,51 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("VTEXAPPKEY", "teste")
+os.environ.setdefault("VTEXAPPTOKEN", "teste")
+
+from vtex_api import espelho as modulo
+from vtex_api.espelho import EspelhoVtex, vtex_estoque_sku, vtex_preco_sku
+
+
+def _conta_gets(monkeypatch, estoque, preco):
+    chamadas = []
+    monkeypatch.setattr(modulo, "vtex_fetch_estoque_sku", lambda sku: chamadas.append(("estoque", sku)) or estoque)
+    monkeypatch.setattr(modulo, "vtex_fetch_preco_sku", lambda sku: chamadas.append(("preco", sku)) or preco)
+    return chamadas
+
+
+def test_espelho_preenche_e_le_localmente(monkeypatch):
+    monkeypatch.setattr(modulo, "VTEX_MIRROR_SAMPLE_RATE", 0)
+    espelho = EspelhoVtex(":memory:")
+    chamadas = _conta_gets(monkeypatch, {"1f82610": 3}, ("10.5", []))
+
+    assert vtex_estoque_sku(11, espelho) == {"1f82610": 3}
+    assert vtex_preco_sku(11, espelho) == ("10.5", [])
+    # segunda leitura vem do espelho, já com o valor das escritas bem-sucedidas
+    espelho.atualiza_estoque(11, "1f82610", 5)
+    espelho.atualiza_preco_base(11, 12.0)
+    assert vtex_estoque_sku(11, espelho) == {"1f82610": 5}
+    assert vtex_preco_sku(11, espelho) == ("12.0", [])
+    assert chamadas == [("estoque", 11), ("preco", 11)]
+
+
+def test_espelho_conferido_por_amostragem_e_expirado(monkeypatch):
+    espelho = EspelhoVtex(":memory:")
+    espelho.registra_estoque(11, {"1f82610": 3})
+    chamadas = _conta_gets(monkeypatch, {"1f82610": 7}, ("0", None))
+
+    monkeypatch.setattr(modulo, "VTEX_MIRROR_SAMPLE_RATE", 1)
+    assert vtex_estoque_sku(11, espelho) == {"1f82610": 7}
+    assert espelho.estoque(11) == {"1f82610": 7}
+
+    # resposta sem fixedPrices (erro) não é gravada
+    monkeypatch.setattr(modulo, "VTEX_MIRROR_SAMPLE_RATE", 0)
+    assert vtex_preco_sku(11, espelho) == ("0", None)
+    assert espelho.preco(11) is None
+
+    espelho.ttl = 0
+    assert espelho.estoque(11) is None
+    assert chamadas == [("estoque", 11), ("preco", 11)]
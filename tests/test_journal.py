@@ -0,0 +1,46 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("VTEXAPPKEY", "teste")
+os.environ.setdefault("VTEXAPPTOKEN", "teste")
+
+from vtex_api.journal import JournalSincronizacao
+from vtex_api.processamentos import ATUALIZADO, INALTERADO, FALHA
+
+
+def test_retoma_execucao_interrompida(tmp_path):
+    caminho = str(tmp_path / "journal.sqlite3")
+    journal = JournalSincronizacao(caminho, commit_a_cada=2)
+    journal.inicia()
+    leitura = journal.registra_catalogo(iter([(1, [11]), (2, [22]), (3, [33]), (4, [44])]))
+    for _ in range(3):
+        next(leitura)
+    journal.registra_resultado(1, ATUALIZADO)
+    journal.registra_resultado(2, FALHA)
+    journal.registra_resultado(3, INALTERADO)
+    journal.fecha()
+    # queda no meio da leitura do catálogo
+
+    retomado = JournalSincronizacao(caminho)
+    assert retomado.pode_retomar()
+    assert not retomado.catalogo_completo()
+    catalogo = retomado.registra_catalogo(iter([(1, [11]), (2, [22]), (3, [33]), (4, [44])]))
+    assert list(retomado.pendentes(catalogo)) == [(2, [22]), (4, [44])]
+    assert retomado.catalogo_completo()
+    assert list(retomado.catalogo()) == [(1, [11]), (2, [22]), (3, [33]), (4, [44])]
+
+
+def test_execucao_concluida_so_retoma_falhas(tmp_path):
+    journal = JournalSincronizacao(str(tmp_path / "journal.sqlite3"))
+    journal.inicia()
+    for id_sku, sku in journal.registra_catalogo(iter([(1, [11]), (2, [22])])):
+        journal.registra_resultado(id_sku, ATUALIZADO)
+    journal.conclui()
+    assert not journal.pode_retomar()
+
+    journal.registra_resultado(2, FALHA)
+    journal.conclui()
+    assert journal.pode_retomar()
+    assert list(journal.pendentes(journal.catalogo())) == [(2, [22])]
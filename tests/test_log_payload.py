@@ -0,0 +1,32 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.log_payload import PayloadLog, AmostradorPorChave
+
+
+class _NaoSerializa:
+    def __init__(self):
+        self.chamadas = 0
+
+    def __repr__(self):
+        self.chamadas += 1
+        return "objeto"
+
+
+def test_payload_so_serializa_quando_formatado_e_corta():
+    objeto = _NaoSerializa()
+    payload = PayloadLog({"itens": [objeto]})
+    assert objeto.chamadas == 0
+
+    assert str(PayloadLog({"a": "x" * 100}, limite=10)) == '{"a": "xxx… (+99 caracteres)'
+    assert str(PayloadLog(b'{"ok": true}')) == '{"ok": true}'
+    assert "objeto" in str(payload)
+
+
+def test_amostrador_por_chave():
+    amostrador = AmostradorPorChave(3)
+    assert [amostrador.amostra("GET pricing") for _ in range(5)] == [True, False, False, True, False]
+    assert amostrador.amostra("PUT pricing")
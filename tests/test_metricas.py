@@ -0,0 +1,33 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.metricas import Contador, Histograma, exporta_texto, grava_textfile
+
+
+def test_histograma_acumula_buckets():
+    h = Histograma("teste_duracao_seconds", "teste", ("servico",), buckets=(0.1, 1.0))
+    for valor in (0.05, 0.5, 5.0):
+        h.observa(valor, servico="a")
+
+    texto = h.exporta()
+    assert 'teste_duracao_seconds_bucket{servico="a",le="0.1"} 1' in texto
+    assert 'teste_duracao_seconds_bucket{servico="a",le="1"} 2' in texto
+    assert 'teste_duracao_seconds_bucket{servico="a",le="+Inf"} 3' in texto
+    assert 'teste_duracao_seconds_count{servico="a"} 3' in texto
+    assert h.totais()[("a",)] == (5.55, 3)
+
+
+def test_contador_e_textfile(tmp_path):
+    c = Contador("teste_chamadas_total", "teste", ("status",))
+    c.inc(status=200)
+    c.inc(2, status=200)
+    assert c.valor(status=200) == 3
+
+    caminho = tmp_path / "metricas" / "sync.prom"
+    assert grava_textfile(str(caminho))
+    conteudo = caminho.read_text(encoding="utf-8")
+    assert conteudo == exporta_texto()
+    assert '# TYPE teste_chamadas_total counter\nteste_chamadas_total{status="200"} 3' in conteudo
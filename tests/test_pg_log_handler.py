@@ -0,0 +1,53 @@
+import sys
+import os
+import logging
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.pg_log_handler import PostgresLogHandler
+
+
+class _ConexaoFake:
+    def close(self):
+        pass
+
+
+def _handler(monkeypatch, tmp_path, inserts, falhas=0, **kwargs):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://teste")
+    restantes = [falhas]
+
+    def insere(self, conn, linhas):
+        if restantes[0]:
+            restantes[0] -= 1
+            raise RuntimeError("conexão perdida")
+        inserts.append([linha[5] for linha in linhas])
+
+    monkeypatch.setattr(PostgresLogHandler, "_conecta", lambda self: _ConexaoFake())
+    monkeypatch.setattr(PostgresLogHandler, "_insere", insere)
+    return PostgresLogHandler("teste", arquivo_spill=str(tmp_path / "spill.jsonl"), **kwargs)
+
+
+def _registro(mensagem):
+    return logging.LogRecord("teste", logging.INFO, __file__, 1, mensagem, (), None)
+
+
+def test_grava_em_lotes(monkeypatch, tmp_path):
+    inserts = []
+    handler = _handler(monkeypatch, tmp_path, inserts, tamanho_lote=3, intervalo=10)
+    for i in range(7):
+        handler.emit(_registro(f"m{i}"))
+    handler.close()
+
+    assert inserts == [["m0", "m1", "m2"], ["m3", "m4", "m5"], ["m6"]]
+
+
+def test_falha_vai_para_spill_e_e_reenviada(monkeypatch, tmp_path):
+    inserts = []
+    handler = _handler(monkeypatch, tmp_path, inserts, falhas=1, tamanho_lote=2, intervalo=10)
+    for i in range(4):
+        handler.emit(_registro(f"m{i}"))
+    handler.close()
+
+    assert inserts == [["m0", "m1"], ["m2", "m3"]]
+    assert not (tmp_path / "spill.jsonl").exists()
@@ -0,0 +1,51 @@
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("VTEXAPPKEY", "teste")
+os.environ.setdefault("VTEXAPPTOKEN", "teste")
+
+from vtex_api import promocao
+from vtex_api.promocao import planeja_promocao, vtex_reconcilia_promocao
+
+AGORA = datetime(2025, 3, 10, 12, 0, tzinfo=timezone(timedelta(hours=-3)))
+
+
+def _fixo(valor="90.0", lista="100", horas_restantes=20.0, politica="1", agora=AGORA):
+    return {"tradePolicyId": politica, "value": valor, "listPrice": lista, "minQuantity": 1,
+            "dateRange": {"from": (agora - timedelta(hours=9)).isoformat(),
+                          "to": (agora + timedelta(hours=horas_restantes)).isoformat()}}
+
+
+def test_promocao_em_vigor_nao_gera_escrita():
+    assert planeja_promocao([_fixo()], "100,00", "90", AGORA) is None
+    # preço fixo de outra política não conta
+    assert planeja_promocao([_fixo(politica="2")], "100", "90", AGORA).motivo == "sem preço fixo"
+
+
+def test_promocao_perto_do_fim_e_estendida():
+    plano = planeja_promocao([_fixo(horas_restantes=2)], "100", "90", AGORA)
+    assert not plano.remove
+    assert plano.motivo == "vigência estendida"
+    assert plano.preco_fixo["dateRange"]["from"] == (AGORA - timedelta(hours=9)).isoformat()
+    assert plano.preco_fixo["dateRange"]["to"] == (AGORA + timedelta(hours=24)).isoformat(timespec="seconds")
+
+
+def test_valor_alterado_e_faixas_extras():
+    assert planeja_promocao([_fixo(valor="85")], "100", "90", AGORA).motivo == "valor alterado"
+    faixa = dict(_fixo(), minQuantity=10)
+    assert planeja_promocao([_fixo(), faixa], "100", "90", AGORA).remove
+
+
+def test_reconcilia_so_escreve_quando_necessario(monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(promocao, "vtex_post", lambda endpoint, dados, log_msg=None: chamadas.append(endpoint) or {})
+    monkeypatch.setattr(promocao, "vtex_delete", lambda endpoint, log_msg=None: chamadas.append(endpoint) or {})
+
+    em_vigor = [_fixo(agora=datetime.now(timezone.utc))]
+    assert vtex_reconcilia_promocao(1000001, "100", "90", em_vigor)
+    assert chamadas == []
+    assert vtex_reconcilia_promocao(1000001, "100", "80", em_vigor)
+    assert chamadas == ["pricing/prices/1000001/fixed/1"]
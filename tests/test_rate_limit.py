@@ -0,0 +1,38 @@
+import sys
+import os
+from email.utils import formatdate
+import time
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from vtex_api.rate_limit import TokenBucket, familia_endpoint, retry_after_segundos, backoff_com_jitter
+
+
+def test_familia_endpoint():
+    assert familia_endpoint("catalog_system/pvt/products/GetProductAndSkuIds") == "catalog"
+    assert familia_endpoint("/catalog/pvt/product/1") == "catalog"
+    assert familia_endpoint("logistics/pvt/inventory/skus/1") == "logistics"
+    assert familia_endpoint("pricing/prices/1") == "pricing"
+    assert familia_endpoint("oms/pvt/orders") == "outros"
+
+
+def test_token_bucket_reduz_e_recupera_taxa():
+    bucket = TokenBucket("teste", taxa_maxima=10, taxa_minima=1)
+    bucket.reduz()
+    bucket.reduz()
+    assert bucket.taxa == 2.5
+    for _ in range(100):
+        bucket.aumenta()
+    assert bucket.taxa == 10
+    for _ in range(10):
+        bucket.reduz()
+    assert bucket.taxa == 1
+
+
+def test_retry_after_aceita_segundos_e_data():
+    assert retry_after_segundos("3") == 3
+    assert retry_after_segundos(None) is None
+    assert retry_after_segundos("lixo") is None
+    assert 0 < retry_after_segundos(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert 0 <= backoff_com_jitter(3, base=1) <= 4
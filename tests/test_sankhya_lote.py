@@ -0,0 +1,117 @@
+import sys
+import os
+import sqlite3
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sankhya_api import fetch
+from sankhya_api.fetch import sankhya_fetch_estoque_locais_lote
+
+
+class ClienteFake:
+    """Devolve as respostas configuradas, uma por chamada, e guarda os payloads."""
+
+    def __init__(self, respostas):
+        self.respostas = list(respostas)
+        self.payloads = []
+
+    def post(self, payload):
+        self.payloads.append(payload)
+        return self.respostas.pop(0)
+
+    get = post
+
+
+def _pagina_estoque(linhas, mais):
+    entity = [{f"f{i}": {"$": str(v)} for i, v in enumerate(linha)} for linha in linhas]
+    return {"responseBody": {"entities": {
+        "total": str(len(linhas)),
+        "hasMoreResult": "true" if mais else "false",
+        "entity": entity[0] if len(entity) == 1 else entity,
+    }}}
+
+
+def test_estoque_lote_pagina_e_soma_linhas_do_mesmo_produto():
+    client = ClienteFake([
+        _pagina_estoque([(10, 7, 188, "5"), (11, 7, 188, "2.0")], mais=True),
+        _pagina_estoque([(10, 7, 188, "3")], mais=False),
+    ])
+
+    estoques = sankhya_fetch_estoque_locais_lote([(7, 188)], client)
+
+    assert estoques == {10: {(7, 188): 8}, 11: {(7, 188): 2}}
+    assert [p["requestBody"]["dataSet"]["offsetPage"] for p in client.payloads] == ["0", "1"]
+
+
+def test_estoque_lote_retorna_none_quando_pagina_falha():
+    client = ClienteFake([None, None, None])
+    assert sankhya_fetch_estoque_locais_lote([(7, 188)], client, tentativas=3) is None
+
+
+def test_estoque_locais_lote_agrupa_por_deposito(monkeypatch):
+    from vtex_api import depositos
+    monkeypatch.setattr(depositos, "MAPEAMENTO_DEPOSITOS",
+                        depositos.carrega_mapeamento("7:188=1f82610; 7:200=1f82610; 3:101=cd_sul"))
+    linhas = [(10, 7, 188, "5"), (10, 7, 200, "2"), (10, 3, 101, "1"), (11, 7, 188, "4")]
+    client = ClienteFake([{"responseBody": {"entities": {"total": "4", "hasMoreResult": "false", "entity": [
+        {f"f{i}": {"$": str(v)} for i, v in enumerate(linha)} for linha in linhas]}}}])
+
+    por_local = fetch.sankhya_fetch_estoque_locais_lote(depositos.locais_sankhya(), client)
+
+    assert por_local[10] == {(7, 188): 5, (7, 200): 2, (3, 101): 1}
+    assert depositos.estoques_por_deposito(por_local) == {10: {"1f82610": 7, "cd_sul": 1},
+                                                          11: {"1f82610": 4, "cd_sul": 0}}
+    expressao = client.payloads[0]["requestBody"]["dataSet"]["criteria"]["expression"]["$"]
+    assert expressao.count("this.CODLOCAL") == 3
+    assert expressao.startswith("this.TIPO = 'P' AND this.CODPARC = 0 AND (")
+
+
+def test_precos_lote_combina_tabela_de_venda_e_promocional(monkeypatch):
+    monkeypatch.setattr(fetch, "SANKHYA_CODTAB_VENDA", "1")
+    monkeypatch.setattr(fetch, "SANKHYA_CODTAB_PROMO", "2")
+    client = ClienteFake([{"responseBody": {"rows": [
+        [10, 1, 19.9], [10, 2, 15.5], [11, 1, 7], [12, 2, 3.0],
+    ]}}])
+
+    precos = fetch.sankhya_fetch_precos_lote(client, codprods=[10, 11, 12])
+
+    assert precos == {10: ("19.9", "15.5"), 11: ("7", "0")}
+    assert "IN (10, 11, 12)" in client.payloads[0]["requestBody"]["sql"]
+
+
+class ClienteSql:
+    """Executa o SQL do executeQuery em um SQLite com TGFTAB/TGFEXC."""
+
+    def __init__(self, tabelas, excecoes):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE TGFTAB (NUTAB INTEGER, CODTAB INTEGER, DTVIGOR TEXT)")
+        self.conn.execute("CREATE TABLE TGFEXC (NUTAB INTEGER, CODPROD INTEGER, VLRVENDA REAL)")
+        self.conn.executemany("INSERT INTO TGFTAB VALUES (?, ?, ?)", tabelas)
+        self.conn.executemany("INSERT INTO TGFEXC VALUES (?, ?, ?)", excecoes)
+
+    def get(self, payload):
+        rows = self.conn.execute(payload["requestBody"]["sql"]).fetchall()
+        return {"responseBody": {"rows": [list(row) for row in rows]}}
+
+
+def test_precos_lote_promocao_encerrada_e_vigencia_por_produto(monkeypatch):
+    monkeypatch.setattr(fetch, "SANKHYA_CODTAB_VENDA", "1")
+    monkeypatch.setattr(fetch, "SANKHYA_CODTAB_PROMO", "2")
+    client = ClienteSql(
+        tabelas=[(100, 1, "2024-01-01 00:00:00"), (101, 1, "2024-06-01 00:00:00"),
+                 (200, 2, "2024-01-01 00:00:00"), (201, 2, "2024-06-01 00:00:00"),
+                 (202, 2, "2999-01-01 00:00:00")],
+        excecoes=[(100, 10, 20.0), (100, 11, 7.0), (101, 10, 19.9),   # 11 não está na versão nova
+                  (200, 10, 15.5), (200, 11, 5.0), (201, 11, 6.0),    # promoção do 10 encerrada
+                  (202, 10, 1.0)],                                     # versão futura: ignorada
+    )
+
+    precos = fetch.sankhya_fetch_precos_lote(client, codprods=[10, 11])
+
+    assert precos == {10: ("19.9", "0"), 11: ("7.0", "6.0")}
+
+
+def test_precos_lote_desativado_sem_tabela_configurada(monkeypatch):
+    monkeypatch.setattr(fetch, "SANKHYA_CODTAB_VENDA", None)
+    assert fetch.sankhya_fetch_precos_lote(ClienteFake([])) is None
@@ -0,0 +1,75 @@
+import sys
+import os
+import threading
+import time
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sankhya_api import auth
+
+
+class RespostaFake:
+    def __init__(self, status_code, dados=None):
+        self.status_code = status_code
+        self.dados = dados or {}
+        self.text = "{}"
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.dados
+
+
+class SessaoFake:
+    """Login lento (para as threads se sobreporem) e 401 para tokens antigos."""
+
+    def __init__(self):
+        self.logins = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, timeout=None):
+        time.sleep(0.05)
+        with self._lock:
+            self.logins += 1
+            return RespostaFake(200, {"bearerToken": f"token-{self.logins}"})
+
+    def request(self, metodo, url, headers=None, json=None, timeout=None):
+        atual = f"Bearer token-{self.logins}"
+        return RespostaFake(200 if headers["Authorization"] == atual else 401, {"ok": True})
+
+
+def _cliente(monkeypatch, **kwargs):
+    sessao = SessaoFake()
+    monkeypatch.setattr(auth, "get_session", lambda nome, pool_size=None: sessao)
+    return auth.SankhyaClient(**kwargs), sessao
+
+
+def test_401_simultaneos_fazem_um_unico_login(monkeypatch):
+    client, sessao = _cliente(monkeypatch, renovacao_antecipada=False)
+    # token trocado por fora: todas as threads recebem 401 com o token 1
+    sessao.logins += 1
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(client.post({"serviceName": "X.y"})))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert resultados == [{"ok": True}] * 8
+    assert sessao.logins == 3
+
+
+def test_token_renovado_antes_de_expirar(monkeypatch):
+    monkeypatch.setattr(auth, "SANKHYA_TOKEN_TTL", 1.3)
+    monkeypatch.setattr(auth, "SANKHYA_TOKEN_REFRESH_AHEAD", 0.3)
+    client, sessao = _cliente(monkeypatch)
+    try:
+        time.sleep(1.5)
+        assert sessao.logins >= 2
+        assert client._token_valido()
+    finally:
+        client.fechar()
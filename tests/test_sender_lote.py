@@ -0,0 +1,69 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("VTEXAPPKEY", "teste")
+os.environ.setdefault("VTEXAPPTOKEN", "teste")
+
+from vtex_api import sender
+from vtex_api.depositos import DEPOSITO_PADRAO
+
+
+def _configura(monkeypatch, resposta_lote):
+    lotes, individuais = [], []
+    monkeypatch.setattr(sender, "VTEX_BULK_INVENTORY", True)
+    monkeypatch.setattr(sender, "VTEX_BULK_MAX_ITEMS", 2)
+    monkeypatch.setattr(sender, "_falhas_lote_estoque", 0)
+    monkeypatch.setattr(sender, "enviar_notificacao_telegram", lambda mensagem: True)
+    monkeypatch.setattr(sender, "vtex_post", lambda endpoint, data, log_msg=None: lotes.append(data) or resposta_lote)
+    monkeypatch.setattr(sender, "vtex_put",
+                        lambda endpoint, data, log_msg=None: individuais.append(endpoint) or (None if "13" in endpoint else {}))
+    return lotes, individuais
+
+
+def test_estoque_em_lote(monkeypatch):
+    lotes, individuais = _configura(monkeypatch, {})
+    itens = [(1, 11, 5, 4, DEPOSITO_PADRAO), (2, 12, 0, 1, DEPOSITO_PADRAO), (3, 13, 7, 6, DEPOSITO_PADRAO)]
+
+    assert sender.vtex_send_estoque_lote(itens) == [True, True, False]
+    assert [[i["itemId"] for i in lote] for lote in lotes] == [["11", "12"]]
+    # bloco de um item só vai direto pelo PUT individual
+    assert individuais == [f"logistics/pvt/inventory/skus/13/warehouses/{DEPOSITO_PADRAO}"]
+
+
+def test_lote_com_falha_reenvia_por_sku(monkeypatch):
+    lotes, individuais = _configura(monkeypatch, None)
+    itens = [(1, 11, 5, 4, DEPOSITO_PADRAO), (3, 13, 7, 6, "cd_sul")]
+
+    assert sender.vtex_send_estoque_lote(itens) == [True, False]
+    assert len(lotes) == 1
+    assert sorted(individuais) == [f"logistics/pvt/inventory/skus/11/warehouses/{DEPOSITO_PADRAO}",
+                                   "logistics/pvt/inventory/skus/13/warehouses/cd_sul"]
+
+
+def test_item_recusado_no_lote_reenvia_so_ele(monkeypatch):
+    resposta = [{"itemId": "11", "wareHouseId": DEPOSITO_PADRAO, "success": True},
+                {"itemId": "12", "wareHouseId": DEPOSITO_PADRAO, "success": False, "errorMessage": "sku inativo"}]
+    lotes, individuais = _configura(monkeypatch, resposta)
+    itens = [(1, 11, 5, 4, DEPOSITO_PADRAO), (2, 12, 0, 1, DEPOSITO_PADRAO)]
+
+    assert sender.vtex_send_estoque_lote(itens) == [True, True]
+    assert len(lotes) == 1
+    assert individuais == [f"logistics/pvt/inventory/skus/12/warehouses/{DEPOSITO_PADRAO}"]
+
+
+def test_preco_base_vai_antes_da_promocao_do_mesmo_sku(monkeypatch):
+    from vtex_api import processamentos
+    from vtex_api.processamentos import Alteracao, CAMPO_ESTOQUE, CAMPO_PRECO, CAMPO_PROMO
+
+    enviadas = []
+    monkeypatch.setattr(processamentos, "vtex_aplica_alteracao",
+                        lambda alteracao: enviadas.append((alteracao.sku, alteracao.campo)) or alteracao.sku != 12)
+    monkeypatch.setattr(processamentos, "vtex_send_estoque_lote", lambda itens: [True] * len(itens))
+    alteracoes = [Alteracao(11, 1, CAMPO_PROMO, None, "9"), Alteracao(12, 2, CAMPO_PRECO, "5", "6"),
+                  Alteracao(13, 3, CAMPO_ESTOQUE, 1, 2), Alteracao(11, 1, CAMPO_PRECO, "10", "11")]
+
+    assert processamentos.vtex_aplica_alteracoes_lote(alteracoes) == [True, False, True, True]
+    do_sku_11 = [campo for sku, campo in enviadas if sku == 11]
+    assert do_sku_11 == [CAMPO_PRECO, CAMPO_PROMO]
@@ -0,0 +1,36 @@
+import sys
+import os
+
+import pytest
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.shards import le_shard, filtra_shard, caminho_do_shard
+from vtex_api.estado import EstadoSincronizacao
+
+
+def test_shards_particionam_o_catalogo():
+    pares = [(id_sku, [id_sku * 10]) for id_sku in range(1, 1001)]
+    fatias = [list(filtra_shard(pares, shard, 4)) for shard in range(1, 5)]
+
+    assert sorted(par for fatia in fatias for par in fatia) == pares
+    assert all(150 < len(fatia) < 350 for fatia in fatias)
+    assert list(filtra_shard(pares, 2, 4)) == fatias[1]
+
+
+def test_le_shard():
+    assert le_shard("2/4") == (2, 4)
+    for invalido in ("0/4", "5/4", "2", "a/b"):
+        with pytest.raises(ValueError):
+            le_shard(invalido)
+    assert caminho_do_shard("cache/vtex_journal.sqlite3", 2, 4) == "cache/vtex_journal.shard2-4.sqlite3"
+
+
+def test_reconciliacao_registrada_por_shard(tmp_path):
+    caminho = str(tmp_path / "estado.sqlite3")
+    concluido, interrompido = EstadoSincronizacao(caminho, "shard1-2"), EstadoSincronizacao(caminho, "shard2-2")
+    concluido.marca_reconciliacao()
+    assert not concluido.precisa_reconciliar()
+    assert interrompido.precisa_reconciliar()
+    assert EstadoSincronizacao(caminho).precisa_reconciliar()
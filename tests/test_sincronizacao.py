@@ -0,0 +1,123 @@
+import sys
+import os
+import time
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("VTEXAPPKEY", "teste")
+os.environ.setdefault("VTEXAPPTOKEN", "teste")
+
+from vtex_api import sincronizacao, processamentos
+from vtex_api.estado import EstadoSincronizacao
+from vtex_api.processamentos import Alteracao, SkuSnapshot, ATUALIZADO, INALTERADO, FALHA, CAMPO_ESTOQUE, CAMPO_PRECO
+
+
+def _enriquece_fake(chamadas=None):
+    def enriquece(id_sku, sku, client, estoques_snk, precos_snk, estoque=True, preco=True):
+        if chamadas is not None:
+            chamadas.append((id_sku, estoque, preco))
+        # os primeiros terminam por último para garantir a ordenação
+        time.sleep(0.01 * (5 - id_sku))
+        if id_sku == 4:
+            raise RuntimeError("erro inesperado")
+        registro = SkuSnapshot(id_sku, sku, str(id_sku * 10))
+        if estoque:
+            # leitura de estoque confirmada na VTEX
+            registro.estoque_snk = (estoques_snk or {}).get(id_sku * 10, {})
+        if id_sku == 3:
+            registro.falhas.append(CAMPO_PRECO)
+        return registro
+    return enriquece
+
+
+def test_sincroniza_skus_mantem_ordem_e_resume(monkeypatch):
+    enviados = []
+    monkeypatch.setattr(sincronizacao, "vtex_enriquece_sku", _enriquece_fake())
+    monkeypatch.setattr(sincronizacao, "vtex_compara_estoque",
+                        lambda r: [Alteracao(r.sku, r.refid, CAMPO_ESTOQUE, 0, 1)] if r.id == 1 else [])
+    monkeypatch.setattr(sincronizacao, "vtex_compara_preco", lambda r: [])
+    monkeypatch.setattr(sincronizacao, "vtex_aplica_alteracoes_lote",
+                        lambda alteracoes: [enviados.append(a) or True for a in alteracoes])
+
+    resultados, resumo = sincronizacao.sincroniza_skus({1: [11], 2: [12], 3: [13], 4: [14]}, None, max_workers=4)
+
+    assert [r[0] for r in resultados] == [1, 2, 3, 4]
+    assert [r[2] for r in resultados] == [ATUALIZADO, INALTERADO, FALHA, FALHA]
+    assert (resumo.atualizados, resumo.inalterados, resumo.falhas) == (1, 1, 2)
+    assert [a.sku for a in enviados] == [11]
+
+
+def test_combina_status():
+    assert sincronizacao.combina_status(INALTERADO, ATUALIZADO) == ATUALIZADO
+    assert sincronizacao.combina_status(ATUALIZADO, FALHA) == FALHA
+    assert sincronizacao.combina_status(INALTERADO, INALTERADO) == INALTERADO
+
+
+def test_modo_delta_pula_skus_inalterados(monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(sincronizacao, "vtex_fetch_id_info", lambda id_sku: str(id_sku * 10))
+    monkeypatch.setattr(sincronizacao, "vtex_enriquece_sku", _enriquece_fake(chamadas))
+    monkeypatch.setattr(sincronizacao, "vtex_compara_estoque", lambda r: [])
+    monkeypatch.setattr(sincronizacao, "vtex_compara_preco", lambda r: [])
+
+    estado = EstadoSincronizacao(":memory:")
+    estado.registra_estoque(11, {"1f82610": 5})
+    estado.registra_preco(11, "10,50", "0")
+    estado.registra_estoque(12, {"1f82610": 1})
+
+    estoques = {10: {"1f82610": 5}, 20: {"1f82610": 2}}
+    precos = {10: ("10.5", "0"), 20: ("3", "0")}
+    _, resumo = sincronizacao.sincroniza_skus({1: [11], 2: [12]}, None, max_workers=1, estoques_snk=estoques,
+                                              precos_snk=precos, estado=estado, delta=True)
+
+    assert chamadas == [(1, False, False), (2, True, True)]
+    assert resumo.inalterados == 2
+    assert estado.estoque_inalterado(12, {"1f82610": 2})
+    assert not estado.estoque_inalterado(12, {"1f82610": 2, "cd_sul": 0})
+    assert estado.preco_inalterado(12, "3.00", "0")
+
+
+def test_sku_snapshot_compacto_e_comparado(monkeypatch):
+    monkeypatch.setattr(processamentos, "enviar_notificacao_telegram", lambda mensagem: True)
+    registro = SkuSnapshot(1, [11], "10")
+    assert not hasattr(registro, "__dict__")
+    # estoque Sankhya não buscado: nada a comparar
+    assert processamentos.vtex_compara_estoque(registro) == []
+
+    registro.estoque_vtex = {"1f82610": 3}
+    registro.estoque_snk = {"1f82610": 5, "cd_sul": 1}
+    [alteracao] = processamentos.vtex_compara_estoque(registro)
+    assert (alteracao.sku, alteracao.deposito, alteracao.antigo, alteracao.novo) == (11, "1f82610", 3, 5)
+
+
+def test_falha_no_estoque_vtex_nao_registra_estado(monkeypatch):
+    monkeypatch.setattr(processamentos, "enviar_notificacao_telegram", lambda mensagem: True)
+    for modulo in (processamentos, sincronizacao):
+        monkeypatch.setattr(modulo, "vtex_fetch_id_info", lambda id_sku: "10")
+    monkeypatch.setattr(processamentos, "vtex_preco_sku", lambda sku: ("10.5", []))
+    monkeypatch.setattr(sincronizacao, "vtex_aplica_alteracoes_lote", lambda alteracoes: [True] * len(alteracoes))
+    # GET de estoque com erro: vtex_fetch_estoque_sku devolve {}
+    leituras = []
+    monkeypatch.setattr(processamentos, "vtex_estoque_sku", lambda sku: leituras.append(sku) or {})
+
+    estado = EstadoSincronizacao(":memory:")
+    snapshot = dict(estoques_snk={10: {"1f82610": 5}}, precos_snk={10: ("10.5", "0")}, estado=estado)
+    resultados, _ = sincronizacao.sincroniza_skus({1: [11]}, None, max_workers=1, **snapshot)
+    assert resultados == [(1, 11, FALHA)]
+    assert not estado.estoque_inalterado(11, {"1f82610": 5})
+
+    # o --delta seguinte ainda consulta o estoque do SKU
+    sincronizacao.sincroniza_skus({1: [11]}, None, max_workers=1, delta=True, **snapshot)
+    assert leituras == [11, 11]
+
+
+def test_preco_fora_da_carga_em_lote_e_contado(monkeypatch):
+    from utils.metricas import SANKHYA_PRECOS_FORA_DO_LOTE
+    monkeypatch.setattr(processamentos, "sankhya_fetch_preco_venda", lambda refid, client: ("7", "0"))
+    monkeypatch.setattr(processamentos, "vtex_preco_sku", lambda sku: ("7", []))
+    antes = SANKHYA_PRECOS_FORA_DO_LOTE.valor()
+
+    registro = SkuSnapshot(1, [11], "10")
+    processamentos.vtex_busca_preco(registro, None, {20: ("5", "0")})
+    assert registro.preco_snk == "7"
+    assert SANKHYA_PRECOS_FORA_DO_LOTE.valor() == antes + 1
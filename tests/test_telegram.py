@@ -0,0 +1,66 @@
+import sys
+import os
+
+# Garante que a raiz do projeto esteja no path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from notifications import telegram
+
+
+class RespostaFake:
+    def __init__(self, status_code, corpo=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._corpo = corpo or {}
+
+    def json(self):
+        return self._corpo
+
+
+class SessaoFake:
+    """Devolve as respostas configuradas, uma por POST, e guarda os payloads."""
+
+    def __init__(self, respostas):
+        self.respostas = list(respostas)
+        self.payloads = []
+
+    def post(self, url, data=None, timeout=None):
+        self.payloads.append(data)
+        return self.respostas.pop(0)
+
+
+def _configura(monkeypatch, respostas):
+    sessao = SessaoFake(respostas)
+    monkeypatch.setattr(telegram, "get_session", lambda nome, pool_size=10: sessao)
+    return sessao
+
+
+def test_envio_em_texto_puro(monkeypatch):
+    sessao = _configura(monkeypatch, [RespostaFake(200)])
+
+    assert telegram._envia_telegram("⚠️ depósito cd_sul sem *estoque*")
+    assert "parse_mode" not in sessao.payloads[0]
+    assert sessao.payloads[0]["text"] == "⚠️ depósito cd_sul sem *estoque*"
+
+
+def test_429_espera_o_retry_after_e_reenvia(monkeypatch):
+    esperas = []
+    monkeypatch.setattr(telegram.time, "sleep", esperas.append)
+    sessao = _configura(monkeypatch, [
+        RespostaFake(429, {"ok": False, "parameters": {"retry_after": 7}}),
+        RespostaFake(429, headers={"Retry-After": "2"}),
+        RespostaFake(200),
+    ])
+
+    assert telegram._envia_telegram("📊 Resumo: 3 falhas")
+    assert esperas == [7.0, 2.0]
+    assert len(sessao.payloads) == 3
+
+
+def test_429_desiste_apos_os_reenvios(monkeypatch):
+    monkeypatch.setattr(telegram.time, "sleep", lambda segundos: None)
+    monkeypatch.setattr(telegram, "TELEGRAM_RATE_LIMIT_RETRIES", 1)
+    sessao = _configura(monkeypatch, [RespostaFake(429), RespostaFake(429)])
+
+    assert not telegram._envia_telegram("📊 Resumo: 3 falhas")
+    assert len(sessao.payloads) == 2
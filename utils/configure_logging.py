@@ -1,7 +1,11 @@
+import atexit
+import json
 import logging
 import os
+import queue
 from datetime import datetime
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from typing import Optional
 from utils.pg_log_handler import PostgresLogHandler  # ✅ Importa o handler customizado
 
 
@@ -16,7 +20,36 @@ def _get_log_filename(log_dir: str) -> str:
     return os.path.join(log_dir, f"app-{today_str}.log")
 
 
+# "json" grava uma linha JSON por registro, com os campos passados em extra=
+LOG_FORMAT = os.getenv("LOG_FORMAT", "texto")
+
+# Atributos padrão do LogRecord, para separar os campos extras no formato JSON
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro: horário, nível, origem, mensagem e campos extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "origem": f"{record.filename}:{record.lineno}",
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        dados.update({chave: valor for chave, valor in vars(record).items() if chave not in _ATRIBUTOS_RECORD})
+        if record.exc_info:
+            dados["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
 def _build_formatter(env: str) -> logging.Formatter:
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
     if env == "1":
         log_format = "%(asctime)s - %(levelname)s - %(message)s"
     else:
@@ -29,13 +62,18 @@ def configure_logging(project: str = "default"):
     Configura o sistema de logging com:
     - terminal
     - arquivo rotativo com data
-    - envio ao PostgreSQL com nome do projeto
+    - envio ao PostgreSQL com nome do projeto (se DATABASE_URL estiver definida)
+
+    As threads só colocam os registros em uma fila (QueueHandler); a escrita no
+    terminal e no arquivo é feita por uma thread própria (QueueListener), fora
+    dos workers da integração.
     """
+    global _listener
     env = os.getenv("APP_ENV", "0")
     log_dir = _get_log_directory()
     log_file = _get_log_filename(log_dir)
     formatter = _build_formatter(env)
-    log_level = logging.INFO if env == "1" else logging.DEBUG
+    log_level = os.getenv("LOG_LEVEL", "").upper() or (logging.INFO if env == "1" else logging.DEBUG)
 
     # Handler de terminal
     stream_handler = logging.StreamHandler()
@@ -47,18 +85,43 @@ def configure_logging(project: str = "default"):
     )
     file_handler.setFormatter(formatter)
 
-    # Handler de PostgreSQL
-    # pg_handler = PostgresLogHandler(project)
-    # pg_handler.setFormatter(formatter)
+    handlers = [stream_handler, file_handler]
+
+    # Handler de PostgreSQL (em lotes, por uma thread própria), se DATABASE_URL estiver definida
+    if os.getenv("DATABASE_URL"):
+        pg_handler = PostgresLogHandler(project)
+        pg_handler.setFormatter(formatter)
+        pg_handler.setLevel(os.getenv("LOG_PG_LEVEL", "INFO").upper())
+        handlers.append(pg_handler)
 
-    # Aplica todos os handlers
+    # Aplica todos os handlers, atrás de uma fila
+    if _listener is None:
+        atexit.register(_encerra_listener)
+    else:
+        _encerra_listener()
+    fila: queue.Queue = queue.Queue(-1)
+    _listener = QueueListener(fila, *handlers, respect_handler_level=True)
+    _listener.start()
+    # a formatação final fica com os handlers do listener
+    queue_handler = QueueHandler(fila)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
     logging.basicConfig(
         level=log_level,
-        # handlers=[stream_handler, file_handler, pg_handler],
-        handlers=[stream_handler, file_handler],
+        handlers=[queue_handler],
         force=True
     )
 
     logging.debug(f"📄 Logs salvos em: {log_file}")
-    logging.debug(f"📡 Logs também enviados para PostgreSQL com project='{project}'")
+    if len(handlers) > 2:
+        logging.debug(f"📡 Logs também enviados para PostgreSQL com project='{project}'")
     logging.debug(f"🔧 Ambiente de execução: APP_ENV={env}")
+
+
+def _encerra_listener():
+    """Escreve o que ainda estiver na fila de logs (chamado na saída do processo)."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
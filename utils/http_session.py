@@ -0,0 +1,162 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Timeouts padrão (segundos) de conexão e leitura
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+# Retentativas automáticas do urllib3 para falhas de conexão e 502/503/504 em métodos idempotentes
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_RETRY_STATUS = (502, 503, 504)
+# Conexões por cliente httpx nas funções assíncronas (ver get_async_client)
+HTTP_ASYNC_CONEXOES_POR_CLIENTE = int(os.getenv("HTTP_ASYNC_CONEXOES_POR_CLIENTE", "5"))
+
+_sessoes: dict[str, requests.Session] = {}
+_sessoes_lock = threading.Lock()
+# clientes httpx e semáforos asyncio por event loop (não podem ser usados em outro loop)
+_recursos_async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def build_retry(status_forcelist=HTTP_RETRY_STATUS, respeita_retry_after: bool = True) -> Retry:
+    """
+    Política de retry do urllib3. Erros de leitura não são repetidos aqui para não
+    multiplicar os retries que os clientes já fazem em cima de Timeout.
+
+    Com `respeita_retry_after`, o urllib3 também repete 413/429/503 que tragam
+    Retry-After; desligue quando o cliente trata throttling por conta própria.
+    """
+    return Retry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        read=0,
+        status=HTTP_MAX_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=status_forcelist,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=respeita_retry_after,
+        raise_on_status=False,
+    )
+
+
+def get_session(nome: str, pool_size: int = 10, status_forcelist=HTTP_RETRY_STATUS,
+                respeita_retry_after: bool = True) -> requests.Session:
+    """
+    Retorna a sessão HTTP compartilhada de um serviço ('vtex', 'sankhya', 'telegram'...),
+    criando-a no primeiro uso.
+
+    Cada sessão mantém conexões keep-alive por host, com até `pool_size` conexões
+    abertas por host; use o número de workers/concorrência do serviço.
+    """
+    with _sessoes_lock:
+        sessao = _sessoes.get(nome)
+        if sessao is None:
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=pool_size,
+                max_retries=build_retry(status_forcelist, respeita_retry_after),
+            )
+            sessao = requests.Session()
+            sessao.mount("https://", adapter)
+            sessao.mount("http://", adapter)
+            _sessoes[nome] = sessao
+            logging.debug(f"🔌 Sessão HTTP '{nome}' criada (pool {pool_size})")
+        return sessao
+
+
+def http_timeout(read: Optional[float] = None) -> tuple[float, float]:
+    """Timeout (conexão, leitura) no formato aceito pelo requests."""
+    return HTTP_CONNECT_TIMEOUT, read if read is not None else HTTP_READ_TIMEOUT
+
+
+def close_sessions():
+    """Fecha todas as sessões abertas (ex.: ao final da execução)."""
+    with _sessoes_lock:
+        for sessao in _sessoes.values():
+            sessao.close()
+        _sessoes.clear()
+
+
+# ----------------------------------------------------------------------------
+# asyncio
+# ----------------------------------------------------------------------------
+def _recursos_do_loop() -> dict:
+    loop = asyncio.get_running_loop()
+    recursos = _recursos_async.get(loop)
+    if recursos is None:
+        recursos = _recursos_async[loop] = {"clientes": {}, "semaforos": {}}
+    return recursos
+
+
+def get_async_client(nome: str, max_conexoes: int = 100) -> httpx.AsyncClient:
+    """
+    Equivalente assíncrono de get_session: um cliente httpx do serviço no event
+    loop atual. Falhas de conexão são repetidas pelo transporte; status, por
+    request_async.
+
+    As `max_conexoes` conexões keep-alive ficam divididas em clientes de até
+    HTTP_ASYNC_CONEXOES_POR_CLIENTE conexões, devolvidos em rodízio: o pool do
+    httpcore percorre todas as conexões a cada evento, e um pool único com
+    centenas delas gasta mais CPU nisso do que nas requisições. Use junto com
+    semaforo_async(nome, max_conexoes) para limitar as requisições em andamento.
+    """
+    clientes = _recursos_do_loop()["clientes"]
+    rodizio = clientes.get(nome)
+    if rodizio is None:
+        por_cliente = max(1, min(max_conexoes, HTTP_ASYNC_CONEXOES_POR_CLIENTE))
+        limites = httpx.Limits(max_connections=por_cliente, max_keepalive_connections=por_cliente)
+        instancias = [httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(retries=HTTP_MAX_RETRIES, limits=limites))
+                      for _ in range(-(-max_conexoes // por_cliente))]
+        rodizio = clientes[nome] = (instancias, itertools.cycle(instancias))
+        logging.debug(f"🔌 Cliente HTTP assíncrono '{nome}' criado ({len(instancias)} x {por_cliente} conexões)")
+    return next(rodizio[1])
+
+
+def semaforo_async(nome: str, limite: int) -> asyncio.Semaphore:
+    """Semáforo asyncio do serviço no event loop atual, criado no primeiro uso."""
+    semaforos = _recursos_do_loop()["semaforos"]
+    semaforo = semaforos.get(nome)
+    if semaforo is None:
+        semaforo = semaforos[nome] = asyncio.Semaphore(limite)
+    return semaforo
+
+
+async def request_async(cliente: httpx.AsyncClient, metodo: str, url: str, status_forcelist=HTTP_RETRY_STATUS,
+                        respeita_retry_after: bool = True, **kwargs) -> httpx.Response:
+    """
+    cliente.request com a política de status de build_retry: métodos idempotentes
+    que recebem um status de `status_forcelist` são repetidos até HTTP_MAX_RETRIES
+    vezes, com backoff exponencial (ou o Retry-After em segundos, se respeitado).
+    """
+    metodo = metodo.upper()
+    for tentativa in range(HTTP_MAX_RETRIES + 1):
+        resposta = await cliente.request(metodo, url, **kwargs)
+        if (resposta.status_code not in status_forcelist or metodo not in Retry.DEFAULT_ALLOWED_METHODS
+                or tentativa == HTTP_MAX_RETRIES):
+            return resposta
+        retry_after = resposta.headers.get("Retry-After", "")
+        espera = float(retry_after) if respeita_retry_after and retry_after.isdigit() else 0.5 * 2 ** tentativa
+        await asyncio.sleep(espera)
+    return resposta
+
+
+def http_timeout_async(read: Optional[float] = None) -> httpx.Timeout:
+    """Timeout no formato do httpx, com os mesmos valores de http_timeout."""
+    return httpx.Timeout(read if read is not None else HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+async def close_async_clients():
+    """Fecha os clientes assíncronos do event loop atual."""
+    clientes = _recursos_do_loop()["clientes"]
+    for instancias, _ in clientes.values():
+        for cliente in instancias:
+            await cliente.aclose()
+    clientes.clear()
@@ -0,0 +1,55 @@
+import json
+import os
+import threading
+from typing import Any
+
+# Tamanho máximo de payloads/respostas nos logs (caracteres)
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "2000"))
+# Loga o payload de 1 a cada N requisições de cada endpoint (1 loga todas)
+LOG_PAYLOAD_SAMPLE_EVERY = int(os.getenv("LOG_PAYLOAD_SAMPLE_EVERY", "10"))
+
+
+def trunca(texto: str, limite: int = LOG_PAYLOAD_MAX_CHARS) -> str:
+    if limite <= 0 or len(texto) <= limite:
+        return texto
+    return f"{texto[:limite]}… (+{len(texto) - limite} caracteres)"
+
+
+class PayloadLog:
+    """
+    Payload ou corpo de resposta para usar como argumento de logging
+    (`logging.debug("📦 Payload: %s", PayloadLog(dados))`): a serialização só
+    acontece se a mensagem for de fato emitida, e o texto é cortado em
+    LOG_PAYLOAD_MAX_CHARS.
+    """
+    __slots__ = ("conteudo", "limite")
+
+    def __init__(self, conteudo: Any, limite: int = LOG_PAYLOAD_MAX_CHARS):
+        self.conteudo = conteudo
+        self.limite = limite
+
+    def __str__(self) -> str:
+        conteudo = self.conteudo
+        if isinstance(conteudo, bytes):
+            conteudo = conteudo.decode("utf-8", errors="replace")
+        if not isinstance(conteudo, str):
+            try:
+                conteudo = json.dumps(conteudo, ensure_ascii=False, default=str)
+            except (TypeError, ValueError):
+                conteudo = repr(conteudo)
+        return trunca(conteudo, self.limite)
+
+
+class AmostradorPorChave:
+    """Decide, por chave (ex.: endpoint), se a ocorrência atual deve ser logada: 1 a cada `intervalo`."""
+
+    def __init__(self, intervalo: int = LOG_PAYLOAD_SAMPLE_EVERY):
+        self.intervalo = max(1, intervalo)
+        self._contagem: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def amostra(self, chave: str) -> bool:
+        with self._lock:
+            n = self._contagem.get(chave, 0)
+            self._contagem[chave] = n + 1
+        return n % self.intervalo == 0
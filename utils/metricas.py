@@ -0,0 +1,263 @@
+import logging
+from bisect import bisect_left
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+# Exportação: arquivo no formato textfile do node_exporter e/ou endpoint HTTP /metrics
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Limites (segundos) dos buckets dos histogramas de latência
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_metricas: list["_Metrica"] = []
+_servidor: Optional[ThreadingHTTPServer] = None
+
+
+def _escapa(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formata_rotulos(nomes: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{nome}="{_escapa(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        _metricas.append(self)
+
+    def _chave(self, rotulos: dict) -> tuple:
+        return tuple(str(rotulos.get(nome, "")) for nome in self.rotulos)
+
+    def _linhas(self) -> list[str]:
+        raise NotImplementedError
+
+    def exporta(self) -> str:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}", *self._linhas()]
+        return "\n".join(linhas)
+
+
+class Contador(_Metrica):
+    """Valor que só cresce (requisições, retries, SKUs processados)."""
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores: dict[tuple, float] = {}
+
+    def inc(self, valor: float = 1.0, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def valor(self, **rotulos) -> float:
+        with self._lock:
+            return self._valores.get(self._chave(rotulos), 0.0)
+
+    def _linhas(self) -> list[str]:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [f"{self.nome}{_formata_rotulos(self.rotulos, chave)} {valor:g}" for chave, valor in itens]
+
+
+class Medidor(_Metrica):
+    """
+    Valor instantâneo. Com `coleta`, o valor é lido na hora da exportação: a
+    função devolve {valor do primeiro rótulo: número} (ex.: taxas_atuais).
+    """
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), coleta: Optional[Callable[[], dict]] = None):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores: dict[tuple, float] = {}
+        self._coleta = coleta
+
+    def define(self, valor: float, **rotulos):
+        with self._lock:
+            self._valores[self._chave(rotulos)] = valor
+
+    def _linhas(self) -> list[str]:
+        with self._lock:
+            valores = dict(self._valores)
+        if self._coleta is not None:
+            valores.update({(str(chave),): valor for chave, valor in self._coleta().items()})
+        return [f"{self.nome}{_formata_rotulos(self.rotulos, chave)} {valor:g}"
+                for chave, valor in sorted(valores.items())]
+
+
+class Histograma(_Metrica):
+    """Distribuição de durações (segundos) em buckets cumulativos, com soma e contagem."""
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), buckets: tuple = BUCKETS_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+        # por rótulos: [contagem por bucket..., acima do último bucket, soma, total]
+        self._series: dict[tuple, list] = {}
+
+    def observa(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            serie[bisect_left(self.buckets, valor)] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    @contextmanager
+    def mede(self, **rotulos):
+        """Observa o tempo gasto dentro do bloco `with`."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observa(time.perf_counter() - inicio, **rotulos)
+
+    def totais(self) -> dict[tuple, tuple[float, int]]:
+        """{rótulos: (soma, contagem)} de cada série."""
+        with self._lock:
+            return {chave: (serie[-2], serie[-1]) for chave, serie in self._series.items()}
+
+    def _linhas(self) -> list[str]:
+        with self._lock:
+            series = sorted((chave, list(serie)) for chave, serie in self._series.items())
+        linhas = []
+        for chave, serie in series:
+            acumulado = 0
+            limites = [f"{limite:g}" for limite in self.buckets] + ["+Inf"]
+            for le, quantidade in zip(limites, serie[:-2]):
+                acumulado += quantidade
+                rotulos = _formata_rotulos(self.rotulos, chave, 'le="' + le + '"')
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_formata_rotulos(self.rotulos, chave)} {serie[-2]:g}")
+            linhas.append(f"{self.nome}_count{_formata_rotulos(self.rotulos, chave)} {serie[-1]}")
+        return linhas
+
+
+# ----------------------------------------------------------------------------
+# Métricas da integração
+# ----------------------------------------------------------------------------
+VTEX_REQUISICAO_SEGUNDOS = Histograma(
+    "vtex_request_duration_seconds", "Duração de cada tentativa de requisição à VTEX",
+    ("familia", "metodo", "endpoint"))
+VTEX_REQUISICOES = Contador(
+    "vtex_requests_total", "Requisições à VTEX por status (erro = sem resposta)", ("familia", "metodo", "status"))
+VTEX_RETENTATIVAS = Contador(
+    "vtex_retries_total", "Requisições à VTEX repetidas por throttling", ("familia", "status"))
+VTEX_ESPERA_RATE_LIMIT = Contador(
+    "vtex_rate_limit_wait_seconds_total", "Tempo aguardando o rate limit ou Retry-After da VTEX", ("familia",))
+VTEX_ENVIO_SEGUNDOS = Histograma(
+    "vtex_send_duration_seconds", "Duração dos envios de alterações para a VTEX", ("tipo",))
+VTEX_ENVIOS = Contador(
+    "vtex_sends_total", "Envios de alterações para a VTEX por resultado", ("tipo", "resultado"))
+VTEX_ESPELHO_LEITURAS = Contador(
+    "vtex_mirror_reads_total", "Leituras de estoque/preço da VTEX por origem (espelho local ou API)",
+    ("campo", "origem"))
+VTEX_ESPELHO_DIVERGENCIAS = Contador(
+    "vtex_mirror_divergences_total", "Verificações por amostragem em que o espelho local diferia da VTEX", ("campo",))
+
+SANKHYA_REQUISICAO_SEGUNDOS = Histograma(
+    "sankhya_request_duration_seconds", "Duração de cada tentativa de chamada a um serviço Sankhya", ("servico",))
+SANKHYA_REQUISICOES = Contador(
+    "sankhya_requests_total", "Chamadas a serviços Sankhya por status (erro = sem resposta)", ("servico", "status"))
+SANKHYA_RETENTATIVAS = Contador(
+    "sankhya_retries_total", "Chamadas ao Sankhya repetidas por motivo", ("servico", "motivo"))
+SANKHYA_RENOVACOES_TOKEN = Contador(
+    "sankhya_token_refreshes_total", "Logins no Sankhya por resultado", ("resultado",))
+SANKHYA_PRECOS_FORA_DO_LOTE = Contador(
+    "sankhya_price_snapshot_misses_total", "Produtos ausentes da carga de preços em lote, consultados individualmente")
+
+SKUS_PROCESSADOS = Contador(
+    "sync_skus_total", "SKUs processados pela sincronização por status", ("status",))
+ALTERACOES = Contador(
+    "sync_changes_total", "Alterações enviadas para a VTEX por campo e resultado", ("campo", "resultado"))
+SINCRONIZACAO_SEGUNDOS = Medidor(
+    "sync_duration_seconds", "Duração da última sincronização")
+
+
+def exporta_texto() -> str:
+    """Todas as métricas no formato de exposição do Prometheus/OpenMetrics."""
+    return "\n".join(metrica.exporta() for metrica in _metricas) + "\n"
+
+
+def grava_textfile(caminho: str = METRICS_TEXTFILE) -> bool:
+    """
+    Grava as métricas em `caminho` para o textfile collector do node_exporter.
+    A escrita é atômica (arquivo temporário + rename) para o coletor nunca ler
+    um arquivo pela metade.
+    """
+    if not caminho:
+        return False
+    try:
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(exporta_texto())
+        os.replace(temporario, caminho)
+        logging.info(f"📈 Métricas gravadas em {caminho}")
+        return True
+    except OSError as e:
+        logging.error(f"❌ Falha ao gravar métricas em {caminho}: {e}")
+        return False
+
+
+class _MetricasHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = exporta_texto().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def inicia_servidor_http(porta: int = METRICS_PORT) -> Optional[ThreadingHTTPServer]:
+    """Expõe GET /metrics em `porta` por uma thread em segundo plano (0 desativa)."""
+    global _servidor
+    if not porta or _servidor is not None:
+        return _servidor
+    try:
+        _servidor = ThreadingHTTPServer(("0.0.0.0", porta), _MetricasHandler)
+    except OSError as e:
+        logging.error(f"❌ Não foi possível expor métricas na porta {porta}: {e}")
+        return None
+    _servidor.daemon_threads = True
+    threading.Thread(target=_servidor.serve_forever, name="metricas-http", daemon=True).start()
+    logging.info(f"📈 Métricas disponíveis em http://0.0.0.0:{_servidor.server_port}/metrics")
+    return _servidor
+
+
+def resumo_tempos(limite: int = 10) -> list[str]:
+    """
+    Linhas com os endpoints/serviços que mais consumiram tempo na execução,
+    para o log final: "VTEX GET pricing/prices/{id}: 1200 chamadas, 95.3s, média 79 ms".
+    """
+    series = []
+    for chave, (soma, contagem) in VTEX_REQUISICAO_SEGUNDOS.totais().items():
+        series.append((soma, contagem, f"VTEX {chave[1]} {chave[2]}"))
+    for chave, (soma, contagem) in SANKHYA_REQUISICAO_SEGUNDOS.totais().items():
+        series.append((soma, contagem, f"Sankhya {chave[0]}"))
+    series.sort(reverse=True)
+    return [f"{nome}: {contagem} chamadas, {soma:.1f}s, média {soma / contagem * 1000:.0f} ms"
+            for soma, contagem, nome in series[:limite] if contagem]
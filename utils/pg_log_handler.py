@@ -1,34 +1,193 @@
+import json
 import logging
-import psycopg2
 import os
+import queue
+import threading
+import time
+from typing import Optional
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+# Registros por INSERT e segundos máximos entre envios
+LOG_PG_BATCH_SIZE = int(os.getenv("LOG_PG_BATCH_SIZE", "500"))
+LOG_PG_FLUSH_INTERVAL = float(os.getenv("LOG_PG_FLUSH_INTERVAL", "2"))
+# Registros em memória aguardando envio; acima disso vão para o arquivo de spill
+LOG_PG_QUEUE_SIZE = int(os.getenv("LOG_PG_QUEUE_SIZE", "50000"))
+# Arquivo (JSON por linha) para registros que não couberam na fila ou não puderam
+# ser gravados; é reenviado quando o banco volta. Vazio descarta esses registros.
+LOG_PG_SPILL_PATH = os.getenv("LOG_PG_SPILL_PATH", os.path.join(os.getcwd(), "logs", "pg_spill.jsonl"))
+
+_INSERT = "INSERT INTO logs (timestamp, level, logger_name, file_name, line_number, message, project) VALUES %s"
+_TEMPLATE = "(to_timestamp(%s), %s, %s, %s, %s, %s, %s)"
 
 
 class PostgresLogHandler(logging.Handler):
-    def __init__(self, project: str):
+    """
+    Grava os logs na tabela `logs` do PostgreSQL sem bloquear quem loga.
+
+    emit() só formata o registro e o coloca em uma fila; uma thread própria junta
+    até `tamanho_lote` registros (ou o que chegar em `intervalo` segundos) e grava
+    com um único execute_values. Se a conexão cair, o lote vai para o arquivo de
+    spill e a thread reconecta com backoff; o spill é reenviado na reconexão.
+    Com a fila cheia, os registros também vão para o spill (ou são descartados,
+    se LOG_PG_SPILL_PATH estiver vazio).
+    """
+
+    def __init__(self, project: str, tamanho_lote: int = LOG_PG_BATCH_SIZE,
+                 intervalo: float = LOG_PG_FLUSH_INTERVAL, tamanho_fila: int = LOG_PG_QUEUE_SIZE,
+                 arquivo_spill: Optional[str] = LOG_PG_SPILL_PATH):
         super().__init__()
         self.project = project
         self.dsn = os.getenv("DATABASE_URL")
         if not self.dsn:
             raise EnvironmentError("❌ Variável de ambiente DATABASE_URL não está definida.")
 
-        self.conn = psycopg2.connect(self.dsn)
-        self.conn.autocommit = True
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.intervalo = intervalo
+        self.arquivo_spill = arquivo_spill or None
+        self.descartados = 0
+        self.conn = None
+        self._fila: queue.Queue = queue.Queue(maxsize=tamanho_fila)
+        self._spill_lock = threading.Lock()
+        self._parar = threading.Event()
+        self._esvaziar = threading.Event()
+        self._proxima_conexao = 0.0
+        self._falhas_conexao = 0
+        self._thread = threading.Thread(target=self._loop, name="pg-log-writer", daemon=True)
+        self._thread.start()
 
+    # ------------------------------------------------------------------ emit
     def emit(self, record):
         try:
-            message = self.format(record)
-            cursor = self.conn.cursor()
-            query = """
-                INSERT INTO logs (timestamp, level, logger_name, file_name, line_number, message, project)
-                VALUES (CURRENT_TIMESTAMP, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (
-                record.levelname,
-                record.name,
-                record.pathname,
-                record.lineno,
-                message,
-                self.project
-            ))
+            linha = (record.created, record.levelname, record.name, record.pathname, record.lineno,
+                     self.format(record), self.project)
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self._fila.put_nowait(linha)
+        except queue.Full:
+            self._guarda_spill([linha])
+
+    def flush(self):
+        """Pede o envio imediato do que estiver na fila."""
+        self._esvaziar.set()
+
+    def close(self):
+        """Envia o que estiver pendente e encerra a thread e a conexão."""
+        self._parar.set()
+        self._thread.join(timeout=30)
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+        super().close()
+
+    # -------------------------------------------------------------- conexão
+    def _conecta(self):
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    def _conexao(self):
+        """Conexão atual, reconectando com backoff exponencial após falhas."""
+        if self.conn is not None:
+            return self.conn
+        if time.monotonic() < self._proxima_conexao:
+            return None
+        try:
+            self.conn = self._conecta()
+            self._falhas_conexao = 0
+            return self.conn
         except Exception as e:
-            print(f"❌ Erro ao salvar log no PostgreSQL: {e}")
+            self._falhas_conexao += 1
+            espera = min(60.0, 2 ** (self._falhas_conexao - 1))
+            self._proxima_conexao = time.monotonic() + espera
+            print(f"❌ Erro ao conectar no PostgreSQL para logs (nova tentativa em {espera:.0f}s): {e}")
+            return None
+
+    def _desconecta(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def _insere(self, conn, linhas: list):
+        with conn.cursor() as cursor:
+            execute_values(cursor, _INSERT, linhas, template=_TEMPLATE, page_size=self.tamanho_lote)
+
+    # ----------------------------------------------------------------- spill
+    def _guarda_spill(self, linhas: list):
+        if not self.arquivo_spill:
+            self.descartados += len(linhas)
+            return
+        try:
+            with self._spill_lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.arquivo_spill)), exist_ok=True)
+                with open(self.arquivo_spill, "a", encoding="utf-8") as f:
+                    for linha in linhas:
+                        f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+        except OSError as e:
+            self.descartados += len(linhas)
+            print(f"❌ Erro ao gravar spill de logs em {self.arquivo_spill}: {e}")
+
+    def _reenvia_spill(self, conn) -> bool:
+        """Grava no banco os registros do spill. Retorna False se o banco falhar."""
+        if not self.arquivo_spill or not os.path.exists(self.arquivo_spill):
+            return True
+        processando = f"{self.arquivo_spill}.{os.getpid()}.enviando"
+        with self._spill_lock:
+            os.replace(self.arquivo_spill, processando)
+        with open(processando, encoding="utf-8") as f:
+            linhas = [tuple(json.loads(linha)) for linha in f if linha.strip()]
+        for inicio in range(0, len(linhas), self.tamanho_lote):
+            try:
+                self._insere(conn, linhas[inicio:inicio + self.tamanho_lote])
+            except Exception as e:
+                print(f"❌ Erro ao reenviar spill de logs: {e}")
+                self._guarda_spill(linhas[inicio:])
+                os.remove(processando)
+                return False
+        os.remove(processando)
+        return True
+
+    # ------------------------------------------------------------------ loop
+    def _grava(self, lote: list):
+        conn = self._conexao()
+        if conn is None:
+            self._guarda_spill(lote)
+            return
+        try:
+            if self._reenvia_spill(conn):
+                self._insere(conn, lote)
+                return
+        except Exception as e:
+            print(f"❌ Erro ao salvar logs no PostgreSQL: {e}")
+        self._desconecta()
+        self._guarda_spill(lote)
+
+    def _loop(self):
+        lote: list = []
+        limite = time.monotonic() + self.intervalo
+        while True:
+            encerrando = self._parar.is_set()
+            try:
+                lote.append(self._fila.get(timeout=0 if encerrando else min(0.2, self.intervalo)))
+            except queue.Empty:
+                if encerrando:
+                    break
+            agora = time.monotonic()
+            if lote and (len(lote) >= self.tamanho_lote or agora >= limite or self._esvaziar.is_set()):
+                self._grava(lote)
+                lote = []
+            if agora >= limite or not lote:
+                limite = agora + self.intervalo
+            if self._esvaziar.is_set() and self._fila.empty():
+                self._esvaziar.clear()
+        if lote:
+            self._grava(lote)
@@ -0,0 +1,41 @@
+import os
+import zlib
+from typing import Iterable, Iterator
+
+# Quantos processos dividem os limites de requisição da VTEX e do Sankhya
+# (o launcher `main.py --shards N` define; com `--shard i/N` em contêineres, use SYNC_SHARDS=N)
+SYNC_SHARDS = max(1, int(os.getenv("SYNC_SHARDS", "1")))
+
+
+def fatia(limite):
+    """Parte de um limite (req/s ou conexões) que cabe a cada um dos SYNC_SHARDS processos."""
+    if isinstance(limite, int):
+        return max(1, limite // SYNC_SHARDS)
+    return limite / SYNC_SHARDS
+
+
+def le_shard(texto: str) -> tuple[int, int]:
+    """Interpreta "i/N" (1 ≤ i ≤ N), como em `--shard 2/4`."""
+    try:
+        shard, total = (int(parte) for parte in texto.split("/"))
+    except ValueError:
+        raise ValueError(f"shard inválido: {texto!r} (esperado i/N)")
+    if not 1 <= shard <= total:
+        raise ValueError(f"shard inválido: {texto!r} (esperado 1 ≤ i ≤ N)")
+    return shard, total
+
+
+def pertence_ao_shard(id_sku, shard: int, total: int) -> bool:
+    """Distribui os ids por hash (crc32, igual em todos os processos e execuções)."""
+    return zlib.crc32(str(id_sku).encode()) % total == shard - 1
+
+
+def filtra_shard(pares: Iterable[tuple], shard: int, total: int) -> Iterator[tuple]:
+    """Pares (id, sku) do catálogo que pertencem ao shard."""
+    return (par for par in pares if pertence_ao_shard(par[0], shard, total))
+
+
+def caminho_do_shard(caminho: str, shard: int, total: int) -> str:
+    """Arquivo próprio do shard: cache/vtex_journal.sqlite3 → cache/vtex_journal.shard2-4.sqlite3."""
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}.shard{shard}-{total}{extensao}"
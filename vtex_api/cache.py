@@ -0,0 +1,101 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Arquivo SQLite do cache e validade (segundos) dos dados de produto
+VTEX_CACHE_PATH = os.getenv("VTEX_CACHE_PATH", os.path.join(os.getcwd(), "cache", "vtex_cache.sqlite3"))
+VTEX_PRODUCT_CACHE_TTL = int(os.getenv("VTEX_PRODUCT_CACHE_TTL", str(7 * 24 * 60 * 60)))
+
+
+class ProdutoCache:
+    """
+    Cache de RefId/Name por id de produto VTEX.
+
+    Mantém um dicionário em memória na frente de uma tabela SQLite, para que os
+    dados sobrevivam entre execuções. Entradas mais antigas que `ttl` segundos
+    são tratadas como ausentes.
+    """
+
+    def __init__(self, caminho: str = VTEX_CACHE_PATH, ttl: int = VTEX_PRODUCT_CACHE_TTL):
+        self.ttl = ttl
+        self._memoria: dict[int, tuple[str, str, float]] = {}
+        self._lock = threading.Lock()
+
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        # timeout maior: shards em processos separados gravam no mesmo arquivo
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS produto (
+                id            INTEGER PRIMARY KEY,
+                ref_id        TEXT,
+                nome          TEXT,
+                atualizado_em REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def _valido(self, atualizado_em: float) -> bool:
+        return time.time() - atualizado_em < self.ttl
+
+    def get(self, id_produto) -> Optional[tuple[str, str]]:
+        """Retorna (ref_id, nome) se houver entrada válida, senão None."""
+        id_produto = int(id_produto)
+        with self._lock:
+            entrada = self._memoria.get(id_produto)
+            if entrada is None:
+                entrada = self._conn.execute(
+                    "SELECT ref_id, nome, atualizado_em FROM produto WHERE id = ?", (id_produto,)
+                ).fetchone()
+                if entrada is not None:
+                    self._memoria[id_produto] = entrada
+
+        if entrada is None or not self._valido(entrada[2]):
+            return None
+        return entrada[0], entrada[1]
+
+    def set(self, id_produto, ref_id: str, nome: Optional[str]):
+        id_produto = int(id_produto)
+        entrada = (ref_id, nome, time.time())
+        with self._lock:
+            self._memoria[id_produto] = entrada
+            self._conn.execute(
+                "INSERT OR REPLACE INTO produto (id, ref_id, nome, atualizado_em) VALUES (?, ?, ?, ?)",
+                (id_produto, *entrada)
+            )
+            self._conn.commit()
+
+    def invalida(self, id_produto):
+        """Remove um produto do cache (ex.: RefId alterado no catálogo)."""
+        id_produto = int(id_produto)
+        with self._lock:
+            self._memoria.pop(id_produto, None)
+            self._conn.execute("DELETE FROM produto WHERE id = ?", (id_produto,))
+            self._conn.commit()
+
+    def limpa(self):
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            self._memoria.clear()
+            self._conn.execute("DELETE FROM produto")
+            self._conn.commit()
+        logging.info("🧹 Cache de produtos VTEX limpo")
+
+
+_produto_cache: Optional[ProdutoCache] = None
+_produto_cache_lock = threading.Lock()
+
+
+def get_produto_cache() -> ProdutoCache:
+    """Instância compartilhada do cache, criada no primeiro uso."""
+    global _produto_cache
+    with _produto_cache_lock:
+        if _produto_cache is None:
+            _produto_cache = ProdutoCache()
+            logging.debug(f"🗃️ Cache de produtos VTEX em {VTEX_CACHE_PATH} (TTL {VTEX_PRODUCT_CACHE_TTL}s)")
+        return _produto_cache
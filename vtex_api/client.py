@@ -1,20 +1,49 @@
+import asyncio
 import logging
 import os
-import json
+import threading
+import time
+from typing import Optional
+
+import httpx
 import requests
 from dotenv import load_dotenv
 
 from notifications.telegram import enviar_notificacao_telegram
+from utils.http_session import get_session, http_timeout, get_async_client, semaforo_async, request_async, \
+    http_timeout_async
+from utils.log_payload import PayloadLog, AmostradorPorChave
+from utils.shards import fatia
+from utils.metricas import VTEX_REQUISICAO_SEGUNDOS, VTEX_REQUISICOES, VTEX_RETENTATIVAS, VTEX_ESPERA_RATE_LIMIT
+from vtex_api.rate_limit import get_bucket, retry_after_segundos, backoff_com_jitter, familia_endpoint, \
+    modelo_endpoint, VTEX_THROTTLE_STATUS
 
 load_dotenv()
 
 VTEX_APP_KEY = os.getenv("VTEXAPPKEY")
 VTEX_APP_TOKEN = os.getenv("VTEXAPPTOKEN")
 VTEX_BASE_URL = os.getenv("VTEX_BASE_URL", "https://casacontente.vtexcommercestable.com.br/api/")
+# Máximo de requisições simultâneas para a VTEX (compartilhado por todas as threads e
+# dividido entre os SYNC_SHARDS processos)
+VTEX_MAX_CONCURRENCY = fatia(int(os.getenv("VTEX_MAX_CONCURRENCY", "8")))
+# Tentativas por requisição quando a VTEX responde 429/503
+VTEX_MAX_RETRIES = int(os.getenv("VTEX_MAX_RETRIES", "5"))
+# Requisições simultâneas das funções *_async (por event loop); o rate limit por família vale igual
+VTEX_ASYNC_MAX_CONCURRENCY = fatia(int(os.getenv("VTEX_ASYNC_MAX_CONCURRENCY", "100")))
 
 if not VTEX_APP_KEY or not VTEX_APP_TOKEN:
     raise EnvironmentError("❌ VTEXAPPKEY e VTEXAPPTOKEN não foram definidos no .env")
 
+_vtex_semaforo = threading.BoundedSemaphore(VTEX_MAX_CONCURRENCY)
+# payloads e respostas vão para o log em DEBUG, amostrados por endpoint
+_amostrador_payload = AmostradorPorChave()
+
+def _sessao_vtex():
+    # 429/503 são tratados em vtex_request (rate limit adaptativo), não pelo urllib3
+    return get_session("vtex", pool_size=VTEX_MAX_CONCURRENCY, status_forcelist=(502, 504),
+                       respeita_retry_after=False)
+
+
 def build_vtex_request(endpoint: str) -> tuple[str, dict]:
     """
     Constrói URL completa + headers de autenticação para chamadas VTEX.
@@ -35,37 +64,146 @@ def build_vtex_request(endpoint: str) -> tuple[str, dict]:
     return url, headers
 
 
+def _trata_throttle(response, tentativa: int, metodo: str, endpoint: str, familia: str, bucket) -> Optional[float]:
+    """
+    Ajusta o rate limit da família com o status da resposta. Retorna quantos
+    segundos esperar antes de repetir a requisição, ou None se não deve repetir.
+    """
+    if response.status_code not in VTEX_THROTTLE_STATUS:
+        bucket.aumenta()
+        return None
+
+    bucket.reduz()
+    if tentativa == VTEX_MAX_RETRIES:
+        logging.error(f"❌ VTEX [{metodo} {endpoint}] ainda limitada após {VTEX_MAX_RETRIES} tentativas")
+        return None
+    espera = retry_after_segundos(response.headers.get("Retry-After"))
+    if espera is None:
+        espera = backoff_com_jitter(tentativa)
+    logging.warning(f"⏳ VTEX respondeu {response.status_code} [{metodo} {endpoint}], "
+                    f"tentativa {tentativa}/{VTEX_MAX_RETRIES}, aguardando {espera:.1f}s")
+    VTEX_RETENTATIVAS.inc(familia=familia, status=response.status_code)
+    VTEX_ESPERA_RATE_LIMIT.inc(espera, familia=familia)
+    return espera
+
+
 def vtex_request(method: str, endpoint: str, data=None, log_msg=None):
+    """
+    Executa uma requisição VTEX respeitando o rate limit da família do endpoint.
+
+    Respostas 429/503 reduzem a taxa da família e são repetidas até
+    VTEX_MAX_RETRIES vezes, aguardando o Retry-After (ou backoff exponencial com
+    jitter). Retorna o JSON da resposta, {} se vazia, ou None em caso de erro.
+    """
     url, headers = build_vtex_request(endpoint)
+    bucket = get_bucket(endpoint)
+    familia, metodo, modelo = familia_endpoint(endpoint), method.upper(), modelo_endpoint(endpoint)
+    loga_payload = (logging.getLogger().isEnabledFor(logging.DEBUG)
+                    and _amostrador_payload.amostra(f"{metodo} {modelo}"))
     try:
         if log_msg:
             logging.info(log_msg)
 
-        logging.info(f"🔗 URL: {url}")
-        logging.info(f"📨 Método: {method.upper()}")
-        logging.info(f"📦 Payload: {json.dumps(data, indent=2)}")
-        logging.debug(f"🧾 Headers: {headers}")
-
-        response = requests.request(
-            method=method.upper(),
-            url=url,
-            headers=headers,
-            json=data,
-            timeout=30
-        )
-        logging.info(f"📥 Status Code: {response.status_code}")
-        logging.info(f"📥 Response Text: {response.text}")
+        logging.debug("🔗 %s %s", metodo, url)
+        if loga_payload and data is not None:
+            logging.debug("📦 Payload: %s", PayloadLog(data))
+
+        for tentativa in range(1, VTEX_MAX_RETRIES + 1):
+            inicio = time.perf_counter()
+            bucket.adquire()
+            VTEX_ESPERA_RATE_LIMIT.inc(time.perf_counter() - inicio, familia=familia)
+            with _vtex_semaforo, VTEX_REQUISICAO_SEGUNDOS.mede(familia=familia, metodo=metodo, endpoint=modelo):
+                try:
+                    response = _sessao_vtex().request(
+                        method=metodo,
+                        url=url,
+                        headers=headers,
+                        json=data,
+                        timeout=http_timeout(30)
+                    )
+                except requests.RequestException:
+                    VTEX_REQUISICOES.inc(familia=familia, metodo=metodo, status="erro")
+                    raise
+            VTEX_REQUISICOES.inc(familia=familia, metodo=metodo, status=response.status_code)
+            logging.debug("📥 VTEX %s %s → %s", metodo, endpoint, response.status_code,
+                          extra={"familia": familia, "endpoint": modelo, "status": response.status_code})
+
+            espera = _trata_throttle(response, tentativa, metodo, endpoint, familia, bucket)
+            if espera is None:
+                break
+            time.sleep(espera)
+
+        if loga_payload:
+            logging.debug("📥 Resposta: %s", PayloadLog(response.content))
 
         response.raise_for_status()
         return response.json() if response.content else {}
 
     except requests.RequestException as e:
         logging.error(f"❌ Erro na requisição VTEX [{method.upper()} {endpoint}]: {e}")
-        logging.error(f"❌ Corpo da resposta com erro: {response.text if 'response' in locals() else 'sem resposta'}")
+        logging.error("❌ Corpo da resposta com erro: %s",
+                      PayloadLog(response.content) if 'response' in locals() else 'sem resposta')
         # enviar_notificacao_telegram(f"❌ Erro na requisição VTEX [{method.upper()} {endpoint}]: {e}")
         # return None
 
 
+async def vtex_request_async(method: str, endpoint: str, data=None, log_msg=None):
+    """
+    vtex_request para código asyncio, com o mesmo rate limit por família e as
+    mesmas retentativas de 429/503. Até VTEX_ASYNC_MAX_CONCURRENCY requisições
+    ficam em andamento ao mesmo tempo. Retorna o JSON da resposta, {} se vazia,
+    ou None em caso de erro.
+    """
+    url, headers = build_vtex_request(endpoint)
+    bucket = get_bucket(endpoint)
+    familia, metodo, modelo = familia_endpoint(endpoint), method.upper(), modelo_endpoint(endpoint)
+    loga_payload = (logging.getLogger().isEnabledFor(logging.DEBUG)
+                    and _amostrador_payload.amostra(f"{metodo} {modelo}"))
+    response = None
+    try:
+        if log_msg:
+            logging.info(log_msg)
+
+        logging.debug("🔗 %s %s", metodo, url)
+        if loga_payload and data is not None:
+            logging.debug("📦 Payload: %s", PayloadLog(data))
+
+        cliente = get_async_client("vtex", VTEX_ASYNC_MAX_CONCURRENCY)
+        for tentativa in range(1, VTEX_MAX_RETRIES + 1):
+            inicio = time.perf_counter()
+            await bucket.adquire_async()
+            VTEX_ESPERA_RATE_LIMIT.inc(time.perf_counter() - inicio, familia=familia)
+            async with semaforo_async("vtex", VTEX_ASYNC_MAX_CONCURRENCY):
+                with VTEX_REQUISICAO_SEGUNDOS.mede(familia=familia, metodo=metodo, endpoint=modelo):
+                    try:
+                        response = await request_async(cliente, metodo, url, status_forcelist=(502, 504),
+                                                       respeita_retry_after=False, headers=headers, json=data,
+                                                       timeout=http_timeout_async(30))
+                    except httpx.HTTPError:
+                        VTEX_REQUISICOES.inc(familia=familia, metodo=metodo, status="erro")
+                        raise
+            VTEX_REQUISICOES.inc(familia=familia, metodo=metodo, status=response.status_code)
+            logging.debug("📥 VTEX %s %s → %s", metodo, endpoint, response.status_code,
+                          extra={"familia": familia, "endpoint": modelo, "status": response.status_code})
+
+            espera = _trata_throttle(response, tentativa, metodo, endpoint, familia, bucket)
+            if espera is None:
+                break
+            await asyncio.sleep(espera)
+
+        if loga_payload:
+            logging.debug("📥 Resposta: %s", PayloadLog(response.content))
+
+        response.raise_for_status()
+        return response.json() if response.content else {}
+
+    except (httpx.HTTPError, ValueError) as e:
+        logging.error(f"❌ Erro na requisição VTEX [{metodo} {endpoint}]: {e}")
+        logging.error("❌ Corpo da resposta com erro: %s",
+                      PayloadLog(response.content) if response is not None else 'sem resposta')
+        return None
+
+
 def vtex_get(endpoint, log_msg=None):
     return vtex_request("GET", endpoint, log_msg=log_msg)
 
@@ -78,3 +216,15 @@ def vtex_put(endpoint, data, log_msg=None):
 def vtex_delete(endpoint, log_msg=None):
     return vtex_request("DELETE", endpoint, log_msg=log_msg)
 
+
+async def vtex_get_async(endpoint, log_msg=None):
+    return await vtex_request_async("GET", endpoint, log_msg=log_msg)
+
+async def vtex_post_async(endpoint, data, log_msg=None):
+    return await vtex_request_async("POST", endpoint, data=data, log_msg=log_msg)
+
+async def vtex_put_async(endpoint, data, log_msg=None):
+    return await vtex_request_async("PUT", endpoint, data=data, log_msg=log_msg)
+
+async def vtex_delete_async(endpoint, log_msg=None):
+    return await vtex_request_async("DELETE", endpoint, log_msg=log_msg)
@@ -0,0 +1,59 @@
+import os
+from collections import OrderedDict
+
+# Mapeamento dos locais de estoque do Sankhya para os depósitos (warehouseId) da VTEX:
+# entradas "CODEMP:CODLOCAL=warehouseId" separadas por ";". Vários locais apontando
+# para o mesmo depósito têm os estoques somados.
+# Ex.: VTEX_WAREHOUSES="7:188=1f82610;7:200=1f82610;3:101=cd_sul"
+VTEX_WAREHOUSES = os.getenv("VTEX_WAREHOUSES", "7:188=1f82610")
+
+
+def carrega_mapeamento(texto: str) -> "OrderedDict[str, list[tuple[int, int]]]":
+    """
+    Interpreta VTEX_WAREHOUSES.
+
+    Returns:
+        OrderedDict: {warehouse_id: [(codemp, codlocal), ...]} na ordem da configuração
+    """
+    mapeamento: "OrderedDict[str, list[tuple[int, int]]]" = OrderedDict()
+    for entrada in filter(None, (parte.strip() for parte in texto.split(";"))):
+        try:
+            local, deposito = (valor.strip() for valor in entrada.split("="))
+            codemp, codlocal = (int(valor) for valor in local.split(":"))
+        except ValueError:
+            raise ValueError(f"❌ Entrada inválida em VTEX_WAREHOUSES: {entrada!r} (esperado CODEMP:CODLOCAL=warehouseId)")
+        if not deposito:
+            raise ValueError(f"❌ Depósito VTEX vazio em VTEX_WAREHOUSES: {entrada!r}")
+        mapeamento.setdefault(deposito, []).append((codemp, codlocal))
+    if not mapeamento:
+        raise ValueError("❌ VTEX_WAREHOUSES não tem nenhum depósito configurado")
+    return mapeamento
+
+
+MAPEAMENTO_DEPOSITOS = carrega_mapeamento(VTEX_WAREHOUSES)
+# Depósito usado quando nenhum é informado (o primeiro da configuração)
+DEPOSITO_PADRAO = next(iter(MAPEAMENTO_DEPOSITOS))
+
+
+def depositos() -> list[str]:
+    """Depósitos VTEX sincronizados."""
+    return list(MAPEAMENTO_DEPOSITOS)
+
+
+def locais_sankhya() -> list[tuple[int, int]]:
+    """Todos os (CODEMP, CODLOCAL) do Sankhya que alimentam algum depósito."""
+    return [local for locais in MAPEAMENTO_DEPOSITOS.values() for local in locais]
+
+
+def estoque_por_deposito(por_local: dict) -> dict[str, int]:
+    """
+    Converte o estoque de um produto por (CODEMP, CODLOCAL) em estoque por
+    depósito VTEX; locais sem registro contam como zero.
+    """
+    return {deposito: sum(por_local.get(local, 0) for local in locais)
+            for deposito, locais in MAPEAMENTO_DEPOSITOS.items()}
+
+
+def estoques_por_deposito(snapshot: dict) -> dict:
+    """{codprod: {(codemp, codlocal): qtd}} → {codprod: {warehouse_id: qtd}}."""
+    return {codprod: estoque_por_deposito(por_local) for codprod, por_local in snapshot.items()}
@@ -0,0 +1,175 @@
+import logging
+import time
+from decimal import InvalidOperation
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from vtex_api.cache import get_produto_cache
+from vtex_api.depositos import depositos
+from vtex_api.espelho import EspelhoVtex, VTEX_MIRROR_SAMPLE_RATE
+from vtex_api.estado import para_decimal
+from vtex_api.processamentos import normaliza_sku
+
+# Preço que não cabe em centavos exatos (ou inválido): o SKU fica para a comparação por SKU
+SEM_CENTAVOS = np.iinfo(np.int64).min
+
+
+def centavos(valor) -> int:
+    """Preço em centavos (int), ou SEM_CENTAVOS se não for um valor exato em centavos."""
+    return _centavos(None if valor is None else str(valor))
+
+
+# catálogos repetem poucos preços distintos: cada texto é convertido uma vez
+@lru_cache(maxsize=65536)
+def _centavos(valor: Optional[str]) -> int:
+    try:
+        cents = para_decimal(valor) * 100
+    except (InvalidOperation, TypeError):
+        return SEM_CENTAVOS
+    if cents is None or not cents.is_finite() or cents != cents.to_integral_value():
+        return SEM_CENTAVOS
+    return int(cents)
+
+
+def _busca(chaves_ordenadas: np.ndarray, procuradas: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Posição de cada procurada em chaves_ordenadas e se ela foi encontrada."""
+    posicoes = np.searchsorted(chaves_ordenadas, procuradas)
+    posicoes = np.minimum(posicoes, max(len(chaves_ordenadas) - 1, 0))
+    encontradas = (chaves_ordenadas[posicoes] == procuradas) if len(chaves_ordenadas) else \
+        np.zeros(len(procuradas), dtype=bool)
+    return posicoes, encontradas
+
+
+class Catalogo(NamedTuple):
+    """SKUs do catálogo com CODPROD conhecido, em colunas alinhadas."""
+    indice: np.ndarray   # posição do par (id, sku) na entrada
+    sku: np.ndarray
+    codprod: np.ndarray
+
+
+def catalogo_colunar(pares: list[tuple]) -> Catalogo:
+    """
+    Colunas do catálogo (id, sku). O CODPROD vem só do cache de produtos: SKU
+    cujo RefId não está em cache fica fora e segue pela comparação por SKU.
+    """
+    cache = get_produto_cache()
+    indices, skus, codprods = [], [], []
+    for indice, (id_sku, sku) in enumerate(pares):
+        em_cache = cache.get(id_sku)
+        try:
+            codprod, edit_sku = int(em_cache[0]), int(normaliza_sku(sku))
+        except (TypeError, ValueError):
+            continue
+        indices.append(indice)
+        skus.append(edit_sku)
+        codprods.append(codprod)
+    return Catalogo(np.array(indices, dtype=np.int64), np.array(skus, dtype=np.int64),
+                    np.array(codprods, dtype=np.int64))
+
+
+class DiffCatalogo(NamedTuple):
+    """
+    Resultado da comparação em colunas, por posição no Catalogo. SKU que não
+    está ok em um dos campos (diferença, dado ausente ou promoção) segue pela
+    comparação por SKU.
+    """
+    catalogo: Catalogo
+    estoque_ok: np.ndarray       # bool: estoque conhecido dos dois lados e igual
+    preco_ok: np.ndarray         # bool: preço base conhecido dos dois lados, igual e sem promoção
+    diferenca_estoque: np.ndarray  # bool: algum depósito difere
+    diferenca_preco: np.ndarray    # bool: preço base difere
+
+    def inalterados(self) -> np.ndarray:
+        """Índices (na entrada) dos SKUs que não precisam de nenhuma alteração."""
+        return self.catalogo.indice[self.estoque_ok & self.preco_ok]
+
+
+def diff_catalogo(catalogo: Catalogo, estoques_snk: dict, precos_snk: dict, espelho: EspelhoVtex) -> DiffCatalogo:
+    """
+    Compara o snapshot do Sankhya com o espelho local da VTEX para o catálogo
+    inteiro de uma vez: estoque por depósito em inteiros e preço base em
+    centavos int64, unidos por CODPROD/SKU com searchsorted.
+
+    Segue as regras de vtex_compara_estoque/vtex_compara_preco: produto sem
+    estoque no Sankhya vale zero, depósito que o SKU não tem na VTEX é ignorado
+    e SKU com promoção fica para a comparação por SKU (vigência do preço fixo).
+    """
+    mapeados = {deposito: i for i, deposito in enumerate(depositos())}
+    total = len(catalogo.sku)
+    ordem = np.argsort(catalogo.sku, kind="stable")
+    skus_ordenados = catalogo.sku[ordem]
+
+    # Estoque VTEX (espelho): (sku, depósito, quantidade)
+    linhas = espelho.exporta_estoque()
+    sku_vtex = np.array([linha[0] for linha in linhas], dtype=np.int64)
+    dep_vtex = np.array([mapeados.get(linha[1], -1) for linha in linhas], dtype=np.int64)
+    qtd_vtex = np.array([linha[2] for linha in linhas], dtype=np.int64)
+    pos, no_catalogo = _busca(skus_ordenados, sku_vtex)
+    posicao = ordem[pos[no_catalogo]]
+
+    # só depósitos mapeados contam: SKU sem nenhum deles falha em vtex_busca_estoque
+    mapeado = dep_vtex[no_catalogo] >= 0
+    posicao, deposito, qtd = posicao[mapeado], dep_vtex[no_catalogo][mapeado], qtd_vtex[no_catalogo][mapeado]
+    tem_estoque = np.bincount(posicao, minlength=total) > 0
+
+    # Estoque Sankhya: chave codprod * nº de depósitos + depósito
+    n = len(mapeados)
+    chaves_snk = np.array([codprod * n + mapeados[dep] for codprod, por_dep in estoques_snk.items()
+                           for dep in por_dep if dep in mapeados], dtype=np.int64)
+    qtd_snk = np.array([qtd for por_dep in estoques_snk.values() for dep, qtd in por_dep.items() if dep in mapeados],
+                       dtype=np.int64)
+    ordem_snk = np.argsort(chaves_snk, kind="stable")
+    chaves_snk, qtd_snk = chaves_snk[ordem_snk], qtd_snk[ordem_snk]
+    pos_snk, achado = _busca(chaves_snk, catalogo.codprod[posicao] * n + deposito)
+    qtd_esperada = np.where(achado, qtd_snk[pos_snk] if len(qtd_snk) else 0, 0)
+    diferenca_estoque = np.bincount(posicao, weights=(qtd != qtd_esperada).astype(np.float64), minlength=total) > 0
+    estoque_ok = tem_estoque & ~diferenca_estoque
+
+    # Preço base VTEX (espelho) e Sankhya em centavos
+    precos_vtex = espelho.exporta_preco()
+    sku_preco = np.array([linha[0] for linha in precos_vtex], dtype=np.int64)
+    cents_vtex = np.array([centavos(linha[1]) for linha in precos_vtex], dtype=np.int64)
+    pos, no_catalogo = _busca(skus_ordenados, sku_preco)
+    preco_vtex = np.full(total, SEM_CENTAVOS, dtype=np.int64)
+    preco_vtex[ordem[pos[no_catalogo]]] = cents_vtex[no_catalogo]
+
+    codprods_snk = np.array(list(precos_snk), dtype=np.int64)
+    cents_snk = np.array([centavos(par[0]) for par in precos_snk.values()], dtype=np.int64)
+    promo_snk = np.array([float(par[1] or 0) > 0 for par in precos_snk.values()], dtype=bool)
+    ordem_snk = np.argsort(codprods_snk, kind="stable")
+    codprods_snk, cents_snk, promo_snk = codprods_snk[ordem_snk], cents_snk[ordem_snk], promo_snk[ordem_snk]
+    pos_snk, achado = _busca(codprods_snk, catalogo.codprod)
+    preco_snk = np.where(achado, cents_snk[pos_snk] if len(cents_snk) else SEM_CENTAVOS, SEM_CENTAVOS)
+    com_promo = achado & (promo_snk[pos_snk] if len(promo_snk) else False)
+
+    conhecido = (preco_vtex != SEM_CENTAVOS) & (preco_snk != SEM_CENTAVOS)
+    diferenca_preco = conhecido & (preco_vtex != preco_snk)
+    preco_ok = conhecido & ~diferenca_preco & ~com_promo
+    return DiffCatalogo(catalogo, estoque_ok, preco_ok, diferenca_estoque, diferenca_preco)
+
+
+def skus_inalterados(pares: list[tuple], estoques_snk: Optional[dict], precos_snk: Optional[dict],
+                     espelho: Optional[EspelhoVtex]) -> set:
+    """
+    Índices dos pares (id, sku) que o diff em colunas resolve como inalterados,
+    sem passar pelo pipeline. Exige o espelho e os dois snapshots do Sankhya;
+    sem eles, nenhum SKU é resolvido aqui.
+
+    Uma fração VTEX_MIRROR_SAMPLE_RATE dos inalterados segue mesmo assim pelo
+    pipeline, com o espelho conferido contra a VTEX na leitura.
+    """
+    if espelho is None or estoques_snk is None or precos_snk is None:
+        return set()
+    inicio = time.perf_counter()
+    diff = diff_catalogo(catalogo_colunar(pares), estoques_snk, precos_snk, espelho)
+    inalterados = diff.inalterados()
+    sorteados = np.random.random(len(inalterados)) < VTEX_MIRROR_SAMPLE_RATE
+    posicoes = np.searchsorted(diff.catalogo.indice, inalterados)
+    espelho.marca_conferencia(diff.catalogo.sku[posicoes[sorteados]].tolist())
+    inalterados = inalterados[~sorteados]
+    logging.info(f"🧮 Diff em colunas de {len(pares)} SKUs em {(time.perf_counter() - inicio) * 1000:.0f} ms: "
+                 f"{len(inalterados)} inalterados, {int(diff.diferenca_estoque.sum())} com estoque e "
+                 f"{int(diff.diferenca_preco.sum())} com preço a atualizar")
+    return set(inalterados.tolist())
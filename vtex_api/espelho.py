@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from utils.metricas import VTEX_ESPELHO_DIVERGENCIAS, VTEX_ESPELHO_LEITURAS
+from vtex_api.estado import para_decimal
+from vtex_api.fetch import vtex_fetch_estoque_sku, vtex_fetch_preco_sku
+
+# Espelho local do estoque/preço da VTEX: comparações leem dele em vez de consultar a API
+VTEX_MIRROR = os.getenv("VTEX_MIRROR", "0") == "1"
+VTEX_MIRROR_PATH = os.getenv("VTEX_MIRROR_PATH", os.path.join(os.getcwd(), "cache", "vtex_espelho.sqlite3"))
+# Fração das leituras conferidas com um GET na VTEX e idade máxima de uma entrada
+VTEX_MIRROR_SAMPLE_RATE = float(os.getenv("VTEX_MIRROR_SAMPLE_RATE", "0.02"))
+VTEX_MIRROR_TTL_HOURS = float(os.getenv("VTEX_MIRROR_TTL_HOURS", "24"))
+
+
+class EspelhoVtex:
+    """
+    Cópia local, por SKU, do estoque por depósito, do preço base e dos preços fixos
+    da VTEX.
+
+    É preenchida pelas consultas de uma execução completa e atualizada no lugar a
+    cada escrita bem-sucedida (vtex_api.sender e vtex_api.promocao). Entradas mais
+    antigas que `ttl_horas` são tratadas como ausentes e consultadas de novo, o
+    que também corrige alterações feitas na VTEX por fora.
+    """
+
+    def __init__(self, caminho: str = VTEX_MIRROR_PATH, ttl_horas: float = VTEX_MIRROR_TTL_HOURS):
+        self.ttl = ttl_horas * 3600
+        self._lock = threading.Lock()
+        # SKUs sorteados para conferência fora das leituras (ex.: pelo diff em colunas)
+        self._a_conferir: set = set()
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        # timeout maior: shards em processos separados gravam no mesmo arquivo
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS estoque (
+                sku           INTEGER NOT NULL,
+                deposito      TEXT NOT NULL,
+                quantidade    INTEGER NOT NULL,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (sku, deposito)
+            );
+            CREATE TABLE IF NOT EXISTS preco (
+                sku           INTEGER PRIMARY KEY,
+                preco_base    TEXT NOT NULL,
+                fixos         TEXT NOT NULL,
+                atualizado_em REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def _valido(self, atualizado_em: float) -> bool:
+        return time.time() - atualizado_em < self.ttl
+
+    def estoque(self, sku) -> Optional[dict]:
+        """{warehouseId: quantidade} do SKU, ou None se não houver entrada válida."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT deposito, quantidade, atualizado_em FROM estoque WHERE sku = ?", (int(sku),)
+            ).fetchall()
+        if not linhas or not self._valido(min(linha[2] for linha in linhas)):
+            return None
+        return {deposito: quantidade for deposito, quantidade, _ in linhas}
+
+    def preco(self, sku) -> Optional[tuple[str, list]]:
+        """(preço base, preços fixos) do SKU, ou None se não houver entrada válida."""
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT preco_base, fixos, atualizado_em FROM preco WHERE sku = ?", (int(sku),)
+            ).fetchone()
+        if linha is None or not self._valido(linha[2]):
+            return None
+        return linha[0], json.loads(linha[1])
+
+    def registra_estoque(self, sku, estoque: dict):
+        """Substitui o estoque do SKU pelo lido da VTEX."""
+        agora = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM estoque WHERE sku = ?", (int(sku),))
+            self._conn.executemany(
+                "INSERT INTO estoque (sku, deposito, quantidade, atualizado_em) VALUES (?, ?, ?, ?)",
+                [(int(sku), deposito, int(quantidade), agora) for deposito, quantidade in estoque.items()]
+            )
+            self._conn.commit()
+
+    def registra_preco(self, sku, preco_base, fixos: list):
+        """Substitui o preço do SKU pelo lido da VTEX."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO preco (sku, preco_base, fixos, atualizado_em) VALUES (?, ?, ?, ?)",
+                (int(sku), str(preco_base), json.dumps(fixos), time.time())
+            )
+            self._conn.commit()
+
+    def exporta_estoque(self) -> list[tuple]:
+        """Todas as entradas válidas de estoque: (sku, warehouseId, quantidade)."""
+        with self._lock:
+            return self._conn.execute("SELECT sku, deposito, quantidade FROM estoque WHERE atualizado_em > ?",
+                                      (time.time() - self.ttl,)).fetchall()
+
+    def exporta_preco(self) -> list[tuple]:
+        """Todas as entradas válidas de preço: (sku, preço base)."""
+        with self._lock:
+            return self._conn.execute("SELECT sku, preco_base FROM preco WHERE atualizado_em > ?",
+                                      (time.time() - self.ttl,)).fetchall()
+
+    def marca_conferencia(self, skus):
+        """A próxima leitura destes SKUs é conferida com a VTEX, como na amostragem."""
+        self._a_conferir.update(int(sku) for sku in skus)
+
+    def confere(self, sku) -> bool:
+        return int(sku) in self._a_conferir or random.random() < VTEX_MIRROR_SAMPLE_RATE
+
+    # As escritas só alteram o valor: a entrada continua vencendo pela data da última leitura.
+
+    def atualiza_estoque(self, sku, deposito: str, quantidade):
+        with self._lock:
+            self._conn.execute("UPDATE estoque SET quantidade = ? WHERE sku = ? AND deposito = ?",
+                               (int(quantidade), int(sku), deposito))
+            self._conn.commit()
+
+    def atualiza_preco_base(self, sku, preco_base):
+        with self._lock:
+            self._conn.execute("UPDATE preco SET preco_base = ? WHERE sku = ?", (str(preco_base), int(sku)))
+            self._conn.commit()
+
+    def atualiza_fixos(self, sku, fixos: list):
+        with self._lock:
+            self._conn.execute("UPDATE preco SET fixos = ? WHERE sku = ?", (json.dumps(fixos), int(sku)))
+            self._conn.commit()
+
+    def invalida(self, sku):
+        """Remove o SKU do espelho, para que a próxima leitura consulte a VTEX."""
+        with self._lock:
+            self._conn.execute("DELETE FROM estoque WHERE sku = ?", (int(sku),))
+            self._conn.execute("DELETE FROM preco WHERE sku = ?", (int(sku),))
+            self._conn.commit()
+
+
+_espelho: Optional[EspelhoVtex] = None
+_espelho_lock = threading.Lock()
+
+
+def get_espelho() -> Optional[EspelhoVtex]:
+    """Instância compartilhada do espelho, criada no primeiro uso; None com VTEX_MIRROR desativado."""
+    global _espelho
+    if not VTEX_MIRROR:
+        return None
+    with _espelho_lock:
+        if _espelho is None:
+            _espelho = EspelhoVtex()
+            logging.debug(f"🪞 Espelho VTEX em {VTEX_MIRROR_PATH} (TTL {VTEX_MIRROR_TTL_HOURS}h)")
+        return _espelho
+
+
+def vtex_estoque_sku(id_sku, espelho: Optional[EspelhoVtex] = None) -> dict:
+    """
+    vtex_fetch_estoque_sku lendo do espelho local quando ativo. Uma fração
+    VTEX_MIRROR_SAMPLE_RATE das leituras é conferida com a VTEX; o valor da VTEX
+    sempre prevalece e substitui o do espelho.
+    """
+    espelho = espelho or get_espelho()
+    if espelho is None:
+        return vtex_fetch_estoque_sku(id_sku)
+
+    local = espelho.estoque(id_sku)
+    if local is not None and not espelho.confere(id_sku):
+        VTEX_ESPELHO_LEITURAS.inc(campo="estoque", origem="espelho")
+        logging.debug(f"🪞 Estoque VTEX do SKU {id_sku} lido do espelho: {local}")
+        return local
+
+    VTEX_ESPELHO_LEITURAS.inc(campo="estoque", origem="vtex")
+    estoque = vtex_fetch_estoque_sku(id_sku)
+    if local is not None and estoque and estoque != local:
+        VTEX_ESPELHO_DIVERGENCIAS.inc(campo="estoque")
+        logging.warning(f"⚠️ Espelho VTEX divergente no estoque do SKU {id_sku}: espelho {local}, VTEX {estoque}")
+    # vazio também é o retorno de erro: não é gravado
+    if estoque:
+        espelho.registra_estoque(id_sku, estoque)
+    return estoque
+
+
+def _valores_fixos(fixos: list) -> list[tuple]:
+    # datas ficam de fora: a VTEX pode devolvê-las em outro formato que o enviado
+    return sorted((str(fixo.get("tradePolicyId")), para_decimal(fixo.get("value")), int(fixo.get("minQuantity") or 1))
+                  for fixo in fixos)
+
+
+def _mesmo_preco(local: tuple[str, list], preco_base, fixos: list) -> bool:
+    try:
+        return (para_decimal(local[0]) == para_decimal(preco_base)
+                and _valores_fixos(local[1]) == _valores_fixos(fixos))
+    except (ArithmeticError, TypeError, ValueError):
+        return False
+
+
+def vtex_preco_sku(id_sku, espelho: Optional[EspelhoVtex] = None) -> tuple[str, Optional[list]]:
+    """vtex_fetch_preco_sku lendo do espelho local quando ativo (ver vtex_estoque_sku)."""
+    espelho = espelho or get_espelho()
+    if espelho is None:
+        return vtex_fetch_preco_sku(id_sku)
+
+    local = espelho.preco(id_sku)
+    if local is not None and not espelho.confere(id_sku):
+        VTEX_ESPELHO_LEITURAS.inc(campo="preco", origem="espelho")
+        logging.debug(f"🪞 Preço VTEX do SKU {id_sku} lido do espelho: {local[0]}")
+        return local
+
+    VTEX_ESPELHO_LEITURAS.inc(campo="preco", origem="vtex")
+    preco_base, fixos = vtex_fetch_preco_sku(id_sku)
+    # sem fixedPrices na resposta (inclusive em erro) o preço não é gravado
+    if fixos is None:
+        return preco_base, fixos
+    if local is not None and not _mesmo_preco(local, preco_base, fixos):
+        VTEX_ESPELHO_DIVERGENCIAS.inc(campo="preco")
+        logging.warning(f"⚠️ Espelho VTEX divergente no preço do SKU {id_sku}: espelho {local[0]}, VTEX {preco_base}")
+    espelho.registra_preco(id_sku, preco_base, fixos)
+    return preco_base, fixos
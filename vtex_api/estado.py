@@ -0,0 +1,131 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from decimal import Decimal
+from typing import Optional
+
+# Arquivo SQLite com o último estoque/preço enviado por SKU e intervalo da reconciliação completa
+VTEX_STATE_PATH = os.getenv("VTEX_STATE_PATH", os.path.join(os.getcwd(), "cache", "vtex_estado.sqlite3"))
+DELTA_FULL_SYNC_HOURS = float(os.getenv("DELTA_FULL_SYNC_HOURS", "24"))
+
+
+def para_decimal(valor) -> Optional[Decimal]:
+    """Converte preço em str/float (com vírgula ou ponto) para Decimal."""
+    if valor is None:
+        return None
+    return Decimal(str(valor).strip().replace(',', '.'))
+
+
+class EstadoSincronizacao:
+    """
+    Estado local da sincronização: o último valor que sabemos estar na VTEX para
+    cada SKU (quantidade por depósito, preço base e promoção).
+
+    No modo delta, um SKU cujo valor no snapshot do Sankhya é igual ao registrado
+    aqui não precisa ser consultado na VTEX. Como a VTEX pode ser alterada por
+    fora, uma reconciliação completa é feita a cada DELTA_FULL_SYNC_HOURS.
+
+    Com `escopo` (ex.: "shard2-4"), a data da última reconciliação é própria
+    dele: shards gravam no mesmo arquivo, mas cada um reconcilia os seus SKUs.
+    """
+
+    def __init__(self, caminho: str = VTEX_STATE_PATH, escopo: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._chave_reconciliacao = f"ultima_reconciliacao:{escopo}" if escopo else "ultima_reconciliacao"
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        # timeout maior: shards em processos separados gravam no mesmo arquivo
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sku_estado (
+                sku           INTEGER PRIMARY KEY,
+                preco_base    TEXT,
+                promo         TEXT,
+                atualizado_em REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sku_estoque (
+                sku           INTEGER NOT NULL,
+                deposito      TEXT NOT NULL,
+                quantidade    INTEGER NOT NULL,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (sku, deposito)
+            );
+            CREATE TABLE IF NOT EXISTS execucao (
+                chave TEXT PRIMARY KEY,
+                valor REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def _linha(self, sku):
+        return self._conn.execute(
+            "SELECT preco_base, promo FROM sku_estado WHERE sku = ?", (int(sku),)
+        ).fetchone()
+
+    def estoque_inalterado(self, sku, estoques: dict) -> bool:
+        """True se a quantidade registrada de cada depósito de `estoques` ({warehouseId: qtd}) é a mesma."""
+        with self._lock:
+            registrados = dict(self._conn.execute(
+                "SELECT deposito, quantidade FROM sku_estoque WHERE sku = ?", (int(sku),)
+            ).fetchall())
+        return bool(estoques) and all(registrados.get(deposito) == qtd for deposito, qtd in estoques.items())
+
+    def preco_inalterado(self, sku, preco, promo) -> bool:
+        with self._lock:
+            linha = self._linha(sku)
+        if linha is None or linha[0] is None:
+            return False
+        return (para_decimal(linha[0]) == para_decimal(preco)
+                and para_decimal(linha[1] or 0) == para_decimal(promo or 0))
+
+    def registra_estoque(self, sku, estoques: dict):
+        """Registra a quantidade de cada depósito ({warehouseId: qtd}) enviada para a VTEX."""
+        agora = time.time()
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO sku_estoque (sku, deposito, quantidade, atualizado_em) VALUES (?, ?, ?, ?)
+                ON CONFLICT(sku, deposito) DO UPDATE SET quantidade = excluded.quantidade,
+                                                         atualizado_em = excluded.atualizado_em
+            """, [(int(sku), deposito, qtd, agora) for deposito, qtd in estoques.items()])
+            self._conn.commit()
+
+    def registra_preco(self, sku, preco, promo):
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO sku_estado (sku, preco_base, promo, atualizado_em) VALUES (?, ?, ?, ?)
+                ON CONFLICT(sku) DO UPDATE SET preco_base = excluded.preco_base,
+                                               promo = excluded.promo,
+                                               atualizado_em = excluded.atualizado_em
+            """, (int(sku), str(para_decimal(preco)), str(para_decimal(promo or 0)), time.time()))
+            self._conn.commit()
+
+    def remove(self, sku):
+        """Esquece o SKU, forçando a próxima execução a consultá-lo na VTEX."""
+        with self._lock:
+            self._conn.execute("DELETE FROM sku_estado WHERE sku = ?", (int(sku),))
+            self._conn.execute("DELETE FROM sku_estoque WHERE sku = ?", (int(sku),))
+            self._conn.commit()
+
+    def ultima_reconciliacao(self) -> float:
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT valor FROM execucao WHERE chave = ?", (self._chave_reconciliacao,)
+            ).fetchone()
+        return linha[0] if linha else 0.0
+
+    def precisa_reconciliar(self) -> bool:
+        """True se a última reconciliação completa tem mais de DELTA_FULL_SYNC_HOURS."""
+        return time.time() - self.ultima_reconciliacao() >= DELTA_FULL_SYNC_HOURS * 3600
+
+    def marca_reconciliacao(self):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO execucao (chave, valor) VALUES (?, ?)",
+                (self._chave_reconciliacao, time.time())
+            )
+            self._conn.commit()
+        logging.info("🔁 Reconciliação completa registrada no estado local")
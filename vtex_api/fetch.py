@@ -3,7 +3,8 @@ from typing import Optional
 from requests.exceptions import HTTPError
 
 from notifications.telegram import enviar_notificacao_telegram
-from vtex_api.client import vtex_get
+from vtex_api.cache import get_produto_cache
+from vtex_api.client import vtex_get, vtex_get_async
 
 
 def vtex_fetch_total_id_sku_list():
@@ -72,34 +73,66 @@ def vtex_fetch_id_sku_list(start, end):
         return None
 
 
+def _ref_id_da_resposta(id_sku, result, cache) -> Optional[str]:
+    if not result:
+        logging.warning(f"⚠️ Nenhum resultado encontrado para SKU {id_sku}")
+        enviar_notificacao_telegram(f"⚠️ Nenhum resultado encontrado para SKU {id_sku}")
+        return None
+
+    ref_id = result.get("RefId")
+    nome = result.get("Name")
+
+    if ref_id and nome:
+        logging.info(f"📄 Produto: {ref_id} - {nome}")
+    elif ref_id:
+        logging.info(f"📄 Produto: {ref_id}")
+    else:
+        logging.warning(f"⚠️ Produto sem RefId para SKU {id_sku}")
+        enviar_notificacao_telegram(f"⚠️ Produto sem RefId para SKU {id_sku}")
+
+    if ref_id:
+        cache.set(id_sku, ref_id, nome)
+    return ref_id
+
+
 def vtex_fetch_id_info(id_sku):
     """
     Consulta informações básicas do produto a partir de um SKU.
 
     Retorna o RefId (código de referência), ou None em caso de erro.
+    O resultado fica no cache de produtos (vtex_api.cache) até expirar o TTL.
     """
+    cache = get_produto_cache()
+    em_cache = cache.get(id_sku)
+    if em_cache is not None:
+        logging.debug(f"🗃️ RefId do id {id_sku} obtido do cache: {em_cache[0]}")
+        return em_cache[0]
+
     logging.info(f"🟢 Buscando id info no vtex para o id {id_sku}")
     endpoint = f"catalog/pvt/product/{id_sku}"
 
     try:
-        result = vtex_get(endpoint)
-        if not result:
-            logging.warning(f"⚠️ Nenhum resultado encontrado para SKU {id_sku}")
-            enviar_notificacao_telegram(f"⚠️ Nenhum resultado encontrado para SKU {id_sku}")
-            return None
+        return _ref_id_da_resposta(id_sku, vtex_get(endpoint), cache)
 
-        ref_id = result.get("RefId")
-        nome = result.get("Name")
+    except Exception as e:
+        logging.error(f"❌ Erro ao buscar informações do produto SKU {id_sku}: {e}")
+        enviar_notificacao_telegram(f"❌ Erro ao buscar informações do produto SKU {id_sku}: {e}")
+        return None
 
-        if ref_id and nome:
-            logging.info(f"📄 Produto: {ref_id} - {nome}")
-        elif ref_id:
-            logging.info(f"📄 Produto: {ref_id}")
-        else:
-            logging.warning(f"⚠️ Produto sem RefId para SKU {id_sku}")
-            enviar_notificacao_telegram(f"⚠️ Produto sem RefId para SKU {id_sku}")
 
-        return ref_id
+async def vtex_fetch_id_info_async(id_sku):
+    """vtex_fetch_id_info para código asyncio."""
+    cache = get_produto_cache()
+    em_cache = cache.get(id_sku)
+    if em_cache is not None:
+        logging.debug(f"🗃️ RefId do id {id_sku} obtido do cache: {em_cache[0]}")
+        return em_cache[0]
+
+    logging.info(f"🟢 Buscando id info no vtex para o id {id_sku}")
+    endpoint = f"catalog/pvt/product/{id_sku}"
+
+    try:
+        return _ref_id_da_resposta(id_sku, await vtex_get_async(endpoint), cache)
 
     except Exception as e:
         logging.error(f"❌ Erro ao buscar informações do produto SKU {id_sku}: {e}")
@@ -107,54 +140,103 @@ def vtex_fetch_id_info(id_sku):
         return None
 
 
+def _estoque_da_resposta(id_sku, result) -> dict:
+    estoque = {}
+    if not result:
+        logging.warning(f"⚠️ Nenhum resultado para o SKU {id_sku}")
+        enviar_notificacao_telegram(f"⚠️ Nenhum resultado para o SKU {id_sku}")
+        return estoque
+
+    balance = result.get('balance', [])
+    nomes = {}
+    for item in balance:
+        deposito = item.get('warehouseId')
+        total = item.get('totalQuantity')
+        if deposito is not None and total is not None:
+            estoque[deposito] = total
+            nomes[deposito] = item.get('warehouseName') or deposito
+
+    if estoque:
+        log_str = ", ".join(f"{nomes[k]} ({k}) = {v}" for k, v in sorted(estoque.items()))
+        logging.info(f"📦 Estoque VTEX: SKU {id_sku}: {log_str}")
+    else:
+        logging.warning(f"⚠️ SKU {id_sku} com dados de estoque vazios.")
+        enviar_notificacao_telegram(f"⚠️ SKU {id_sku} com dados de estoque vazios.")
+    return estoque
+
+
 def vtex_fetch_estoque_sku(id_sku):
     """
     Consulta o estoque de um SKU na VTEX e retorna um dicionário com os depósitos e suas quantidades.
+
+    Returns:
+        dict: {warehouseId: totalQuantity} com todos os depósitos do array `balance`
     """
     endpoint = f"logistics/pvt/inventory/skus/{id_sku}"
-    estoque = {}
 
     try:
-        result = vtex_get(endpoint)
-        if not result:
-            logging.warning(f"⚠️ Nenhum resultado para o SKU {id_sku}")
-            enviar_notificacao_telegram(f"⚠️ Nenhum resultado para o SKU {id_sku}")
-            return estoque
-
-        balance = result.get('balance', [])
-        for item in balance:
-            deposito = item.get('warehouseName')
-            total = item.get('totalQuantity')
-            if deposito is not None and total is not None:
-                estoque[deposito] = total
-
-        if estoque:
-            log_str = ", ".join(f"{k} = {v}" for k, v in sorted(estoque.items()))
-            logging.info(f"📦 Estoque VTEX: SKU {id_sku}: {log_str}")
-        else:
-            logging.warning(f"⚠️ SKU {id_sku} com dados de estoque vazios.")
-            enviar_notificacao_telegram(f"⚠️ SKU {id_sku} com dados de estoque vazios.")
+        return _estoque_da_resposta(id_sku, vtex_get(endpoint))
 
     except Exception as e:
         logging.error(f"❌ Erro ao consultar estoque do SKU {id_sku}: {e}")
         enviar_notificacao_telegram(f"❌ Erro ao consultar estoque do SKU {id_sku}: {e}")
 
-    return estoque
+    return {}
+
+
+async def vtex_fetch_estoque_sku_async(id_sku):
+    """vtex_fetch_estoque_sku para código asyncio."""
+    endpoint = f"logistics/pvt/inventory/skus/{id_sku}"
+
+    try:
+        return _estoque_da_resposta(id_sku, await vtex_get_async(endpoint))
+
+    except Exception as e:
+        logging.error(f"❌ Erro ao consultar estoque do SKU {id_sku}: {e}")
+        enviar_notificacao_telegram(f"❌ Erro ao consultar estoque do SKU {id_sku}: {e}")
+
+    return {}
+
+
+def _preco_da_resposta(id_sku, result) -> str:
+    preco_venda = result.get('basePrice')
+    logging.debug(f"💵 Preço base Vtex do sku {id_sku}: {preco_venda}")
+    return str(preco_venda)
 
 
 def vtex_fetch_preco_venda_sku(id_sku) -> Optional[str]:
+    return vtex_fetch_preco_sku(id_sku)[0]
+
+
+def vtex_fetch_preco_sku(id_sku) -> tuple[str, Optional[list]]:
+    """
+    Preço base e preços fixos (fixedPrices) do SKU, numa única consulta.
+
+    Returns:
+        tuple: (preço base, lista de preços fixos ou None se não veio na resposta)
+    """
     logging.info(f"🟢 Buscando preço de venda no Vtex para o id {id_sku}")
     endpoint = f"pricing/prices/{id_sku}"
 
     try:
         result = vtex_get(endpoint)
-        preco_venda = result.get('basePrice')
-        logging.debug(f"💵 Preço base Vtex do sku {id_sku}: {preco_venda}")
-        preco_str = str(preco_venda)
-        return preco_str
+        fixos = result.get('fixedPrices')
+        return _preco_da_resposta(id_sku, result), fixos if isinstance(fixos, list) else None
 
     except Exception as e:
         logging.error(f"❌ Erro ao consultar preço de venda do SKU {id_sku}: {e}")
         # enviar_notificacao_telegram(f"❌ Erro ao consultar preço de venda do SKU {id_sku}: {e}")
-        return str(0)
+        return str(0), None
+
+
+async def vtex_fetch_preco_venda_sku_async(id_sku) -> Optional[str]:
+    """vtex_fetch_preco_venda_sku para código asyncio."""
+    logging.info(f"🟢 Buscando preço de venda no Vtex para o id {id_sku}")
+    endpoint = f"pricing/prices/{id_sku}"
+
+    try:
+        return _preco_da_resposta(id_sku, await vtex_get_async(endpoint))
 
+    except Exception as e:
+        logging.error(f"❌ Erro ao consultar preço de venda do SKU {id_sku}: {e}")
+        return str(0)
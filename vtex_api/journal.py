@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator
+
+from vtex_api.processamentos import ATUALIZADO, INALTERADO, FALHA
+
+# Arquivo SQLite com o progresso da execução atual, usado por `main.py --resume`
+VTEX_JOURNAL_PATH = os.getenv("VTEX_JOURNAL_PATH", os.path.join(os.getcwd(), "cache", "vtex_journal.sqlite3"))
+# Registros acumulados antes de cada commit; numa queda, no máximo esses são refeitos
+JOURNAL_COMMIT_EVERY = int(os.getenv("JOURNAL_COMMIT_EVERY", "100"))
+
+_CONCLUIDOS = (ATUALIZADO, INALTERADO)
+
+
+class JournalSincronizacao:
+    """
+    Journal de uma execução de main.main: o mapa id → sku do catálogo, na ordem
+    em que foi lido, e o status de cada SKU processado.
+
+    Como o pipeline termina os SKUs fora de ordem, o progresso é guardado por SKU
+    e não como uma posição no catálogo: ao retomar, os SKUs ATUALIZADO/INALTERADO
+    são pulados e os com FALHA (ou sem resultado) são processados de novo. Se o
+    catálogo não chegou a ser lido inteiro, ele é lido outra vez.
+    """
+
+    def __init__(self, caminho: str = VTEX_JOURNAL_PATH, commit_a_cada: int = JOURNAL_COMMIT_EVERY):
+        self._lock = threading.Lock()
+        self._commit_a_cada = max(1, commit_a_cada)
+        self._pendentes = 0
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS execucao (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS catalogo (
+                id    TEXT PRIMARY KEY,
+                sku   TEXT NOT NULL,
+                ordem INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS resultado (
+                id            TEXT PRIMARY KEY,
+                status        TEXT NOT NULL,
+                atualizado_em REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    # ---------------------------------------------------------------- execução
+    def _define(self, chave: str, valor):
+        self._conn.execute("INSERT OR REPLACE INTO execucao (chave, valor) VALUES (?, ?)", (chave, str(valor)))
+
+    def _valor(self, chave: str):
+        linha = self._conn.execute("SELECT valor FROM execucao WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    def inicia(self):
+        """Descarta a execução anterior e começa uma nova."""
+        with self._lock:
+            self._conn.executescript("DELETE FROM execucao; DELETE FROM catalogo; DELETE FROM resultado;")
+            self._define("iniciada_em", time.time())
+            self._define("concluida", 0)
+            self._conn.commit()
+            self._pendentes = 0
+
+    def pode_retomar(self) -> bool:
+        """True se há uma execução interrompida ou concluída com SKUs em falha."""
+        with self._lock:
+            if self._valor("iniciada_em") is None:
+                return False
+            if self._valor("concluida") != "1":
+                return True
+            return self._conn.execute(
+                "SELECT 1 FROM resultado WHERE status = ? LIMIT 1", (FALHA,)
+            ).fetchone() is not None
+
+    def catalogo_completo(self) -> bool:
+        with self._lock:
+            return self._valor("catalogo_completo") == "1"
+
+    def resumo(self) -> str:
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM catalogo").fetchone()[0]
+            contagem = dict(self._conn.execute("SELECT status, COUNT(*) FROM resultado GROUP BY status").fetchall())
+        concluidos = sum(contagem.get(status, 0) for status in _CONCLUIDOS)
+        return f"{concluidos} de {total} SKUs concluídos, {contagem.get(FALHA, 0)} com falha"
+
+    def conclui(self):
+        """Marca a execução como concluída (um --resume seguinte só refaz as falhas)."""
+        with self._lock:
+            self._define("concluida", 1)
+            self._conn.commit()
+            self._pendentes = 0
+
+    def fecha(self):
+        """Grava o que estiver pendente."""
+        with self._lock:
+            self._conn.commit()
+            self._pendentes = 0
+
+    def _conta_gravacao(self):
+        self._pendentes += 1
+        if self._pendentes >= self._commit_a_cada:
+            self._conn.commit()
+            self._pendentes = 0
+
+    # ---------------------------------------------------------------- catálogo
+    def registra_catalogo(self, pares: Iterable[tuple]) -> Iterator[tuple]:
+        """Repassa os pares (id, sku) gravando-os no journal; ao esgotar, marca o catálogo como completo."""
+        with self._lock:
+            ordem = self._conn.execute("SELECT COALESCE(MAX(ordem), -1) + 1 FROM catalogo").fetchone()[0]
+        for id_sku, sku in pares:
+            with self._lock:
+                cursor = self._conn.execute("INSERT OR IGNORE INTO catalogo (id, sku, ordem) VALUES (?, ?, ?)",
+                                            (json.dumps(id_sku), json.dumps(sku), ordem))
+                ordem += cursor.rowcount
+                self._conta_gravacao()
+            yield id_sku, sku
+        with self._lock:
+            self._define("catalogo_completo", 1)
+            self._conn.commit()
+            self._pendentes = 0
+
+    def catalogo(self) -> Iterator[tuple]:
+        """Pares (id, sku) gravados, na ordem em que foram lidos do catálogo."""
+        with self._lock:
+            linhas = self._conn.execute("SELECT id, sku FROM catalogo ORDER BY ordem").fetchall()
+        for id_sku, sku in linhas:
+            yield json.loads(id_sku), json.loads(sku)
+
+    def pendentes(self, pares: Iterable[tuple]) -> Iterator[tuple]:
+        """Filtra os pares cujo SKU já terminou como ATUALIZADO ou INALTERADO."""
+        with self._lock:
+            concluidos = {id_sku for (id_sku,) in self._conn.execute(
+                f"SELECT id FROM resultado WHERE status IN ({', '.join('?' * len(_CONCLUIDOS))})", _CONCLUIDOS)}
+        pulados = 0
+        for id_sku, sku in pares:
+            if json.dumps(id_sku) in concluidos:
+                pulados += 1
+                continue
+            yield id_sku, sku
+        logging.info(f"⏭️ {pulados} SKUs já concluídos na execução anterior foram pulados")
+
+    # --------------------------------------------------------------- resultado
+    def registra_resultado(self, id_sku, status: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO resultado (id, status, atualizado_em) VALUES (?, ?, ?)",
+                               (json.dumps(id_sku), status, time.time()))
+            self._conta_gravacao()
@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# Marca de fim de fluxo passada de um estágio para o seguinte
+_FIM = object()
+
+
+class Estagio:
+    """
+    Um estágio do pipeline: `funcao` é aplicada a cada item por `workers` threads.
+
+    Se `funcao` retornar None o item é descartado. Se levantar exceção, o item é
+    substituído por `ao_falhar(item, erro)` quando informado, ou descartado.
+    Guarda quantidade de itens e tempo gasto para medir cada estágio isoladamente.
+
+    Com `lote` > 1, cada worker junta até `lote` itens (esperando no máximo
+    `espera_lote` segundos depois do primeiro) e `funcao` recebe a lista,
+    devolvendo uma lista de resultados na mesma ordem.
+    """
+
+    def __init__(self, nome: str, funcao: Callable[[Any], Any], workers: int = 1,
+                 ao_falhar: Optional[Callable[[Any, Exception], Any]] = None,
+                 lote: int = 1, espera_lote: float = 0.5):
+        self.nome = nome
+        self.funcao = funcao
+        self.workers = max(1, workers)
+        self.ao_falhar = ao_falhar
+        self.lote = max(1, lote)
+        self.espera_lote = espera_lote
+        self.processados = 0
+        self.erros = 0
+        self.tempo = 0.0
+        self._lock = threading.Lock()
+
+    def executa(self, item):
+        inicio = time.perf_counter()
+        try:
+            return self.funcao(item)
+        except Exception as e:
+            with self._lock:
+                self.erros += 1
+            logging.error(f"❌ Erro no estágio {self.nome}: {e}", exc_info=True)
+            return self.ao_falhar(item, e) if self.ao_falhar else None
+        finally:
+            with self._lock:
+                self.processados += 1
+                self.tempo += time.perf_counter() - inicio
+
+    def executa_lote(self, itens: list) -> list:
+        inicio = time.perf_counter()
+        try:
+            return self.funcao(itens)
+        except Exception as e:
+            with self._lock:
+                self.erros += len(itens)
+            logging.error(f"❌ Erro no estágio {self.nome} (lote de {len(itens)}): {e}", exc_info=True)
+            return [self.ao_falhar(item, e) if self.ao_falhar else None for item in itens]
+        finally:
+            with self._lock:
+                self.processados += len(itens)
+                self.tempo += time.perf_counter() - inicio
+
+    def estatisticas(self) -> str:
+        media_ms = (self.tempo / self.processados * 1000) if self.processados else 0.0
+        return (f"{self.nome}: {self.processados} itens, {self.erros} erros, {self.workers} workers, "
+                f"{self.tempo:.1f}s ocupados, média {media_ms:.1f} ms/item")
+
+
+def executa_pipeline(fonte: Iterable, estagios: list[Estagio], tamanho_fila: int = 100) -> Iterator:
+    """
+    Executa os estágios em sequência, cada um com suas threads, ligados por filas
+    limitadas a `tamanho_fila` itens: a memória usada não depende do tamanho da
+    fonte, e um estágio lento segura os anteriores em vez de acumular itens.
+
+    A fonte é consumida em uma thread própria. Os itens saem na ordem em que
+    terminam o último estágio. Exceções da fonte são relançadas ao final.
+    """
+    filas = [queue.Queue(maxsize=tamanho_fila) for _ in range(len(estagios) + 1)]
+    erro_fonte: list[BaseException] = []
+
+    def alimenta():
+        try:
+            for item in fonte:
+                filas[0].put(item)
+        except BaseException as e:
+            erro_fonte.append(e)
+        finally:
+            for _ in range(estagios[0].workers):
+                filas[0].put(_FIM)
+
+    def proximo_lote(estagio: Estagio, entrada: queue.Queue) -> tuple[list, bool]:
+        """Junta até estagio.lote itens; o segundo valor indica se chegou o fim do fluxo."""
+        item = entrada.get()
+        if item is _FIM:
+            return [], True
+        itens, limite = [item], time.monotonic() + estagio.espera_lote
+        while len(itens) < estagio.lote:
+            try:
+                item = entrada.get(timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _FIM:
+                return itens, True
+            itens.append(item)
+        return itens, False
+
+    def trabalha(indice: int, restantes: list, lock: threading.Lock):
+        estagio, entrada, saida = estagios[indice], filas[indice], filas[indice + 1]
+        while True:
+            if estagio.lote > 1:
+                itens, fim = proximo_lote(estagio, entrada)
+                resultados = estagio.executa_lote(itens) if itens else []
+            else:
+                item = entrada.get()
+                fim = item is _FIM
+                resultados = [] if fim else [estagio.executa(item)]
+            for resultado in resultados:
+                if resultado is not None:
+                    saida.put(resultado)
+            if fim:
+                break
+        # o último worker a terminar avisa o estágio seguinte
+        with lock:
+            restantes[0] -= 1
+            ultimo = restantes[0] == 0
+        if ultimo:
+            proximos = estagios[indice + 1].workers if indice + 1 < len(estagios) else 1
+            for _ in range(proximos):
+                saida.put(_FIM)
+
+    threads = [threading.Thread(target=alimenta, name="pipeline-fonte", daemon=True)]
+    for indice, estagio in enumerate(estagios):
+        restantes, lock = [estagio.workers], threading.Lock()
+        threads += [threading.Thread(target=trabalha, args=(indice, restantes, lock),
+                                     name=f"pipeline-{estagio.nome}-{n}", daemon=True)
+                    for n in range(estagio.workers)]
+    for thread in threads:
+        thread.start()
+
+    while True:
+        item = filas[-1].get()
+        if item is _FIM:
+            break
+        yield item
+
+    for thread in threads:
+        thread.join()
+    for estagio in estagios:
+        logging.info(f"⏱️ Estágio {estagio.estatisticas()}")
+    if erro_fonte:
+        raise erro_fonte[0]
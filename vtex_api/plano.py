@@ -0,0 +1,173 @@
+import csv
+import json
+import logging
+import math
+import os
+import threading
+from collections import Counter
+from typing import Optional
+
+from vtex_api.processamentos import Alteracao, CAMPO_ESTOQUE, CAMPO_PRECO, CAMPO_PROMO, vtex_aplica_alteracoes_lote
+from vtex_api.promocao import VTEX_PROMO_TRADE_POLICY
+from vtex_api.rate_limit import VTEX_RATE_LIMITS
+from vtex_api.sender import VTEX_BULK_INVENTORY, VTEX_BULK_MAX_ITEMS
+
+# Colunas do plano de alterações (--dry-run) lido pelo --apply
+COLUNAS = ("sku", "codprod", "campo", "antigo", "novo", "preco_lista", "deposito")
+# Alterações enviadas por vez no --apply
+PLAN_APPLY_BATCH = int(os.getenv("PLAN_APPLY_BATCH", "500"))
+
+
+def _formato(caminho: str) -> str:
+    extensao = os.path.splitext(caminho)[1].lower().lstrip(".")
+    if extensao not in ("csv", "jsonl", "parquet"):
+        raise ValueError(f"Formato de plano não suportado: {caminho} (use .csv, .jsonl ou .parquet)")
+    return extensao
+
+
+def _pyarrow():
+    # dependência opcional, só para planos .parquet
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Planos .parquet exigem o pacote pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def _valor_promo_atual(fixos: Optional[list]):
+    """Valor do preço fixo atual na política da promoção, para o plano mostrar o valor antigo."""
+    for fixo in fixos or []:
+        if str(fixo.get("tradePolicyId", VTEX_PROMO_TRADE_POLICY)) == VTEX_PROMO_TRADE_POLICY:
+            return fixo.get("value")
+    return None
+
+
+def linha_do_plano(alteracao: Alteracao) -> dict:
+    antigo = _valor_promo_atual(alteracao.antigo) if alteracao.campo == CAMPO_PROMO else alteracao.antigo
+    return {"sku": alteracao.sku, "codprod": alteracao.codprod, "campo": alteracao.campo, "antigo": antigo,
+            "novo": alteracao.novo, "preco_lista": alteracao.preco_lista, "deposito": alteracao.deposito}
+
+
+def alteracao_da_linha(linha: dict) -> Alteracao:
+    """Alteracao de uma linha do plano; aceita os valores em texto de um CSV."""
+    valores = {coluna: (None if linha.get(coluna) in (None, "") else linha[coluna]) for coluna in COLUNAS}
+    campo = valores["campo"]
+    if campo not in (CAMPO_ESTOQUE, CAMPO_PRECO, CAMPO_PROMO):
+        raise ValueError(f"Campo de alteração desconhecido no plano: {campo}")
+    sku = int(valores["sku"])
+    if campo == CAMPO_ESTOQUE:
+        antigo = None if valores["antigo"] is None else int(float(valores["antigo"]))
+        novo = int(float(valores["novo"]))
+    elif campo == CAMPO_PRECO:
+        antigo, novo = str(valores["antigo"]), str(valores["novo"])
+    else:
+        # os preços fixos atuais não vão no plano; a reconciliação os consulta de novo
+        antigo, novo = None, str(valores["novo"])
+    preco_lista = None if valores["preco_lista"] is None else str(valores["preco_lista"])
+    return Alteracao(sku, valores["codprod"], campo, antigo, novo, preco_lista=preco_lista,
+                     deposito=valores["deposito"])
+
+
+def estima_envio_segundos(contagem: dict) -> float:
+    """
+    Tempo mínimo para enviar as alterações dentro do rate limit da VTEX: estoque
+    na família logistics (em lote com VTEX_BULK_INVENTORY) e preço/promoção na pricing.
+    """
+    estoques = contagem.get(CAMPO_ESTOQUE, 0)
+    requisicoes_logistics = math.ceil(estoques / VTEX_BULK_MAX_ITEMS) if VTEX_BULK_INVENTORY else estoques
+    requisicoes_pricing = contagem.get(CAMPO_PRECO, 0) + contagem.get(CAMPO_PROMO, 0)
+    return max(requisicoes_logistics / VTEX_RATE_LIMITS["logistics"],
+               requisicoes_pricing / VTEX_RATE_LIMITS["pricing"])
+
+
+def _duracao(segundos: float) -> str:
+    return f"{segundos:.0f} s" if segundos < 60 else f"{segundos / 60:.1f} min"
+
+
+class GravadorPlano:
+    """
+    Plano de alterações de um --dry-run, gravado à medida que o pipeline compara
+    os SKUs. O formato vem da extensão do arquivo: .csv, .jsonl ou .parquet
+    (este com pyarrow, gravado inteiro ao fechar).
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.formato = _formato(caminho)
+        self.contagem = Counter()
+        self._lock = threading.Lock()
+        self._linhas: list[dict] = []
+        self._arquivo = None
+        self._csv = None
+        if self.formato == "parquet":
+            _pyarrow()
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._arquivo = open(caminho, "w", encoding="utf-8", newline="")
+        if self.formato == "csv":
+            self._csv = csv.DictWriter(self._arquivo, fieldnames=COLUNAS)
+            self._csv.writeheader()
+
+    def registra(self, alteracoes: list[Alteracao]):
+        linhas = [linha_do_plano(alteracao) for alteracao in alteracoes]
+        with self._lock:
+            self.contagem.update(alteracao.campo for alteracao in alteracoes)
+            if self.formato == "parquet":
+                self._linhas += linhas
+            elif self._csv is not None:
+                self._csv.writerows(linhas)
+            else:
+                self._arquivo.writelines(json.dumps(linha, ensure_ascii=False, default=str) + "\n"
+                                         for linha in linhas)
+
+    def fecha(self):
+        with self._lock:
+            if self.formato == "parquet":
+                pyarrow = _pyarrow()
+                # valores em texto: estoque e preço convivem na mesma coluna
+                colunas = {coluna: [None if linha[coluna] is None else str(linha[coluna]) for linha in self._linhas]
+                           for coluna in COLUNAS}
+                pyarrow.parquet.write_table(pyarrow.table(colunas), self.caminho)
+            elif self._arquivo is not None:
+                self._arquivo.close()
+        total = sum(self.contagem.values())
+        detalhes = ", ".join(f"{quantidade} de {campo}" for campo, quantidade in sorted(self.contagem.items()))
+        logging.info(f"📝 Plano gravado em {self.caminho}: {total} alterações ({detalhes or 'nenhuma'}); "
+                     f"envio estimado em {_duracao(estima_envio_segundos(self.contagem))}")
+
+
+def le_plano(caminho: str) -> list[Alteracao]:
+    """Alterações de um plano gravado por GravadorPlano (.csv, .jsonl ou .parquet)."""
+    formato = _formato(caminho)
+    if formato == "parquet":
+        linhas = _pyarrow().parquet.read_table(caminho).to_pylist()
+    else:
+        with open(caminho, encoding="utf-8", newline="") as arquivo:
+            if formato == "csv":
+                linhas = list(csv.DictReader(arquivo))
+            else:
+                linhas = [json.loads(linha) for linha in arquivo if linha.strip()]
+    return [alteracao_da_linha(linha) for linha in linhas]
+
+
+def aplica_plano(caminho: str, lote: int = PLAN_APPLY_BATCH) -> tuple[int, int]:
+    """
+    Envia para a VTEX as alterações de um plano, sem buscar os SKUs de novo, pelo
+    mesmo caminho do pipeline (vtex_aplica_alteracoes_lote: estoque em lote,
+    preço e promoção em paralelo entre SKUs e em ordem dentro de cada SKU).
+
+    Returns:
+        tuple: (alterações enviadas com sucesso, alterações com falha)
+    """
+    alteracoes = le_plano(caminho)
+    contagem = Counter(alteracao.campo for alteracao in alteracoes)
+    logging.info(f"📤 Aplicando plano {caminho}: {len(alteracoes)} alterações, envio estimado em "
+                 f"{_duracao(estima_envio_segundos(contagem))}")
+    sucessos = falhas = 0
+    for inicio in range(0, len(alteracoes), lote):
+        resultados = vtex_aplica_alteracoes_lote(alteracoes[inicio:inicio + lote])
+        sucessos += sum(1 for ok in resultados if ok)
+        falhas += sum(1 for ok in resultados if not ok)
+        logging.info(f"📤 Plano: {inicio + len(resultados)} de {len(alteracoes)} alterações enviadas")
+    return sucessos, falhas
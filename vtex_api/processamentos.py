@@ -1,24 +1,69 @@
 import logging
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Iterator, NamedTuple, Any
 
 from notifications.telegram import enviar_notificacao_telegram
-from sankhya_api.fetch import sankhya_fetch_estoque, sankhya_fetch_preco_venda
-from vtex_api.create import vtex_create_fixed_price, delete_fixed_prices
-from vtex_api.fetch import vtex_fetch_total_id_sku_list, vtex_fetch_id_sku_list, vtex_fetch_id_info, \
-    vtex_fetch_estoque_sku, vtex_fetch_preco_venda_sku
+from sankhya_api.fetch import sankhya_fetch_estoque_locais, sankhya_fetch_preco_venda
+from utils.metricas import SANKHYA_PRECOS_FORA_DO_LOTE
+from vtex_api.depositos import depositos, locais_sankhya, estoque_por_deposito, DEPOSITO_PADRAO
+from vtex_api.promocao import planeja_promocao, vtex_reconcilia_promocao
+from vtex_api.rate_limit import backoff_com_jitter
+from vtex_api.espelho import vtex_estoque_sku, vtex_preco_sku
+from vtex_api.fetch import vtex_fetch_total_id_sku_list, vtex_fetch_id_sku_list, vtex_fetch_id_info
 from vtex_api.sender import (vtex_send_update_estoque, vtex_send_update_preco_venda,
-                             vtex_update_grupo_informacoes)
+                             vtex_update_grupo_informacoes, vtex_send_estoque_lote, envia_em_paralelo)
 from decimal import Decimal
 
-def vtex_merge_id_sku_dicts():
-    """
-    Consulta todos os IDs e SKUs da VTEX e os combina em um único dicionário.
+# Status de processamento de um SKU
+ATUALIZADO = "atualizado"
+INALTERADO = "inalterado"
+FALHA = "falha"
 
-    Returns:
-        dict: {id: sku}
+# Campos de uma Alteracao
+CAMPO_ESTOQUE = "estoque"
+CAMPO_PRECO = "preco"
+CAMPO_PROMO = "promo"
+
+# Paginação do GetProductAndSkuIds: itens por página e páginas buscadas em paralelo
+VTEX_CATALOG_PAGE_SIZE = 250
+VTEX_CATALOG_FAN_OUT = int(os.getenv("VTEX_CATALOG_FAN_OUT", "4"))
+
+
+def normaliza_sku(sku):
+    """GetProductAndSkuIds devolve uma lista de SKUs por produto; usamos o primeiro."""
+    return sku[0] if isinstance(sku, list) and sku else sku
+
+
+def _vtex_fetch_pagina_id_sku(start: int, end: int, tentativas: int = 3) -> Optional[dict]:
+    """Busca uma página de ids/skus, repetindo com backoff em caso de falha."""
+    for tentativa in range(1, tentativas + 1):
+        try:
+            partial = vtex_fetch_id_sku_list(start, end)
+            if isinstance(partial, dict):
+                return partial
+            logging.warning(f"⚠️ Dados inesperados no intervalo {start}-{end} "
+                            f"(tentativa {tentativa}/{tentativas}): {partial}")
+        except Exception as e:
+            logging.error(f"❌ Erro ao buscar intervalo {start}-{end} (tentativa {tentativa}/{tentativas}): {e}")
+        if tentativa < tentativas:
+            time.sleep(backoff_com_jitter(tentativa))
+    return None
+
+
+def vtex_iter_id_sku(fan_out: Optional[int] = None) -> Iterator[tuple]:
     """
-    id_sku_dict = {}
+    Percorre o catálogo da VTEX buscando várias páginas de GetProductAndSkuIds em
+    paralelo e devolve os pares (id, sku) à medida que cada página chega, sem
+    esperar o catálogo inteiro. Ao final confere a quantidade com range.total.
+
+    Args:
+        fan_out (int): páginas buscadas simultaneamente (padrão VTEX_CATALOG_FAN_OUT)
 
+    Yields:
+        tuple: (id, sku)
+    """
     try:
         total_produtos = vtex_fetch_total_id_sku_list()
         if not total_produtos:
@@ -27,106 +72,359 @@ def vtex_merge_id_sku_dicts():
         logging.error(f"❌ Erro ao obter total de produtos: {e}")
         raise SystemExit(1)
 
-    max_ids_to_fetch = 250
+    fan_out = fan_out or VTEX_CATALOG_FAN_OUT
+    intervalos = [(start, min(start + VTEX_CATALOG_PAGE_SIZE - 1, total_produtos - 1))
+                  for start in range(0, total_produtos, VTEX_CATALOG_PAGE_SIZE)]
+    recebidos = 0
+    paginas_com_falha = []
 
-    for start in range(0, total_produtos, max_ids_to_fetch):
-        end = min(start + max_ids_to_fetch - 1, total_produtos - 1)
-        try:
-            partial = vtex_fetch_id_sku_list(start, end)
-            if isinstance(partial, dict):
-                id_sku_dict.update(partial)
-            else:
-                logging.warning(f"⚠️ Dados inesperados no intervalo {start}-{end}: {partial}")
-        except Exception as e:
-            logging.error(f"❌ Erro ao buscar intervalo {start}-{end}: {e}")
+    with ThreadPoolExecutor(max_workers=fan_out, thread_name_prefix="catalogo") as executor:
+        futures = {executor.submit(_vtex_fetch_pagina_id_sku, start, end): (start, end)
+                   for start, end in intervalos}
+        for future in as_completed(futures):
+            partial = future.result()
+            if partial is None:
+                paginas_com_falha.append(futures[future])
+                continue
+            for id_sku, sku in partial.items():
+                recebidos += 1
+                yield id_sku, sku
 
+    if paginas_com_falha:
+        logging.error(f"❌ Páginas do catálogo sem resposta: {sorted(paginas_com_falha)}")
+        enviar_notificacao_telegram(f"❌ Páginas do catálogo sem resposta: {sorted(paginas_com_falha)}")
+    if recebidos != total_produtos:
+        logging.warning(f"⚠️ Catálogo incompleto: {recebidos} de {total_produtos} produtos recebidos")
+        enviar_notificacao_telegram(f"⚠️ Catálogo incompleto: {recebidos} de {total_produtos} produtos recebidos")
+    else:
+        logging.info(f"🔢 Catálogo completo: {recebidos} produtos em {len(intervalos)} páginas")
+
+
+def vtex_merge_id_sku_dicts(fan_out: Optional[int] = None):
+    """
+    Consulta todos os IDs e SKUs da VTEX e os combina em um único dicionário.
+
+    Returns:
+        dict: {id: sku}
+    """
+    id_sku_dict = dict(vtex_iter_id_sku(fan_out))
     logging.debug(f"🔢 id_sku_dict: {len(id_sku_dict)} itens")
     return id_sku_dict
 
 
-def vtex_atualiza_estoque(id_sku, sku, client):
-    inicio = time.time()
-    try:
-        edit_sku = sku[0] if isinstance(sku, list) and sku else sku
-        logging.info(f"🟢 Buscando dados de estoque do id {id_sku} - sku {edit_sku}")
-
-        refid = vtex_fetch_id_info(id_sku)
-
-        estoque = vtex_fetch_estoque_sku(edit_sku)
-        for deposito, qtd in estoque.items():
-            if deposito == 'Estoque':
-                estoque_snk = sankhya_fetch_estoque(refid, 7, 188, client)
-                estoque_vtex = qtd
-                if estoque_snk != estoque_vtex:
-                    logging.info(f'🚨 Estoque do produto {refid} sku {edit_sku} precisa ser atualizado')
-                    enviar_notificacao_telegram(f'🚨 Estoque do produto {refid} sku {edit_sku} precisa ser atualizado')
-                    logging.info(f'🚨 Estoque Snk: {estoque_snk} | Estoque Vtex: {estoque_vtex}')
-                    enviar_notificacao_telegram(f'🚨 Estoque Snk: {estoque_snk} | Estoque Vtex: {estoque_vtex}')
-                    vtex_send_update_estoque(refid, edit_sku, estoque_snk, estoque_vtex)
+class Alteracao(NamedTuple):
+    """Divergência entre Sankhya e VTEX a ser enviada para a VTEX."""
+    sku: Any
+    codprod: Any
+    campo: str                          # CAMPO_ESTOQUE, CAMPO_PRECO ou CAMPO_PROMO
+    antigo: Any                         # valor atual na VTEX (na promoção, os preços fixos, se conhecidos)
+    novo: Any                           # valor do Sankhya
+    preco_lista: Optional[str] = None   # preço base, usado como listPrice da promoção
+    deposito: Optional[str] = None      # warehouseId VTEX de uma alteração de estoque
 
-    except Exception as e:
-        logging.error(f"❌ Falha ao processar estoque para id {id_sku}, sku {sku}: {e}")
-        enviar_notificacao_telegram(f"❌ Falha ao processar estoque para id {id_sku}, sku {sku}: {e}")
 
-    fim = time.time()
-    duracao_min = (fim - inicio) / 60
-    logging.info(f"⏱️ Tempo total de execução: {duracao_min:.2f} minutos")
+class SkuSnapshot:
+    """
+    Dados VTEX e Sankhya de um SKU, buscados uma única vez (vtex_enriquece_sku) e
+    lidos pelas comparações de estoque e de preço. Usa __slots__ para que um
+    snapshot do catálogo inteiro caiba na memória; campos None não foram buscados.
+    """
+    __slots__ = ("id", "sku", "refid", "estoque_vtex", "estoque_snk", "preco_vtex", "fixos_vtex",
+                 "preco_snk", "promo_snk", "falhas", "alteracoes", "indice", "estado_estoque", "estado_preco")
 
+    def __init__(self, id_sku, sku, refid=None, indice: Optional[int] = None):
+        self.id = id_sku
+        self.sku = normaliza_sku(sku)
+        self.refid = refid
+        self.estoque_vtex: Optional[dict] = None    # {warehouseId: quantidade}
+        self.estoque_snk: Optional[dict] = None     # {warehouseId: quantidade} dos depósitos mapeados
+        self.preco_vtex: Optional[str] = None       # basePrice
+        self.fixos_vtex: Optional[list] = None      # fixedPrices
+        self.preco_snk = None
+        self.promo_snk = None
+        self.falhas: list[str] = []                 # campos que não puderam ser buscados/comparados
+        self.alteracoes: list[Alteracao] = []
+        # usados pelo pipeline de sincronizacao.sincroniza_skus
+        self.indice = indice
+        self.estado_estoque: Optional[dict] = None
+        self.estado_preco: Optional[tuple] = None
 
-def vtex_atualiza_preco_venda(id_sku, sku, client):
+    def __repr__(self) -> str:
+        return f"SkuSnapshot(id={self.id!r}, sku={self.sku!r}, refid={self.refid!r}, falhas={self.falhas!r})"
 
-    inicio = time.time()
-    try:
-        edit_sku = sku[0] if isinstance(sku, list) and sku else sku
-        logging.info(f"🟢 Buscando dados de preço de venda do id {id_sku} - sku {edit_sku}")
 
-        # delete_fixed_prices(edit_sku)
+def vtex_busca_estoque(registro: SkuSnapshot, client, estoques_snk: Optional[dict] = None):
+    """
+    Preenche estoque_vtex e estoque_snk do registro do SKU, ambos {warehouseId: quantidade}.
+    O estoque Sankhya de todos os locais mapeados (VTEX_WAREHOUSES) vem de uma única consulta
+    e o da VTEX, com VTEX_MIRROR=1, do espelho local (vtex_api.espelho).
+    """
+    edit_sku, refid = registro.sku, registro.refid
+    logging.info(f"🟢 Buscando dados de estoque do id {registro.id} - sku {edit_sku}")
+
+    estoque = vtex_estoque_sku(edit_sku)
+    registro.estoque_vtex = estoque
+    # vazio também é o retorno de erro da consulta: sem depósito mapeado, nada foi confirmado
+    if not any(deposito in estoque for deposito in depositos()):
+        raise ValueError(f"estoque VTEX sem depósito mapeado para o sku {edit_sku}")
+
+    if estoques_snk is not None:
+        # produto sem linha no Estoque equivale a estoque zero
+        estoque_snk = estoques_snk.get(int(refid)) or estoque_por_deposito({})
+    else:
+        por_local = sankhya_fetch_estoque_locais(refid, locais_sankhya(), client)
+        if por_local is None:
+            raise ValueError(f"estoque Sankhya indisponível para o produto {refid}")
+        estoque_snk = estoque_por_deposito(por_local)
+    registro.estoque_snk = estoque_snk
+
 
-        # 1) Busca no VTEX para obter o refid
-        refid = vtex_fetch_id_info(id_sku)
+def vtex_busca_preco(registro: SkuSnapshot, client, precos_snk: Optional[dict] = None):
+    """Preenche preco_snk, promo_snk, preco_vtex e fixos_vtex do registro do SKU."""
+    edit_sku, refid = registro.sku, registro.refid
+    logging.info(f"🟢 Buscando dados de preço de venda do id {registro.id} - sku {edit_sku}")
 
-        # 2) Chama o Sankhya
-        preco, preco_promo = sankhya_fetch_preco_venda(refid, client)
-        if preco is None:
-            logging.error(f"⚠️ Preço Sankhya ausente para produto {refid}")
-            enviar_notificacao_telegram(f"⚠️ Preço Sankhya ausente para produto {refid}")
+    # Chama o Sankhya (ou usa o snapshot em lote)
+    if precos_snk is not None and int(refid) in precos_snk:
+        preco, preco_promo = precos_snk[int(refid)]
+    else:
+        if precos_snk is not None:
+            SANKHYA_PRECOS_FORA_DO_LOTE.inc()
+        preco, preco_promo = sankhya_fetch_preco_venda(refid, client) or (None, None)
+    if preco is None:
+        logging.error(f"⚠️ Preço Sankhya ausente para produto {refid}")
+        enviar_notificacao_telegram(f"⚠️ Preço Sankhya ausente para produto {refid}")
+        raise ValueError(f"preço Sankhya ausente para o produto {refid}")
 
-        # 3) Busca no VTEX o preço do SKU
-        preco_vtex = vtex_fetch_preco_venda_sku(edit_sku)
+    registro.preco_snk = preco
+    registro.promo_snk = preco_promo
+    # Busca no VTEX (ou no espelho local) o preço do SKU
+    registro.preco_vtex, registro.fixos_vtex = vtex_preco_sku(edit_sku)
+
+
+def vtex_enriquece_sku(id_sku, sku, client, estoques_snk: Optional[dict] = None,
+                       precos_snk: Optional[dict] = None, estoque: bool = True, preco: bool = True) -> SkuSnapshot:
+    """
+    Reúne os dados VTEX e Sankhya de um SKU necessários para as comparações.
+
+    Returns:
+        SkuSnapshot: id, sku, refid e, conforme `estoque`/`preco`, os campos preenchidos
+                     por vtex_busca_estoque/vtex_busca_preco. A lista `falhas` traz os
+                     campos que não puderam ser buscados.
+    """
+    # Busca no VTEX o refid (codprod no Sankhya)
+    registro = SkuSnapshot(id_sku, sku, vtex_fetch_id_info(id_sku))
+
+    etapas = ((CAMPO_ESTOQUE, estoque, vtex_busca_estoque, estoques_snk),
+              (CAMPO_PRECO, preco, vtex_busca_preco, precos_snk))
+    for campo, ativo, busca, snapshot in etapas:
+        if not ativo:
+            continue
+        try:
+            busca(registro, client, snapshot)
+        except Exception as e:
+            logging.error(f"❌ Falha ao buscar {campo} para id {id_sku}, sku {sku}: {e}")
+            enviar_notificacao_telegram(f"❌ Falha ao buscar {campo} para id {id_sku}, sku {sku}: {e}")
+            registro.falhas.append(campo)
+    return registro
 
-        logging.info(f"💵 Preço de venda codprod {refid} Sku {edit_sku} Sankhya: {preco} | Vtex: {preco_vtex}")
 
-        # Normalização
-        norm_preco_snk = preco.strip().replace(',', '.')
-        norm_preco_vtex = preco_vtex.strip().replace(',', '.')
-        logging.debug(f"🔢 Normalização preço Sankhya {norm_preco_snk}")
-        logging.debug(f"🔢 Normalização preço Vtex {norm_preco_vtex}")
+def vtex_compara_estoque(registro: SkuSnapshot) -> list[Alteracao]:
+    """Retorna uma alteração de estoque por depósito mapeado em que VTEX e Sankhya divergem."""
+    estoque_vtex = registro.estoque_vtex or {}
+    if registro.estoque_snk is None:
+        return []
 
-        dec_preco_sankhya = Decimal(norm_preco_snk)
-        dec_preco_vtex = Decimal(norm_preco_vtex)
+    refid, edit_sku = registro.refid, registro.sku
+    alteracoes = []
+    for deposito, estoque_snk in registro.estoque_snk.items():
+        # depósito que o SKU não tem na VTEX não é criado por aqui
+        if deposito not in estoque_vtex or estoque_snk == estoque_vtex[deposito]:
+            continue
+        qtd_vtex = estoque_vtex[deposito]
+        logging.info(f'🚨 Estoque do produto {refid} sku {edit_sku} precisa ser atualizado no depósito {deposito}')
+        enviar_notificacao_telegram(f'🚨 Estoque do produto {refid} sku {edit_sku} precisa ser atualizado no depósito {deposito}')
+        logging.info(f'🚨 Estoque Snk: {estoque_snk} | Estoque Vtex: {qtd_vtex}')
+        enviar_notificacao_telegram(f'🚨 Estoque Snk: {estoque_snk} | Estoque Vtex: {qtd_vtex}')
+        alteracoes.append(Alteracao(edit_sku, refid, CAMPO_ESTOQUE, qtd_vtex, estoque_snk, deposito=deposito))
+    return alteracoes
 
-        if dec_preco_sankhya != dec_preco_vtex:
-            logging.info(f'🚨 Preço do produto {refid} sku {edit_sku} precisa ser atualizado')
-            enviar_notificacao_telegram(f'🚨 Preço do produto {refid} sku {edit_sku} precisa ser atualizado')
-            logging.info(f'🚨 Preço Snk: {dec_preco_sankhya} | Preço Vtex: {dec_preco_vtex}')
-            enviar_notificacao_telegram(f'🚨 Preço Snk: {dec_preco_sankhya} | Preço Vtex: {dec_preco_vtex}')
-            logging.debug(f"⚠️ Enviando para atualização de preços: {refid}, {edit_sku}, {preco}, {preco_vtex}")
-            vtex_send_update_preco_venda(refid, edit_sku, preco, preco_vtex)
+
+def vtex_compara_preco(registro: SkuSnapshot) -> list[Alteracao]:
+    """Retorna as alterações de preço base e de promoção do SKU."""
+    if registro.preco_vtex is None:
+        return []
+
+    refid, edit_sku = registro.refid, registro.sku
+    preco, preco_promo, preco_vtex = registro.preco_snk, registro.promo_snk, registro.preco_vtex
+    logging.info(f"💵 Preço de venda codprod {refid} Sku {edit_sku} Sankhya: {preco} | Vtex: {preco_vtex}")
+
+    # Normalização
+    norm_preco_snk = preco.strip().replace(',', '.')
+    norm_preco_vtex = preco_vtex.strip().replace(',', '.')
+    logging.debug(f"🔢 Normalização preço Sankhya {norm_preco_snk}")
+    logging.debug(f"🔢 Normalização preço Vtex {norm_preco_vtex}")
+
+    dec_preco_sankhya = Decimal(norm_preco_snk)
+    dec_preco_vtex = Decimal(norm_preco_vtex)
+
+    alteracoes = []
+    if dec_preco_sankhya != dec_preco_vtex:
+        logging.info(f'🚨 Preço do produto {refid} sku {edit_sku} precisa ser atualizado')
+        enviar_notificacao_telegram(f'🚨 Preço do produto {refid} sku {edit_sku} precisa ser atualizado')
+        logging.info(f'🚨 Preço Snk: {dec_preco_sankhya} | Preço Vtex: {dec_preco_vtex}')
+        enviar_notificacao_telegram(f'🚨 Preço Snk: {dec_preco_sankhya} | Preço Vtex: {dec_preco_vtex}')
+        alteracoes.append(Alteracao(edit_sku, refid, CAMPO_PRECO, preco_vtex, preco))
+    else:
+        logging.info(f"✅ Preços iguais: {dec_preco_sankhya}")
+
+    logging.info(f"Preço promo {preco_promo}")
+    if float(preco_promo) > 0:
+        fixos = registro.fixos_vtex
+        if fixos is not None and planeja_promocao(fixos, preco, preco_promo) is None:
+            logging.info('💵 Produto possui desconto e o preço fixo no vtex já está em vigor')
         else:
-            logging.info(f"✅ Preços iguais: {dec_preco_sankhya}")
+            logging.info('💵 Produto possui desconto, gravando preço fixo no vtex')
+            alteracoes.append(Alteracao(edit_sku, refid, CAMPO_PROMO, fixos, preco_promo, preco_lista=preco))
+    else:
+        logging.info('💵 Produto não possui desconto')
+
+    return alteracoes
+
+
+def vtex_aplica_alteracao(alteracao: Alteracao) -> bool:
+    """Envia uma alteração para a VTEX. Retorna True em caso de sucesso."""
+    if alteracao.campo == CAMPO_ESTOQUE:
+        return vtex_send_update_estoque(alteracao.codprod, alteracao.sku, alteracao.novo, alteracao.antigo,
+                                        alteracao.deposito or DEPOSITO_PADRAO)
+    if alteracao.campo == CAMPO_PRECO:
+        logging.debug(f"⚠️ Enviando para atualização de preços: {alteracao.codprod}, {alteracao.sku}, "
+                      f"{alteracao.novo}, {alteracao.antigo}")
+        return vtex_send_update_preco_venda(alteracao.codprod, alteracao.sku, alteracao.novo, alteracao.antigo)
+    if alteracao.campo == CAMPO_PROMO:
+        return vtex_reconcilia_promocao(alteracao.sku, alteracao.preco_lista, alteracao.novo, alteracao.antigo)
+    raise ValueError(f"Campo de alteração desconhecido: {alteracao.campo}")
+
+
+def vtex_aplica_alteracoes_lote(alteracoes: list[Alteracao]) -> list[bool]:
+    """
+    Envia alterações de vários SKUs de uma vez: o estoque pelo envio em lote
+    (vtex_send_estoque_lote) e preço/promoção, que não têm endpoint em lote na
+    VTEX, SKU a SKU em paralelo. Dentro de um SKU o preço base vai antes do
+    preço fixo promocional, que depende do registro de preço já existir.
+
+    Returns:
+        list: sucesso de cada alteração, na mesma ordem de `alteracoes`
+    """
+    resultados: list[Optional[bool]] = [None] * len(alteracoes)
+    estoques = [i for i, a in enumerate(alteracoes) if a.campo == CAMPO_ESTOQUE]
+    outros = [i for i, a in enumerate(alteracoes) if a.campo != CAMPO_ESTOQUE]
+
+    if estoques:
+        itens = [(alteracoes[i].codprod, alteracoes[i].sku, alteracoes[i].novo, alteracoes[i].antigo,
+                  alteracoes[i].deposito or DEPOSITO_PADRAO) for i in estoques]
+        for i, sucesso in zip(estoques, vtex_send_estoque_lote(itens)):
+            resultados[i] = sucesso
+    if outros:
+        por_sku: dict = {}
+        for i in outros:
+            por_sku.setdefault(alteracoes[i].sku, []).append(i)
+        grupos = [sorted(indices, key=lambda i: alteracoes[i].campo != CAMPO_PRECO) for indices in por_sku.values()]
+        enviados = envia_em_paralelo(_aplica_em_ordem, [([alteracoes[i] for i in grupo],) for grupo in grupos])
+        for grupo, sucessos in zip(grupos, enviados):
+            for i, sucesso in zip(grupo, sucessos):
+                resultados[i] = sucesso
+    return resultados
+
+
+def _aplica_em_ordem(alteracoes: list[Alteracao]) -> list[bool]:
+    """Alterações de um mesmo SKU, uma depois da outra."""
+    return [_aplica_isolada(alteracao) for alteracao in alteracoes]
+
+
+def _aplica_isolada(alteracao: Alteracao) -> bool:
+    """vtex_aplica_alteracao sem deixar o erro de um SKU derrubar o lote inteiro."""
+    try:
+        return vtex_aplica_alteracao(alteracao)
+    except Exception as e:
+        logging.error(f"❌ Erro ao enviar {alteracao.campo} do sku {alteracao.sku}: {e}")
+        enviar_notificacao_telegram(f"❌ Erro ao enviar {alteracao.campo} do sku {alteracao.sku}: {e}")
+        return False
+
+
+def vtex_aplica_alteracoes(alteracoes: list[Alteracao]) -> str:
+    """
+    Envia as alterações de um SKU e resume o resultado.
+    A renovação do preço fixo promocional não conta como atualização.
+
+    Returns:
+        str: ATUALIZADO, INALTERADO ou FALHA
+    """
+    status = INALTERADO
+    for alteracao in alteracoes:
+        if not vtex_aplica_alteracao(alteracao):
+            status = FALHA
+        elif status != FALHA and alteracao.campo != CAMPO_PROMO:
+            status = ATUALIZADO
+    return status
+
+
+def vtex_atualiza_estoque(id_sku, sku, client, estoques_snk: Optional[dict] = None) -> str:
+    """
+    Compara o estoque VTEX x Sankhya do SKU e envia a atualização se necessário.
 
-        logging.info(f"Preço promo {preco_promo}")
-        if float(preco_promo) > 0:
-            logging.info('💵 Produto possui desconto, criando preço fixo no vtex')
-            vtex_create_fixed_price(edit_sku, preco, preco_promo)
+    Se `estoques_snk` ({codprod: {warehouseId: estoque}}, ver sankhya_fetch_estoque_locais_lote
+    e depositos.estoques_por_deposito) for informado, o estoque Sankhya é lido dele
+    em vez de consultado produto a produto.
+
+    Returns:
+        str: ATUALIZADO, INALTERADO ou FALHA
+    """
+    inicio = time.time()
+    try:
+        registro = vtex_enriquece_sku(id_sku, sku, client, estoques_snk=estoques_snk, preco=False)
+        if registro.falhas:
+            status = FALHA
         else:
-            logging.info('💵 Produto não possui desconto')
+            status = vtex_aplica_alteracoes(vtex_compara_estoque(registro))
 
+    except Exception as e:
+        logging.error(f"❌ Falha ao processar estoque para id {id_sku}, sku {sku}: {e}")
+        enviar_notificacao_telegram(f"❌ Falha ao processar estoque para id {id_sku}, sku {sku}: {e}")
+        status = FALHA
+
+    fim = time.time()
+    duracao_min = (fim - inicio) / 60
+    logging.info(f"⏱️ Tempo total de execução: {duracao_min:.2f} minutos")
+    return status
+
+
+def vtex_atualiza_preco_venda(id_sku, sku, client, precos_snk: Optional[dict] = None) -> str:
+    """
+    Compara o preço de venda VTEX x Sankhya do SKU, envia a atualização se
+    necessário e grava o preço fixo quando a promoção mudar ou estiver perto de expirar.
+
+    Se `precos_snk` ({codprod: (preco, promo)}, ver sankhya_fetch_precos_lote) tiver
+    o produto, o preço Sankhya é lido dele; senão é consultado individualmente.
+
+    Returns:
+        str: ATUALIZADO, INALTERADO ou FALHA
+    """
+    inicio = time.time()
+    try:
+        registro = vtex_enriquece_sku(id_sku, sku, client, precos_snk=precos_snk, estoque=False)
+        if registro.falhas:
+            status = FALHA
+        else:
+            status = vtex_aplica_alteracoes(vtex_compara_preco(registro))
 
     except Exception as e:
         logging.error(f"❌ Falha ao processar id {id_sku}, sku {sku}: {e}")
         enviar_notificacao_telegram(f"❌ Falha ao processar id {id_sku}, sku {sku}: {e}")
+        status = FALHA
 
     fim = time.time()
     duracao_min = (fim - inicio) / 60
     logging.info(f"⏱️ Tempo total de execução: {duracao_min:.2f} minutos")
+    return status
+
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import InvalidOperation
+from typing import Optional, NamedTuple
+
+from notifications.telegram import enviar_notificacao_telegram
+from vtex_api.client import vtex_delete, vtex_post
+from vtex_api.create import get_fixed_prices
+from vtex_api.espelho import get_espelho
+from vtex_api.estado import para_decimal
+
+# Política comercial em que o preço promocional é publicado como preço fixo
+VTEX_PROMO_TRADE_POLICY = os.getenv("VTEX_PROMO_TRADE_POLICY", "1")
+# Vigência de um preço fixo novo e quanto antes do fim ela é estendida
+VTEX_PROMO_VALIDITY_HOURS = float(os.getenv("VTEX_PROMO_VALIDITY_HOURS", "24"))
+VTEX_PROMO_RENEW_HOURS = float(os.getenv("VTEX_PROMO_RENEW_HOURS", "12"))
+
+_FUSO = timezone(timedelta(hours=-3))
+
+
+class PlanoPromocao(NamedTuple):
+    """Escrita necessária para o preço fixo promocional de um SKU ficar como desejado."""
+    remove: bool        # apaga antes os preços fixos da política (há faixas de quantidade além da de 1)
+    preco_fixo: dict    # item enviado no POST
+    motivo: str
+
+
+def _iguais(valor_vtex, valor_snk) -> bool:
+    try:
+        return para_decimal(valor_vtex) == para_decimal(valor_snk)
+    except InvalidOperation:
+        return False
+
+
+def _data(valor) -> Optional[datetime]:
+    """Data ISO 8601 da VTEX ("Z" ou offset; sem fuso é UTC), ou None se inválida."""
+    try:
+        data = datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+    return data if data.tzinfo else data.replace(tzinfo=timezone.utc)
+
+
+def planeja_promocao(fixos: Optional[list], preco_lista, preco_promo,
+                     agora: Optional[datetime] = None) -> Optional[PlanoPromocao]:
+    """
+    Compara os preços fixos atuais do SKU (fixedPrices da VTEX) com a promoção do
+    Sankhya e retorna o que precisa ser escrito, ou None se já estão de acordo.
+
+    Com valor e preço de lista iguais, a vigência só é estendida quando faltar
+    menos de VTEX_PROMO_RENEW_HOURS para o fim, mantendo o início original.
+    """
+    agora = agora or datetime.now(_FUSO)
+    desejado = {
+        "value": float(para_decimal(preco_promo)),
+        "listPrice": float(para_decimal(preco_lista)),
+        "minQuantity": 1,
+        "dateRange": {
+            "from": agora.isoformat(timespec="seconds"),
+            "to": (agora + timedelta(hours=VTEX_PROMO_VALIDITY_HOURS)).isoformat(timespec="seconds"),
+        },
+    }
+    da_politica = [fixo for fixo in fixos or []
+                   if str(fixo.get("tradePolicyId", VTEX_PROMO_TRADE_POLICY)) == VTEX_PROMO_TRADE_POLICY]
+    if not da_politica:
+        return PlanoPromocao(False, desejado, "sem preço fixo")
+    if len(da_politica) > 1 or int(da_politica[0].get("minQuantity") or 1) != 1:
+        return PlanoPromocao(True, desejado, "faixas de quantidade a remover")
+
+    atual = da_politica[0]
+    if not _iguais(atual.get("value"), preco_promo) or not _iguais(atual.get("listPrice"), preco_lista):
+        return PlanoPromocao(False, desejado, "valor alterado")
+
+    vigencia = atual.get("dateRange")
+    if not vigencia:
+        # preço fixo sem vigência vale sempre
+        return None
+    inicio, fim = _data(vigencia.get("from")), _data(vigencia.get("to"))
+    if inicio is None or fim is None or inicio > agora:
+        return PlanoPromocao(False, desejado, "vigência inválida")
+    if fim - agora >= timedelta(hours=VTEX_PROMO_RENEW_HOURS):
+        return None
+    desejado["dateRange"]["from"] = vigencia["from"]
+    return PlanoPromocao(False, desejado, "vigência estendida")
+
+
+def vtex_reconcilia_promocao(edit_sku, preco_lista, preco_promo, fixos: Optional[list] = None) -> bool:
+    """
+    Deixa o preço fixo promocional do SKU de acordo com o Sankhya, escrevendo na
+    VTEX só quando algo difere (planeja_promocao). Sem `fixos`, os preços fixos
+    atuais são consultados.
+
+    Returns:
+        bool: True se o preço fixo está (ou ficou) correto
+    """
+    if fixos is None:
+        fixos = get_fixed_prices(edit_sku)
+    plano = planeja_promocao(fixos, preco_lista, preco_promo)
+    if plano is None:
+        logging.info(f"✅ Preço fixo promocional do sku {edit_sku} já está em vigor")
+        return True
+
+    endpoint = f"pricing/prices/{edit_sku}/fixed/{VTEX_PROMO_TRADE_POLICY}"
+    logging.info(f"💵 Gravando preço fixo do sku {edit_sku} ({plano.motivo}): "
+                 f"{json.dumps(plano.preco_fixo, ensure_ascii=False)}")
+    if plano.remove and vtex_delete(endpoint, f"🔢 Deletando preços fixos do SKU {edit_sku}") is None:
+        logging.error(f"❌ Falha ao deletar preços fixos do SKU {edit_sku}")
+        return False
+    if vtex_post(endpoint, [plano.preco_fixo], f"🔢 Gravando preço fixo para SKU {edit_sku}") is None:
+        logging.error(f"❌ Falha ao gravar preço fixo do SKU {edit_sku}")
+        enviar_notificacao_telegram(f"❌ Falha ao gravar preço fixo do SKU {edit_sku}")
+        return False
+
+    espelho = get_espelho()
+    if espelho is not None:
+        # a política da promoção fica só com o preço fixo gravado; as outras não mudam
+        mantidos = [fixo for fixo in fixos or []
+                    if str(fixo.get("tradePolicyId", VTEX_PROMO_TRADE_POLICY)) != VTEX_PROMO_TRADE_POLICY]
+        espelho.atualiza_fixos(edit_sku, mantidos + [dict(plano.preco_fixo, tradePolicyId=VTEX_PROMO_TRADE_POLICY)])
+    return True
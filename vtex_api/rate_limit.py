@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from utils.metricas import Medidor
+from utils.shards import fatia
+
+# Requisições por segundo permitidas por família de API da VTEX, divididas entre os SYNC_SHARDS processos
+VTEX_RATE_LIMITS = {
+    "catalog": fatia(float(os.getenv("VTEX_RATE_CATALOG", "20"))),
+    "logistics": fatia(float(os.getenv("VTEX_RATE_LOGISTICS", "20"))),
+    "pricing": fatia(float(os.getenv("VTEX_RATE_PRICING", "20"))),
+    "outros": fatia(float(os.getenv("VTEX_RATE_OUTROS", "10"))),
+}
+# Status que indicam throttling e devem ser repetidos
+VTEX_THROTTLE_STATUS = (429, 503)
+
+
+def familia_endpoint(endpoint: str) -> str:
+    """Família de API (catalog, logistics, pricing ou outros) de um endpoint VTEX."""
+    caminho = endpoint.lstrip("/")
+    if caminho.startswith("catalog"):
+        return "catalog"
+    if caminho.startswith("logistics"):
+        return "logistics"
+    if caminho.startswith("pricing"):
+        return "pricing"
+    return "outros"
+
+
+def modelo_endpoint(endpoint: str) -> str:
+    """Endpoint sem query string e com ids trocados por {id}, para rotular métricas."""
+    caminho = endpoint.lstrip("/").split("?", 1)[0]
+    caminho = re.sub(r"/warehouses/[^/]+", "/warehouses/{wh}", caminho)
+    return re.sub(r"/\d+(?=/|$)", "/{id}", caminho)
+
+
+class TokenBucket:
+    """
+    Token bucket com ajuste adaptativo (AIMD): a taxa cai pela metade a cada
+    throttling e volta a subir aos poucos a cada resposta bem-sucedida, até o
+    limite configurado.
+    """
+
+    def __init__(self, nome: str, taxa_maxima: float, taxa_minima: float = 0.5):
+        self.nome = nome
+        self.taxa_maxima = taxa_maxima
+        self.taxa_minima = min(taxa_minima, taxa_maxima)
+        self.taxa = taxa_maxima
+        self._tokens = taxa_maxima
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repoe(self, agora: float):
+        # capacidade de rajada de 1 segundo da taxa atual
+        self._tokens = min(self.taxa, self._tokens + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def _reserva(self) -> float:
+        """Consome um token (mesmo que adiantado) e retorna quanto esperar por ele."""
+        with self._lock:
+            agora = time.monotonic()
+            self._repoe(agora)
+            self._tokens -= 1
+            return -self._tokens / self.taxa if self._tokens < 0 else 0.0
+
+    def adquire(self):
+        """Bloqueia até haver um token disponível para uma requisição."""
+        espera = self._reserva()
+        if espera > 0:
+            time.sleep(espera)
+
+    async def adquire_async(self):
+        """adquire() sem bloquear o event loop; divide a mesma taxa com as threads."""
+        espera = self._reserva()
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    def reduz(self):
+        with self._lock:
+            nova = max(self.taxa_minima, self.taxa / 2)
+            if nova != self.taxa:
+                logging.warning(f"🐢 Throttling na família {self.nome}: taxa {self.taxa:.1f} → {nova:.1f} req/s")
+            self.taxa = nova
+            self._tokens = min(self._tokens, 0.0)
+
+    def aumenta(self):
+        with self._lock:
+            self.taxa = min(self.taxa_maxima, self.taxa + self.taxa_maxima * 0.05)
+
+
+_buckets = {familia: TokenBucket(familia, taxa) for familia, taxa in VTEX_RATE_LIMITS.items()}
+
+
+def get_bucket(endpoint: str) -> TokenBucket:
+    return _buckets[familia_endpoint(endpoint)]
+
+
+def taxas_atuais() -> dict[str, float]:
+    """Taxa atual (req/s) de cada família, para métricas e logs."""
+    return {familia: bucket.taxa for familia, bucket in _buckets.items()}
+
+
+Medidor("vtex_rate_limit_requests_per_second", "Taxa atual do rate limit adaptativo por família de API",
+        ("familia",), coleta=taxas_atuais)
+
+
+def retry_after_segundos(valor: Optional[str]) -> Optional[float]:
+    """Interpreta o header Retry-After (segundos ou data HTTP)."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_com_jitter(tentativa: int, base: float = 1.0, maximo: float = 60.0) -> float:
+    """Backoff exponencial com jitter completo: aleatório entre 0 e base * 2^(tentativa-1)."""
+    return random.uniform(0, min(maximo, base * 2 ** (tentativa - 1)))
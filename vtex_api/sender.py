@@ -1,30 +1,236 @@
+import asyncio
+import inspect
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Callable, Optional, TypeVar
+
 from notifications.telegram import enviar_notificacao_telegram
 from sankhya_api.fetch import sankhya_fetch_grupo_informacoes_produto
-from vtex_api.client import vtex_put, vtex_post
+from utils.metricas import VTEX_ENVIO_SEGUNDOS, VTEX_ENVIOS
+from vtex_api.client import vtex_put, vtex_post, vtex_put_async, vtex_post_async, VTEX_MAX_CONCURRENCY
+from vtex_api.depositos import DEPOSITO_PADRAO
+from vtex_api.espelho import get_espelho
+
+# Estoque em lote pelo endpoint warehouseitems/setbalance (vários SKUs por requisição).
+# Desligado: um PUT por SKU. Se o lote falhar, cada SKU é reenviado individualmente.
+VTEX_BULK_INVENTORY = os.getenv("VTEX_BULK_INVENTORY", "0") == "1"
+VTEX_BULK_MAX_ITEMS = int(os.getenv("VTEX_BULK_MAX_ITEMS", "100"))
+# Falhas seguidas do envio em lote até desistir dele na execução atual
+VTEX_BULK_MAX_FALHAS = 3
+
+_falhas_lote_estoque = 0
+_falhas_lote_lock = threading.Lock()
+# envios individuais de um lote saem em paralelo; o limite real é o semáforo da VTEX
+_executor_envios = ThreadPoolExecutor(VTEX_MAX_CONCURRENCY, thread_name_prefix="vtex-envio")
+
+T = TypeVar("T")
+
+
+def envia_em_paralelo(funcao: Callable[..., T], itens: list[tuple]) -> list[T]:
+    """Chama funcao(*item) para cada item em paralelo; devolve os resultados na mesma ordem."""
+    if len(itens) <= 1:
+        return [funcao(*item) for item in itens]
+    return list(_executor_envios.map(lambda item: funcao(*item), itens))
+
+
+def _mede_envio(tipo: str):
+    """Registra duração e resultado (ok/falha pelo bool retornado) de uma função de envio, síncrona ou async."""
+    def decorador(funcao):
+        if inspect.iscoroutinefunction(funcao):
+            @wraps(funcao)
+            async def envio_async(*args, **kwargs):
+                with VTEX_ENVIO_SEGUNDOS.mede(tipo=tipo):
+                    sucesso = await funcao(*args, **kwargs)
+                VTEX_ENVIOS.inc(tipo=tipo, resultado="ok" if sucesso else "falha")
+                return sucesso
+            return envio_async
+
+        @wraps(funcao)
+        def envio(*args, **kwargs):
+            with VTEX_ENVIO_SEGUNDOS.mede(tipo=tipo):
+                sucesso = funcao(*args, **kwargs)
+            VTEX_ENVIOS.inc(tipo=tipo, resultado="ok" if sucesso else "falha")
+            return sucesso
+        return envio
+    return decorador
 
 
-def vtex_send_update_estoque(codprod, sku, estoque_snk, estoque_vtex):
-    endpoint = f"logistics/pvt/inventory/skus/{sku}/warehouses/1f82610"
+def _requisicao_estoque(sku, estoque_snk, deposito: str) -> tuple[str, dict, str]:
+    endpoint = f"logistics/pvt/inventory/skus/{sku}/warehouses/{deposito}"
     payload = {"quantity": estoque_snk}
-    mensagem = f"📦 Enviando atualização de estoque para o SKU {sku} → {estoque_snk}"
+    mensagem = f"📦 Enviando atualização de estoque para o SKU {sku} no depósito {deposito} → {estoque_snk}"
+    return endpoint, payload, mensagem
+
+
+def _conclui_estoque(codprod, sku, estoque_snk, estoque_vtex, deposito: str, response) -> bool:
+    if response is not None:
+        espelho = get_espelho()
+        if espelho is not None:
+            espelho.atualiza_estoque(sku, deposito, estoque_snk)
+        logging.info(f"✅ Estoque atualizado com sucesso para Codprod {codprod} | SKU {sku} | Estoque atualizado: {estoque_snk} | Estoque Anterior: {estoque_vtex}")
+        enviar_notificacao_telegram(f"✅ Estoque atualizado com sucesso para Codprod {codprod} | SKU {sku} | Estoque atualizado: {estoque_snk} | Estoque Anterior: {estoque_vtex}")
+        return True
+
+    logging.warning(f"⚠️ Falha ao atualizar estoque para Codprod {codprod} | SKU {sku}")
+    enviar_notificacao_telegram(f"⚠️ Falha ao atualizar estoque para Codprod {codprod} | SKU {sku}")
+    return False
+
+
+@_mede_envio("estoque")
+def vtex_send_update_estoque(codprod, sku, estoque_snk, estoque_vtex, deposito: str = DEPOSITO_PADRAO) -> bool:
+    endpoint, payload, mensagem = _requisicao_estoque(sku, estoque_snk, deposito)
 
     try:
         response = vtex_put(endpoint, data=payload, log_msg=mensagem)
+        return _conclui_estoque(codprod, sku, estoque_snk, estoque_vtex, deposito, response)
 
-        if response is not None:
-            logging.info(f"✅ Estoque atualizado com sucesso para Codprod {codprod} | SKU {sku} | Estoque atualizado: {estoque_snk} | Estoque Anterior: {estoque_vtex}")
-            enviar_notificacao_telegram(f"✅ Estoque atualizado com sucesso para Codprod {codprod} | SKU {sku} | Estoque atualizado: {estoque_snk} | Estoque Anterior: {estoque_vtex}")
-        else:
-            logging.warning(f"⚠️ Falha ao atualizar estoque para Codprod {codprod} | SKU {sku}")
-            enviar_notificacao_telegram(f"⚠️ Falha ao atualizar estoque para Codprod {codprod} | SKU {sku}")
+    except Exception as e:
+        logging.error(f"❌ Erro ao atualizar estoque do Codprod {codprod} | SKU {sku}: {e}")
+        enviar_notificacao_telegram(f"❌ Erro ao atualizar estoque do Codprod {codprod} | SKU {sku}: {e}")
+
+    return False
+
+
+@_mede_envio("estoque")
+async def vtex_send_update_estoque_async(codprod, sku, estoque_snk, estoque_vtex,
+                                         deposito: str = DEPOSITO_PADRAO) -> bool:
+    """vtex_send_update_estoque para código asyncio."""
+    endpoint, payload, mensagem = _requisicao_estoque(sku, estoque_snk, deposito)
+
+    try:
+        response = await vtex_put_async(endpoint, data=payload, log_msg=mensagem)
+        return _conclui_estoque(codprod, sku, estoque_snk, estoque_vtex, deposito, response)
 
     except Exception as e:
         logging.error(f"❌ Erro ao atualizar estoque do Codprod {codprod} | SKU {sku}: {e}")
         enviar_notificacao_telegram(f"❌ Erro ao atualizar estoque do Codprod {codprod} | SKU {sku}: {e}")
 
+    return False
+
+
+def _lote_estoque_ativo() -> bool:
+    return VTEX_BULK_INVENTORY and _falhas_lote_estoque < VTEX_BULK_MAX_FALHAS
+
+
+_ENDPOINT_LOTE_ESTOQUE = "logistics/pvt/inventory/warehouseitems/setbalance"
+
+
+def _payload_bloco_estoque(itens: list[tuple]) -> list[dict]:
+    return [{"wareHouseId": deposito, "itemId": str(sku), "quantity": int(estoque_snk)}
+            for _, sku, estoque_snk, _, deposito in itens]
+
+
+def _aceitos_no_bloco(itens: list[tuple], response) -> Optional[list[bool]]:
+    """
+    Resultado de cada item do bloco, ou None se o bloco inteiro falhou.
+
+    Quando a resposta do setbalance traz uma lista com itemId/wareHouseId, o item
+    marcado com erro (success false, error ou errorMessage) conta como recusado.
+    Sem essa lista, o sucesso do bloco inteiro é o único sinal que a VTEX devolve.
+    """
+    if not _registra_resultado_bloco(response):
+        return None
+    if not isinstance(response, list):
+        return [True] * len(itens)
+    recusados = {(str(r.get("itemId")), str(r.get("wareHouseId"))) for r in response
+                 if isinstance(r, dict) and (r.get("success") is False or r.get("error") or r.get("errorMessage"))}
+    aceitos = [(str(sku), deposito) not in recusados for _, sku, _, _, deposito in itens]
+    if not all(aceitos):
+        logging.warning(f"⚠️ Envio de estoque em lote: {aceitos.count(False)} de {len(itens)} itens recusados, "
+                        f"reenviando por SKU")
+    return aceitos
+
 
-def vtex_send_update_preco_venda(codprod, sku, preco_snk, preco_vtex):
+@_mede_envio("estoque_lote")
+def _envia_bloco_estoque(itens: list[tuple]) -> Optional[list[bool]]:
+    """Um POST setbalance com todos os itens (codprod, sku, estoque_snk, estoque_vtex, deposito)."""
+    response = vtex_post(_ENDPOINT_LOTE_ESTOQUE, data=_payload_bloco_estoque(itens),
+                         log_msg=f"📦 Enviando estoque de {len(itens)} SKUs em lote")
+    return _aceitos_no_bloco(itens, response)
+
+
+@_mede_envio("estoque_lote")
+async def _envia_bloco_estoque_async(itens: list[tuple]) -> Optional[list[bool]]:
+    response = await vtex_post_async(_ENDPOINT_LOTE_ESTOQUE, data=_payload_bloco_estoque(itens),
+                                     log_msg=f"📦 Enviando estoque de {len(itens)} SKUs em lote")
+    return _aceitos_no_bloco(itens, response)
+
+
+def _registra_resultado_bloco(response) -> bool:
+    """Conta falhas seguidas do envio em lote, desativando-o após VTEX_BULK_MAX_FALHAS."""
+    global _falhas_lote_estoque
+    with _falhas_lote_lock:
+        if response is None:
+            _falhas_lote_estoque += 1
+            if _falhas_lote_estoque == VTEX_BULK_MAX_FALHAS:
+                logging.warning(f"⚠️ Envio de estoque em lote falhou {VTEX_BULK_MAX_FALHAS} vezes seguidas, "
+                                f"usando envio por SKU até o fim da execução")
+                enviar_notificacao_telegram("⚠️ Envio de estoque em lote desativado nesta execução após falhas seguidas")
+            return False
+        _falhas_lote_estoque = 0
+    return True
+
+
+def vtex_send_estoque_lote(itens: list[tuple]) -> list[bool]:
+    """
+    Atualiza o estoque de vários SKUs.
+
+    Args:
+        itens (list): tuplas (codprod, sku, estoque_snk, estoque_vtex, deposito)
+
+    Returns:
+        list: sucesso de cada item, na mesma ordem. Com VTEX_BULK_INVENTORY os itens
+              vão em blocos de VTEX_BULK_MAX_ITEMS; um bloco que falhar, ou item que a
+              VTEX recusar dentro dele, é reenviado SKU a SKU, para que cada item
+              tenha seu próprio resultado.
+    """
+    resultados = []
+    for inicio in range(0, len(itens), VTEX_BULK_MAX_ITEMS):
+        bloco = itens[inicio:inicio + VTEX_BULK_MAX_ITEMS]
+        aceitos = _envia_bloco_estoque(bloco) if len(bloco) > 1 and _lote_estoque_ativo() else None
+        aceitos = _conclui_bloco_estoque(bloco, aceitos)
+        reenviados = iter(envia_em_paralelo(vtex_send_update_estoque, _recusados(bloco, aceitos)))
+        resultados += [ok or next(reenviados) for ok in aceitos]
+    return resultados
+
+
+async def vtex_send_estoque_lote_async(itens: list[tuple]) -> list[bool]:
+    """vtex_send_estoque_lote para código asyncio: os envios por SKU saem todos ao mesmo tempo."""
+    resultados = []
+    for inicio in range(0, len(itens), VTEX_BULK_MAX_ITEMS):
+        bloco = itens[inicio:inicio + VTEX_BULK_MAX_ITEMS]
+        aceitos = await _envia_bloco_estoque_async(bloco) if len(bloco) > 1 and _lote_estoque_ativo() else None
+        aceitos = _conclui_bloco_estoque(bloco, aceitos)
+        reenviados = iter(await asyncio.gather(*(vtex_send_update_estoque_async(*item)
+                                                 for item in _recusados(bloco, aceitos))))
+        resultados += [ok or next(reenviados) for ok in aceitos]
+    return resultados
+
+
+def _recusados(bloco: list[tuple], aceitos: list[bool]) -> list[tuple]:
+    return [item for item, ok in zip(bloco, aceitos) if not ok]
+
+
+def _conclui_bloco_estoque(bloco: list[tuple], aceitos: Optional[list[bool]]) -> list[bool]:
+    """Registra os itens aceitos no lote; devolve o resultado de cada item (todos False sem lote)."""
+    if aceitos is None:
+        return [False] * len(bloco)
+    espelho = get_espelho()
+    for (codprod, sku, estoque_snk, estoque_vtex, deposito), ok in zip(bloco, aceitos):
+        if not ok:
+            continue
+        if espelho is not None:
+            espelho.atualiza_estoque(sku, deposito, estoque_snk)
+        logging.info(f"✅ Estoque atualizado com sucesso para Codprod {codprod} | SKU {sku} | Estoque atualizado: {estoque_snk} | Estoque Anterior: {estoque_vtex}")
+        enviar_notificacao_telegram(f"✅ Estoque atualizado com sucesso para Codprod {codprod} | SKU {sku} | Estoque atualizado: {estoque_snk} | Estoque Anterior: {estoque_vtex}")
+    return aceitos
+
+
+def _requisicao_preco(codprod, sku, preco_snk, preco_vtex) -> Optional[tuple[str, dict, str, float]]:
+    """Endpoint, payload, mensagem e preço do envio, ou None se preco_snk não for numérico."""
     logging.info(f"🟢 Enviando para p Vtex atualização de preço de venda {codprod}")
     logging.debug(f"🔢 Codprod {codprod} | SKU {sku} | preco snk {preco_snk} | preco vtex {preco_vtex}")
     endpoint = f"pricing/prices/{sku}"
@@ -32,29 +238,68 @@ def vtex_send_update_preco_venda(codprod, sku, preco_snk, preco_vtex):
         preco_float = float(preco_snk)
     except ValueError:
         logging.error(f"❌ Valor inválido para preco_snk: {preco_snk}")
-        return
+        return None
 
     payload = {"markup": 0, "basePrice": preco_float}
     mensagem = f"📦 Enviando atualização de preço de venda para o SKU {sku} → {preco_float}"
+    return endpoint, payload, mensagem, preco_float
+
+
+def _conclui_preco(codprod, sku, preco_float, preco_vtex, response) -> bool:
+    if response is not None:
+        espelho = get_espelho()
+        if espelho is not None:
+            espelho.atualiza_preco_base(sku, preco_float)
+        logging.info(
+            f"✅ Preço de venda atualizado com sucesso para Codprod {codprod} | SKU {sku} | Preço Atualizado: {preco_float} | Preço Anterior: {preco_vtex}")
+        enviar_notificacao_telegram(
+            f"✅ Preço de venda atualizado com sucesso para Codprod {codprod} | SKU {sku} | Preço Atualizado {preco_float} | Preço Anterior: {preco_vtex}")
+        return True
+
+    logging.warning(f"⚠️ Falha ao atualizar preço para Codprod {codprod} | SKU {sku}")
+    enviar_notificacao_telegram(f"⚠️ Falha ao atualizar preço para Codprod {codprod} | SKU {sku}")
+    return False
+
+
+@_mede_envio("preco")
+def vtex_send_update_preco_venda(codprod, sku, preco_snk, preco_vtex) -> bool:
+    requisicao = _requisicao_preco(codprod, sku, preco_snk, preco_vtex)
+    if requisicao is None:
+        return False
+    endpoint, payload, mensagem, preco_float = requisicao
 
     try:
         response = vtex_put(endpoint, data=payload, log_msg=mensagem)
+        return _conclui_preco(codprod, sku, preco_float, preco_vtex, response)
 
-        if response is not None:
-            logging.info(
-                f"✅ Preço de venda atualizado com sucesso para Codprod {codprod} | SKU {sku} | Preço Atualizado: {preco_float} | Preço Anterior: {preco_vtex}")
-            enviar_notificacao_telegram(
-                f"✅ Preço de venda atualizado com sucesso para Codprod {codprod} | SKU {sku} | Preço Atualizado {preco_float} | Preço Anterior: {preco_vtex}")
-        else:
-            logging.warning(f"⚠️ Falha ao atualizar preço para Codprod {codprod} | SKU {sku}")
-            enviar_notificacao_telegram(f"⚠️ Falha ao atualizar preço para Codprod {codprod} | SKU {sku}")
+    except Exception as e:
+        logging.error(f"❌ Erro ao atualizar preço do Codprod {codprod} | SKU {sku}: {e}")
+        enviar_notificacao_telegram(f"❌ Erro ao atualizar preço do Codprod {codprod} | SKU {sku}: {e}")
+
+    return False
+
+
+@_mede_envio("preco")
+async def vtex_send_update_preco_venda_async(codprod, sku, preco_snk, preco_vtex) -> bool:
+    """vtex_send_update_preco_venda para código asyncio."""
+    requisicao = _requisicao_preco(codprod, sku, preco_snk, preco_vtex)
+    if requisicao is None:
+        return False
+    endpoint, payload, mensagem, preco_float = requisicao
+
+    try:
+        response = await vtex_put_async(endpoint, data=payload, log_msg=mensagem)
+        return _conclui_preco(codprod, sku, preco_float, preco_vtex, response)
 
     except Exception as e:
         logging.error(f"❌ Erro ao atualizar preço do Codprod {codprod} | SKU {sku}: {e}")
         enviar_notificacao_telegram(f"❌ Erro ao atualizar preço do Codprod {codprod} | SKU {sku}: {e}")
 
+    return False
 
-def vtex_update_grupo_informacoes(id_vtex, snk_codprod, client):
+
+@_mede_envio("especificacao")
+def vtex_update_grupo_informacoes(id_vtex, snk_codprod, client) -> bool:
     endpoint = f"catalog_system/pvt/products/{id_vtex}/specification"
 
     grupo_informacao = sankhya_fetch_grupo_informacoes_produto(snk_codprod, client)
@@ -106,10 +351,13 @@ def vtex_update_grupo_informacoes(id_vtex, snk_codprod, client):
         if response is not None:
             logging.info(f"✅ Grupo de informações atualizado com sucesso para o id {id_vtex}")
             enviar_notificacao_telegram(f"✅ Grupo de informações atualizado com sucesso para o id {id_vtex}")
+            return True
         else:
             logging.warning(f"⚠️ Falha ao atualizar grupo de informações para Id {id_vtex}")
             enviar_notificacao_telegram(f"⚠⚠️ Falha ao atualizar grupo de informações para Id {id_vtex}")
 
     except Exception as e:
         logging.error(f"❌ Erro ao atualizar grupo de informações do Id {id_vtex}")
-        enviar_notificacao_telegram(f"❌ Erro ao atualizar grupo de informações do Id {id_vtex}")
\ No newline at end of file
+        enviar_notificacao_telegram(f"❌ Erro ao atualizar grupo de informações do Id {id_vtex}")
+
+    return False
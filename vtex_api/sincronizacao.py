@@ -0,0 +1,282 @@
+import logging
+import os
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Optional
+
+from utils.metricas import SKUS_PROCESSADOS, ALTERACOES, SINCRONIZACAO_SEGUNDOS, SANKHYA_PRECOS_FORA_DO_LOTE
+from vtex_api.depositos import estoque_por_deposito
+from vtex_api.diff import skus_inalterados
+from vtex_api.espelho import EspelhoVtex
+from vtex_api.estado import EstadoSincronizacao
+from vtex_api.fetch import vtex_fetch_id_info
+from vtex_api.journal import JournalSincronizacao
+from vtex_api.pipeline import Estagio, executa_pipeline
+from vtex_api.plano import GravadorPlano
+from vtex_api.processamentos import (vtex_enriquece_sku, vtex_compara_estoque, vtex_compara_preco,
+                                     vtex_aplica_alteracoes_lote, normaliza_sku, SkuSnapshot,
+                                     ATUALIZADO, INALTERADO, FALHA, CAMPO_ESTOQUE, CAMPO_PRECO, CAMPO_PROMO)
+
+# Threads por estágio: busca de dados (I/O VTEX + Sankhya) e envio das alterações
+SYNC_MAX_WORKERS = int(os.getenv("SYNC_MAX_WORKERS", "8"))
+SYNC_PUSH_WORKERS = int(os.getenv("SYNC_PUSH_WORKERS", "4"))
+# Itens em espera entre um estágio e outro
+SYNC_QUEUE_SIZE = int(os.getenv("SYNC_QUEUE_SIZE", "100"))
+# SKUs cujas alterações são enviadas juntas, e espera máxima (s) para completar o lote
+SYNC_PUSH_BATCH = int(os.getenv("SYNC_PUSH_BATCH", "50"))
+SYNC_PUSH_BATCH_WAIT = float(os.getenv("SYNC_PUSH_BATCH_WAIT", "0.5"))
+
+
+@dataclass
+class ResumoSincronizacao:
+    """Contadores de uma execução de sincronização."""
+    atualizados: int = 0
+    inalterados: int = 0
+    falhas: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.atualizados + self.inalterados + self.falhas
+
+    def registra(self, status: str):
+        if status == ATUALIZADO:
+            self.atualizados += 1
+        elif status == INALTERADO:
+            self.inalterados += 1
+        else:
+            self.falhas += 1
+
+    def soma(self, outro: "ResumoSincronizacao") -> "ResumoSincronizacao":
+        return ResumoSincronizacao(self.atualizados + outro.atualizados, self.inalterados + outro.inalterados,
+                                   self.falhas + outro.falhas)
+
+    def __str__(self) -> str:
+        return (f"{self.total} SKUs | ✅ {self.atualizados} atualizados | "
+                f"➖ {self.inalterados} inalterados | ❌ {self.falhas} com falha")
+
+
+def combina_status(*status: str) -> str:
+    """FALHA se alguma etapa falhou, ATUALIZADO se alguma enviou alteração, senão INALTERADO."""
+    if FALHA in status:
+        return FALHA
+    if ATUALIZADO in status:
+        return ATUALIZADO
+    return INALTERADO
+
+
+@dataclass
+class ContextoSincronizacao:
+    """Dados compartilhados por todos os SKUs de uma execução."""
+    client: object
+    estoques_snk: Optional[dict] = None
+    precos_snk: Optional[dict] = None
+    estado: Optional[EstadoSincronizacao] = None
+    delta: bool = False
+    plano: Optional[GravadorPlano] = None
+
+
+def _codprod(id_sku) -> Optional[int]:
+    """CODPROD (RefId) do produto, normalmente vindo do cache de produtos."""
+    try:
+        return int(vtex_fetch_id_info(id_sku))
+    except (TypeError, ValueError):
+        return None
+
+
+def _registro_com_falha(item, erro: Exception) -> SkuSnapshot:
+    """Registro que segue pelo pipeline marcando o SKU como falho."""
+    if isinstance(item, SkuSnapshot):
+        registro = item
+    else:
+        indice, id_sku, sku = item
+        registro = SkuSnapshot(id_sku, sku, indice=indice)
+    registro.falhas = [CAMPO_ESTOQUE, CAMPO_PRECO]
+    registro.alteracoes = []
+    return registro
+
+
+def enriquece(item: tuple, contexto: ContextoSincronizacao) -> SkuSnapshot:
+    """
+    Estágio 1: busca os dados VTEX e Sankhya do SKU.
+
+    Com um estado local, guarda no registro o valor do snapshot Sankhya a ser
+    registrado após o envio; no modo delta, não busca na VTEX o campo cujo
+    valor não mudou desde o último registro. SKUs com promoção sempre têm o
+    preço buscado, pois a vigência do preço fixo precisa ser conferida.
+    """
+    indice, id_sku, sku = item
+    edit_sku = normaliza_sku(sku)
+    estado = contexto.estado
+    codprod = _codprod(id_sku) if estado is not None else None
+
+    estoque_snk = preco_snk = None
+    if codprod is not None and contexto.estoques_snk is not None:
+        estoque_snk = contexto.estoques_snk.get(codprod) or estoque_por_deposito({})
+    if codprod is not None and contexto.precos_snk is not None:
+        preco_snk = contexto.precos_snk.get(codprod)
+
+    busca_estoque = busca_preco = True
+    if contexto.delta:
+        if estoque_snk is not None and estado.estoque_inalterado(edit_sku, estoque_snk):
+            logging.debug(f"⏭️ Estoque do sku {edit_sku} inalterado desde o último envio")
+            busca_estoque = False
+        if (preco_snk is not None and float(preco_snk[1] or 0) <= 0
+                and estado.preco_inalterado(edit_sku, *preco_snk)):
+            logging.debug(f"⏭️ Preço do sku {edit_sku} inalterado desde o último envio")
+            busca_preco = False
+
+    registro = vtex_enriquece_sku(id_sku, sku, contexto.client, contexto.estoques_snk, contexto.precos_snk,
+                                  estoque=busca_estoque, preco=busca_preco)
+    registro.indice = indice
+    # só registra o estoque no estado depois de uma leitura confirmada na VTEX
+    registro.estado_estoque = estoque_snk if busca_estoque and registro.estoque_snk is not None else None
+    registro.estado_preco = preco_snk if busca_preco else None
+    return registro
+
+
+def compara(registro: SkuSnapshot) -> SkuSnapshot:
+    """Estágio 2: decide o que mudou, sem acessar nenhuma API."""
+    alteracoes = []
+    if CAMPO_ESTOQUE not in registro.falhas:
+        alteracoes += vtex_compara_estoque(registro)
+    if CAMPO_PRECO not in registro.falhas:
+        try:
+            alteracoes += vtex_compara_preco(registro)
+        except Exception as e:
+            logging.error(f"❌ Falha ao comparar preço do id {registro.id}, sku {registro.sku}: {e}")
+            registro.falhas.append(CAMPO_PRECO)
+    registro.alteracoes = alteracoes
+    return registro
+
+
+def envia(registros: list[SkuSnapshot], contexto: ContextoSincronizacao) -> list[tuple]:
+    """
+    Estágio 3: envia juntas as alterações de um lote de SKUs para a VTEX
+    (vtex_aplica_alteracoes_lote) e atualiza o estado local de cada um. Com um
+    plano (dry-run), as alterações vão para ele e nada é escrito na VTEX.
+
+    Returns:
+        list: (indice, id, sku, status) de cada registro, na mesma ordem
+    """
+    alteracoes = [alteracao for registro in registros for alteracao in registro.alteracoes]
+    if contexto.plano is not None:
+        contexto.plano.registra(alteracoes)
+        sucessos = iter([True] * len(alteracoes))
+    else:
+        sucessos = iter(vtex_aplica_alteracoes_lote(alteracoes) if alteracoes else [])
+    return [_conclui(registro, [next(sucessos) for _ in registro.alteracoes], contexto)
+            for registro in registros]
+
+
+def _conclui(registro: SkuSnapshot, sucessos: list[bool], contexto: ContextoSincronizacao) -> tuple:
+    """Status final do SKU a partir do resultado de cada alteração enviada."""
+    falhas = set(registro.falhas)
+    atualizados = set()
+    for alteracao, sucesso in zip(registro.alteracoes, sucessos):
+        # a promoção faz parte do preço: falha nela é falha do preço
+        campo = CAMPO_PRECO if alteracao.campo == CAMPO_PROMO else alteracao.campo
+        if contexto.plano is None:
+            ALTERACOES.inc(campo=alteracao.campo, resultado="ok" if sucesso else "falha")
+        if not sucesso:
+            falhas.add(campo)
+        elif alteracao.campo != CAMPO_PROMO:
+            atualizados.add(campo)
+
+    # no dry-run nada foi enviado, então o estado local não muda
+    estado = contexto.estado if contexto.plano is None else None
+    if estado is not None:
+        if registro.estado_estoque is not None and CAMPO_ESTOQUE not in falhas:
+            estado.registra_estoque(registro.sku, registro.estado_estoque)
+        if registro.estado_preco is not None and CAMPO_PRECO not in falhas:
+            estado.registra_preco(registro.sku, *registro.estado_preco)
+
+    status = combina_status(*(FALHA if campo in falhas else ATUALIZADO if campo in atualizados else INALTERADO
+                              for campo in (CAMPO_ESTOQUE, CAMPO_PRECO)))
+    return registro.indice, registro.id, registro.sku, status
+
+
+def sincroniza_skus(ids_skus, client, max_workers: Optional[int] = None,
+                    estoques_snk: Optional[dict] = None,
+                    precos_snk: Optional[dict] = None,
+                    estado: Optional[EstadoSincronizacao] = None,
+                    delta: bool = False,
+                    journal: Optional[JournalSincronizacao] = None,
+                    plano: Optional[GravadorPlano] = None,
+                    espelho: Optional[EspelhoVtex] = None) -> tuple[list, ResumoSincronizacao]:
+    """
+    Sincroniza os SKUs em um pipeline de estágios ligados por filas limitadas:
+    catálogo → enriquece (busca VTEX/Sankhya) → compara → envia.
+
+    Os limites de concorrência de cada API (VTEX_MAX_CONCURRENCY e
+    SANKHYA_MAX_CONCURRENCY) são aplicados pelos próprios clientes, então o
+    número de workers pode ser maior que eles sem sobrecarregar os serviços.
+
+    Args:
+        ids_skus: dict {id: sku} (vtex_merge_id_sku_dicts) ou iterável de pares
+                  (id, sku) (vtex_iter_id_sku); com um iterável os SKUs começam a
+                  ser processados enquanto o catálogo ainda está sendo lido
+        client: SankhyaClient compartilhado entre as threads
+        max_workers (int): threads do estágio de busca (padrão SYNC_MAX_WORKERS)
+        estoques_snk (dict): snapshot {codprod: {warehouseId: estoque}} do Sankhya, opcional
+        precos_snk (dict): snapshot {codprod: (preco, promo)} do Sankhya, opcional
+        estado (EstadoSincronizacao): estado local a atualizar, opcional
+        delta (bool): pula os SKUs cujo snapshot é igual ao estado local
+        journal (JournalSincronizacao): grava o status de cada SKU para um --resume, opcional
+        plano (GravadorPlano): dry-run; as alterações são gravadas no plano em vez de enviadas
+        espelho (EspelhoVtex): com os dois snapshots do Sankhya, os SKUs que o diff em
+                  colunas (vtex_api.diff) resolve como inalterados não passam pelo pipeline;
+                  o catálogo é lido inteiro antes de começar
+
+    Returns:
+        tuple: (lista [(id, sku, status)] na mesma ordem de entrada, resumo)
+    """
+    max_workers = max_workers or SYNC_MAX_WORKERS
+    if delta and estado is None:
+        raise ValueError("Modo delta exige um estado local.")
+    contexto = ContextoSincronizacao(client, estoques_snk, precos_snk, estado, delta, plano)
+    resumo = ResumoSincronizacao()
+    resultados = []
+    inicio = time.time()
+    fora_do_lote = SANKHYA_PRECOS_FORA_DO_LOTE.valor()
+
+    pares = ids_skus.items() if isinstance(ids_skus, dict) else ids_skus
+    resolvidos = set()
+    if espelho is not None and estoques_snk is not None and precos_snk is not None:
+        pares = list(pares)
+        resolvidos = skus_inalterados(pares, estoques_snk, precos_snk, espelho)
+        for indice in sorted(resolvidos):
+            id_sku, sku = pares[indice]
+            resumo.registra(INALTERADO)
+            SKUS_PROCESSADOS.inc(status=INALTERADO)
+            resultados.append((indice, id_sku, sku, INALTERADO))
+            if journal is not None:
+                journal.registra_resultado(id_sku, INALTERADO)
+    fonte = ((indice, id_sku, sku) for indice, (id_sku, sku) in enumerate(pares) if indice not in resolvidos)
+    estagios = [
+        Estagio("enriquece", partial(enriquece, contexto=contexto), max_workers, ao_falhar=_registro_com_falha),
+        Estagio("compara", compara, 1, ao_falhar=_registro_com_falha),
+        Estagio("envia", partial(envia, contexto=contexto), SYNC_PUSH_WORKERS,
+                ao_falhar=lambda registro, e: (registro.indice, registro.id, registro.sku, FALHA),
+                lote=SYNC_PUSH_BATCH, espera_lote=SYNC_PUSH_BATCH_WAIT),
+    ]
+
+    modo = ("delta" if delta else "completo") + (", dry-run" if plano is not None else "")
+    logging.info(f"🧵 Sincronizando SKUs com {max_workers} workers de busca e "
+                 f"{SYNC_PUSH_WORKERS} de envio (modo {modo})")
+    for indice, id_sku, sku, status in executa_pipeline(fonte, estagios, SYNC_QUEUE_SIZE):
+        resumo.registra(status)
+        SKUS_PROCESSADOS.inc(status=status)
+        resultados.append((indice, id_sku, sku, status))
+        if journal is not None:
+            journal.registra_resultado(id_sku, status)
+
+    resultados.sort(key=lambda r: r[0])
+    if precos_snk is not None:
+        fora_do_lote = SANKHYA_PRECOS_FORA_DO_LOTE.valor() - fora_do_lote
+        registra = logging.warning if fora_do_lote else logging.info
+        registra(f"💵 {fora_do_lote:.0f} produtos fora da carga de preços em lote, consultados individualmente")
+    SINCRONIZACAO_SEGUNDOS.define(time.time() - inicio)
+    duracao_min = (time.time() - inicio) / 60
+    logging.info(f"📊 Sincronização concluída em {duracao_min:.2f} minutos: {resumo}")
+    return [r[1:] for r in resultados], resumo